@@ -4,7 +4,54 @@ from abc import ABC
 from tokens import Token
 
 
+def _items(values) -> tuple | None:
+    return None if values is None else tuple(values)
+
+
+def _structural_hash(node) -> int:
+    # Hashes the types and fields of the whole subtree, flattened. An explicit
+    # stack instead of recursion, so trees of any depth can be hashed. Nothing is
+    # cached: nodes and their statement lists can change after they are built
+    flat = []
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if type(value) is tuple:
+            flat.append(tuple)
+            flat.append(len(value))
+            stack.extend(value)
+        elif isinstance(value, (Node, Program)):
+            flat.append(type(value))
+            stack.append(value._key())
+        else:
+            flat.append(value)
+    return hash(tuple(flat))
+
+
+def _structural_eq(node, other) -> bool:
+    # Walks both subtrees side by side, with an explicit stack like _structural_hash
+    stack = [(node, other)]
+    while stack:
+        left, right = stack.pop()
+        if left is right:
+            continue
+        if type(left) is not type(right):
+            return False
+        if type(left) is tuple:
+            if len(left) != len(right):
+                return False
+            stack.extend(zip(left, right))
+        elif isinstance(left, (Node, Program)):
+            stack.append((left._key(), right._key()))
+        elif left != right:
+            return False
+    return True
+
+
 class Node(ABC):
+    # Nodes compare and hash by type and fields, never by their str()
+    __slots__ = ()
+
     @abc.abstractmethod
     def token_literal(self) -> str:
         pass
@@ -13,15 +60,17 @@ class Node(ABC):
     def __str__(self) -> str:
         pass
 
-    def __eq__(self, other):
-        return str(other) == str(self) if other is not None else False
-
     @abc.abstractmethod
-    def __hash__(self):
+    def _key(self) -> tuple:
         pass
 
+    __eq__ = _structural_eq
+    __hash__ = _structural_hash
+
 
 class Statement(Node):
+    __slots__ = ()
+
     @abc.abstractmethod
     def token(self) -> Token:
         pass
@@ -35,6 +84,7 @@ Expression = Statement
 
 class StringValue(Expression):
     __match_args__ = ("value",)
+    __slots__ = ("_token", "value")
 
     def __init__(self, token: Token, value: str):
         self._token = token
@@ -46,20 +96,26 @@ class StringValue(Expression):
     def __str__(self) -> str:
         return self.value
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (self.value,)
 
 
 class Identifier(StringValue):
-    pass
+    # address is set by resolver.py, it stays None for a tree that was not resolved
+    __slots__ = ("address",)
+
+    def __init__(self, token: Token, value: str):
+        super().__init__(token, value)
+        self.address = None
 
 
 class StringLiteral(StringValue):
-    pass
+    __slots__ = ()
 
 
 class LetStatement(Statement):
     __match_args__ = ("name", "value")
+    __slots__ = ("_token", "name", "value")
 
     def __init__(self, token: Token, name: Identifier, value: Expression | None):
         self._token = token
@@ -72,12 +128,13 @@ class LetStatement(Statement):
     def __str__(self) -> str:
         return f"{self.token_literal()} {self.name} = {self.value}"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.name, self.value
 
 
 class ExpressionStatement(Statement):
     __match_args__ = ("expression",)
+    __slots__ = ("_token", "expression")
 
     def __init__(self, token: Token, expression: Expression | None):
         self._token = token
@@ -89,12 +146,13 @@ class ExpressionStatement(Statement):
     def __str__(self) -> str:
         return str(self.expression)
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (self.expression,)
 
 
 class Program:
     __match_args__ = ("statements",)
+    __slots__ = ("statements",)
 
     def __init__(self, statements: list[Statement]):
         self.statements = statements
@@ -105,12 +163,16 @@ class Program:
     def __str__(self) -> str:
         return "".join((str(statement) for statement in self.statements))
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (_items(self.statements),)
+
+    __eq__ = _structural_eq
+    __hash__ = _structural_hash
 
 
 class LiteralExpression(Expression):
     __match_args__ = ("value",)
+    __slots__ = ("_token", "value")
 
     def __init__(self, token: Token, value):
         self._token = token
@@ -122,20 +184,21 @@ class LiteralExpression(Expression):
     def __str__(self) -> str:
         return self.token().literal
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (self.value,)
 
 
 class IntegerLiteral(LiteralExpression):
-    pass
+    __slots__ = ()
 
 
 class BooleanLiteral(LiteralExpression):
-    pass
+    __slots__ = ()
 
 
 class ReturnStatement(Statement):
     __match_args__ = ("return_value",)
+    __slots__ = ("_token", "return_value")
 
     def __init__(self, token: Token, return_value: Expression | None):
         self._token = token
@@ -147,12 +210,13 @@ class ReturnStatement(Statement):
     def __str__(self) -> str:
         return f"{self.token_literal()} {self.return_value}"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (self.return_value,)
 
 
 class PrefixExpression(Expression):
     __match_args__ = ("operator", "right")
+    __slots__ = ("_token", "operator", "right")
 
     def __init__(self, token: Token, operator: str, right: Expression | None):
         self._token = token
@@ -165,12 +229,13 @@ class PrefixExpression(Expression):
     def __str__(self) -> str:
         return f"({self.operator}{self.right})"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.operator, self.right
 
 
 class InfixExpression(Expression):
     __match_args__ = ("left", "operator", "right")
+    __slots__ = ("_token", "left", "operator", "right")
 
     def __init__(
             self,
@@ -190,12 +255,13 @@ class InfixExpression(Expression):
     def __str__(self) -> str:
         return f"({self.left} {self.operator} {self.right})"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.left, self.operator, self.right
 
 
 class CallExpression(Expression):
     __match_args__ = ("function", "arguments")
+    __slots__ = ("_token", "function", "arguments")
 
     def __init__(
             self,
@@ -213,12 +279,13 @@ class CallExpression(Expression):
     def __str__(self) -> str:
         return f'{self.function}({", ".join(str(argument) for argument in self.arguments)})'
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.function, _items(self.arguments)
 
 
 class ArrayLiteral(Expression):
     __match_args__ = ("elements",)
+    __slots__ = ("_token", "elements")
 
     def __init__(self, token: Token, elements: list[Expression | None] | None):
         self._token = token
@@ -230,12 +297,13 @@ class ArrayLiteral(Expression):
     def __str__(self) -> str:
         return f'[{", ".join(str(element) for element in self.elements)}]'
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (_items(self.elements),)
 
 
 class IndexExpression(Expression):
     __match_args__ = ("left", "index")
+    __slots__ = ("_token", "left", "index")
 
     def __init__(self, token: Token, left: Expression | None, index: Expression | None):
         self._token = token
@@ -248,11 +316,13 @@ class IndexExpression(Expression):
     def __str__(self) -> str:
         return f"({self.left}[{self.index}])"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.left, self.index
 
 
 class BlockStatement(Statement):
+    __slots__ = ("_token", "statements")
+
     def __init__(self, token: Token, statements: list[Statement | None] | None):
         self._token = token
         self.statements = statements
@@ -267,11 +337,13 @@ class BlockStatement(Statement):
             else "".join(str(statement) for statement in self.statements)
         )
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (_items(self.statements),)
 
 
 class IfExpression(Expression):
+    __slots__ = ("_token", "condition", "consequence", "alternative")
+
     def __init__(
             self,
             token: Token,
@@ -291,12 +363,13 @@ class IfExpression(Expression):
         alt = f"else {self.alternative}" if self.alternative is not None else ""
         return f"if({self.condition}) {self.consequence} {alt}"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return self.condition, self.consequence, self.alternative
 
 
 class FunctionLiteral(Expression):
     __match_args__ = ("parameters", "body")
+    __slots__ = ("_token", "parameters", "body", "layout")
 
     def __init__(
             self,
@@ -307,6 +380,7 @@ class FunctionLiteral(Expression):
         self._token = token
         self.parameters = parameters
         self.body = body
+        self.layout = None
 
     def token(self) -> Token:
         return self._token
@@ -314,12 +388,13 @@ class FunctionLiteral(Expression):
     def __str__(self) -> str:
         return f"{self.token_literal()}({', '.join(str(parameter) for parameter in self.parameters)}) {self.body}"
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return _items(self.parameters), self.body
 
 
 class HashLiteral(Expression):
     __match_args__ = ("pairs",)
+    __slots__ = ("_token", "pairs")
 
     def __init__(self, token: Token, pairs: dict[Expression, Expression]):
         self._token = token
@@ -333,5 +408,5 @@ class HashLiteral(Expression):
             ", ".join(f"{key}:{self.pairs[key]}" for key in self.pairs.keys())
         )
 
-    def __hash__(self):
-        return hash(str(self))
+    def _key(self) -> tuple:
+        return (_items(self.pairs.items()),)
@@ -0,0 +1,264 @@
+from operator import add, sub, mul, lt, gt, eq, ne
+
+from astree import (
+    IntegerLiteral,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BooleanLiteral,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    LetStatement,
+    Identifier,
+)
+from evaluator import Environment
+from objects import (
+    MError,
+    MObject,
+    MInteger,
+    MString,
+    MBoolean,
+    MFunction,
+    MArray,
+    IntBuffer,
+    TRUE,
+    FALSE,
+    numpy,
+    apply_function,
+)
+
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+
+_ARITHMETIC = {"+": add, "-": sub, "*": mul}
+_COMPARISONS = {"<": lt, ">": gt, "==": eq, "!=": ne}
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+def _to_object(value):
+    if isinstance(value, MObject):
+        return value
+    if isinstance(value, str):
+        return MString(value)
+    if isinstance(value, bool) or (numpy is not None and isinstance(value, numpy.bool_)):
+        return TRUE if value else FALSE
+    # else:
+    return MInteger(int(value))
+
+
+def _unsupported(index: int, values) -> MError | None:
+    # An error for a column holding anything but ints, bools, strs and MObjects.
+    # Floats are not truncated and None is not passed on as an argument
+    if numpy is not None and isinstance(values, numpy.ndarray) and values.dtype.kind in "biuU":
+        return None
+    for value in values:
+        if isinstance(value, (MObject, str, int)):
+            continue
+        if numpy is not None and isinstance(value, (numpy.integer, numpy.bool_)):
+            continue
+        type_name = value.dtype.name if hasattr(value, "dtype") else type(value).__name__
+        return MError(
+            f"column {index} holds {type_name}, expected integers, booleans or strings"
+        )
+    return None
+
+
+def _column(values):
+    # an int64 or bool vector, or None when the column holds anything else
+    if isinstance(values, numpy.ndarray):
+        if values.dtype == numpy.bool_:
+            return values
+        if not numpy.issubdtype(values.dtype, numpy.integer):
+            return None
+        if values.dtype == numpy.uint64 and len(values) > 0 and int(values.max()) > _INT64_MAX:
+            return None
+        return values.astype(numpy.int64)
+    elements = []
+    kind = None
+    for value in values:
+        if isinstance(value, MInteger) or isinstance(value, MBoolean):
+            value = value.value
+        value_kind = type(value)
+        if value_kind is not int and value_kind is not bool:
+            return None
+        if kind is not None and value_kind is not kind:
+            return None
+        if value_kind is int and not _INT64_MIN <= value <= _INT64_MAX:
+            return None
+        kind = value_kind
+        elements.append(value)
+    return numpy.array(elements, dtype=numpy.bool_ if kind is bool else numpy.int64)
+
+
+def _bound(values) -> int:
+    if len(values) == 0:
+        return 0
+    return max(abs(int(values.min())), abs(int(values.max())))
+
+
+def _is_int(values) -> bool:
+    return values.dtype == numpy.int64
+
+
+class _Vectorizer:
+    # Evaluates a function body once over whole columns. Anything outside integer
+    # arithmetic, comparisons and if/else, or anything that could overflow int64,
+    # raises _NotVectorizable so the caller can fall back to one call per row
+    def __init__(self, env, rows: int):
+        self._env = env
+        self._rows = rows
+
+    def _full(self, value, dtype):
+        return numpy.full(self._rows, value, dtype=dtype)
+
+    def block(self, block: BlockStatement, scope: dict, tail: bool):
+        statements = block.statements
+        if len(statements) == 0:
+            raise _NotVectorizable()
+        scope = dict(scope)
+        for statement in statements[:-1]:
+            match statement:
+                case LetStatement(name, value):
+                    scope[name.value] = self.expression(value, scope, False)
+                case _:
+                    raise _NotVectorizable()
+        match statements[-1]:
+            case ExpressionStatement(expression):
+                return self.expression(expression, scope, tail)
+            case ReturnStatement(value) if tail:
+                return self.expression(value, scope, False)
+            case _:
+                raise _NotVectorizable()
+
+    def expression(self, node, scope: dict, tail: bool):
+        match node:
+            case IntegerLiteral(value):
+                if not _INT64_MIN <= value <= _INT64_MAX:
+                    raise _NotVectorizable()
+                return self._full(value, numpy.int64)
+            case BooleanLiteral(value):
+                return self._full(value, numpy.bool_)
+            case Identifier(value):
+                return self._identifier(value, scope)
+            case PrefixExpression("-", right):
+                values = self.expression(right, scope, False)
+                if not _is_int(values) or _bound(values) > _INT64_MAX:
+                    raise _NotVectorizable()
+                return -values
+            case PrefixExpression("!", right):
+                values = self.expression(right, scope, False)
+                if _is_int(values):
+                    # every integer is truthy
+                    return self._full(False, numpy.bool_)
+                return ~values
+            case InfixExpression(left, operator, right):
+                return self._infix(
+                    operator,
+                    self.expression(left, scope, False),
+                    self.expression(right, scope, False),
+                )
+            case IfExpression() if node.alternative is not None:
+                return self._if(node, scope, tail)
+            case _:
+                raise _NotVectorizable()
+
+    def _identifier(self, name: str, scope: dict):
+        values = scope.get(name, None)
+        if values is not None:
+            return values
+        if not isinstance(self._env, Environment):
+            raise _NotVectorizable()
+        value = self._env[name]
+        if type(value) is MBoolean:
+            return self._full(value.value, numpy.bool_)
+        if type(value) is MInteger and type(value.value) is int:
+            if _INT64_MIN <= value.value <= _INT64_MAX:
+                return self._full(value.value, numpy.int64)
+        raise _NotVectorizable()
+
+    def _infix(self, operator: str, left, right):
+        if _is_int(left) and _is_int(right):
+            arithmetic = _ARITHMETIC.get(operator, None)
+            if arithmetic is not None:
+                left_bound = _bound(left)
+                right_bound = _bound(right)
+                if operator == "*":
+                    bound = left_bound * right_bound
+                else:
+                    bound = left_bound + right_bound
+                if bound > _INT64_MAX:
+                    raise _NotVectorizable()
+                return arithmetic(left, right)
+            comparison = _COMPARISONS.get(operator, None)
+            if comparison is not None:
+                return comparison(left, right)
+        elif not _is_int(left) and not _is_int(right) and operator in ("==", "!="):
+            return _COMPARISONS[operator](left, right)
+        raise _NotVectorizable()
+
+    def _if(self, node: IfExpression, scope: dict, tail: bool):
+        condition = self.expression(node.condition, scope, False)
+        if _is_int(condition) or condition.all():
+            return self.block(node.consequence, scope, tail)
+        if not condition.any():
+            return self.block(node.alternative, scope, tail)
+        # else: both branches run over every row, and the condition picks per row
+        consequence = self.block(node.consequence, scope, tail)
+        alternative = self.block(node.alternative, scope, tail)
+        if consequence.dtype != alternative.dtype:
+            raise _NotVectorizable()
+        return numpy.where(condition, consequence, alternative)
+
+
+def _vectorize(function: MFunction, columns: list, rows: int):
+    # the results as a vector, or None when the call has to run row by row
+    if numpy is None:
+        return None
+    scope = {}
+    for parameter, values in zip(function.parameters, columns):
+        column = _column(values)
+        if column is None:
+            return None
+        scope[parameter.value] = column
+    try:
+        return _Vectorizer(function.env, rows).block(function.body, scope, True)
+    except _NotVectorizable:
+        return None
+
+
+def call_batch(function: MFunction, columns: list) -> MArray | MError:
+    # Calls function once per row, where row i takes the i-th value of every
+    # column as its arguments. Values can be Python ints, bools, strs or MObjects;
+    # a column holding anything else is an MError before any call is made
+    if len(columns) == 0:
+        raise ValueError("call_batch needs at least one column")
+    rows = len(columns[0])
+    for column in columns:
+        if len(column) != rows:
+            raise ValueError(f"columns differ in length: {rows} and {len(column)}")
+    if isinstance(function, MFunction) and len(columns) < len(function.parameters):
+        raise ValueError(
+            f"{len(function.parameters)} parameters but only {len(columns)} columns"
+        )
+    for index, column in enumerate(columns):
+        error = _unsupported(index, column)
+        if error is not None:
+            return error
+
+    if isinstance(function, MFunction):
+        results = _vectorize(function, columns, rows)
+        if results is not None:
+            if _is_int(results):
+                return MArray(IntBuffer(results))
+            # else:
+            return MArray([TRUE if result else FALSE for result in results.tolist()])
+
+    results = []
+    for row in range(rows):
+        args = [_to_object(column[row]) for column in columns]
+        results.append(apply_function(function, args))
+    return MArray(results)
@@ -1,9 +1,25 @@
+import argparse
 import time
 
-from evaluator import Environment, evaluate
+import closure_compiler
+import evaluator
+import memoize
+import stack_evaluator
+import transpiler
+import vm
+from evaluator import Environment
 from lexer import Lexer
 from parser import Parser
 
+ENGINES = {
+    "eval": evaluator.evaluate,
+    "stack": stack_evaluator.evaluate,
+    "closures": closure_compiler.evaluate,
+    "vm": vm.evaluate,
+    "transpiler": transpiler.evaluate,
+    "memoize": memoize.evaluate,
+}
+
 
 def _measure(body):
     start = time.perf_counter()
@@ -28,6 +44,51 @@ def _fast_input(size):
     )
 
 
+def _closures_input(size):
+    # reads the parameters and a local of the enclosing function in a nested one
+    return (
+        """
+        let outer = fn(a, b) {
+        let c = a + b;
+        let inner = fn(n) {
+            if (n < 2) {
+                a
+            } else {
+                inner(n - 1) + inner(n - 2) + b + c
+            }
+        };
+        inner("""
+        + str(size)
+        + """);
+    };
+    outer(1, 2);"""
+    )
+
+
+def _operators_input(size):
+    # string concatenation, boolean operators and comparisons besides arithmetic
+    return (
+        """
+        let build = fn(n, flag) {
+        if (n < 2) {
+            if (flag) { "a" } else { "b" }
+        } else {
+            build(n - 1, !flag) + build(n - 2, flag == false)
+        }
+    };
+    len(build("""
+        + str(size)
+        + """, true));"""
+    )
+
+
+PROGRAMS = {
+    "fibonacci": (_fast_input, 35),
+    "closures": (_closures_input, 25),
+    "operators": (_operators_input, 25),
+}
+
+
 def _parse(input_source):
     lexer = Lexer(input_source)
     parser = Parser(lexer)
@@ -35,8 +96,14 @@ def _parse(input_source):
 
 
 def main():
-    env = Environment()
-    _measure(lambda: evaluate(_parse(_fast_input(35)), env))
+    arg_parser = argparse.ArgumentParser(description="Run a benchmark program")
+    arg_parser.add_argument("--engine", choices=ENGINES.keys(), default="eval")
+    arg_parser.add_argument("--program", choices=PROGRAMS.keys(), default="fibonacci")
+    args = arg_parser.parse_args()
+    evaluate = ENGINES[args.engine]
+    make_input, size = PROGRAMS[args.program]
+    env = memoize.MemoizingEnvironment() if args.engine == "memoize" else Environment()
+    _measure(lambda: evaluate(_parse(make_input(size)), env))
 
 
 if __name__ == "__main__":
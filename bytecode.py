@@ -0,0 +1,113 @@
+from enum import IntEnum, auto
+from typing import NamedTuple
+
+
+class Opcode(IntEnum):
+    CONSTANT = auto()
+    STRING = auto()
+    TRUE = auto()
+    FALSE = auto()
+    NULL = auto()
+    NONE = auto()
+    POP = auto()
+    ADD = auto()
+    SUB = auto()
+    MUL = auto()
+    DIV = auto()
+    EQUAL = auto()
+    NOT_EQUAL = auto()
+    GREATER_THAN = auto()
+    LESS_THAN = auto()
+    MINUS = auto()
+    BANG = auto()
+    JUMP = auto()
+    JUMP_NOT_TRUTHY = auto()
+    GET_GLOBAL = auto()
+    SET_GLOBAL = auto()
+    GET_LOCAL = auto()
+    SET_LOCAL = auto()
+    GET_FREE = auto()
+    ARRAY = auto()
+    HASH_KEY = auto()
+    HASH = auto()
+    INDEX = auto()
+    CALL = auto()
+    RETURN_VALUE = auto()
+    CLOSURE = auto()
+
+
+class Definition(NamedTuple):
+    name: str
+    operand_widths: tuple[int, ...]
+
+
+DEFINITIONS = {
+    Opcode.CONSTANT: Definition("OpConstant", (2,)),
+    Opcode.STRING: Definition("OpString", (2,)),
+    Opcode.TRUE: Definition("OpTrue", ()),
+    Opcode.FALSE: Definition("OpFalse", ()),
+    Opcode.NULL: Definition("OpNull", ()),
+    Opcode.NONE: Definition("OpNone", ()),
+    Opcode.POP: Definition("OpPop", ()),
+    Opcode.ADD: Definition("OpAdd", ()),
+    Opcode.SUB: Definition("OpSub", ()),
+    Opcode.MUL: Definition("OpMul", ()),
+    Opcode.DIV: Definition("OpDiv", ()),
+    Opcode.EQUAL: Definition("OpEqual", ()),
+    Opcode.NOT_EQUAL: Definition("OpNotEqual", ()),
+    Opcode.GREATER_THAN: Definition("OpGreaterThan", ()),
+    Opcode.LESS_THAN: Definition("OpLessThan", ()),
+    Opcode.MINUS: Definition("OpMinus", ()),
+    Opcode.BANG: Definition("OpBang", ()),
+    Opcode.JUMP: Definition("OpJump", (2,)),
+    Opcode.JUMP_NOT_TRUTHY: Definition("OpJumpNotTruthy", (2,)),
+    Opcode.GET_GLOBAL: Definition("OpGetGlobal", (2,)),
+    Opcode.SET_GLOBAL: Definition("OpSetGlobal", (2,)),
+    Opcode.GET_LOCAL: Definition("OpGetLocal", (1,)),
+    Opcode.SET_LOCAL: Definition("OpSetLocal", (1,)),
+    Opcode.GET_FREE: Definition("OpGetFree", (1, 1)),
+    Opcode.ARRAY: Definition("OpArray", (2,)),
+    Opcode.HASH_KEY: Definition("OpHashKey", ()),
+    Opcode.HASH: Definition("OpHash", (2,)),
+    Opcode.INDEX: Definition("OpIndex", ()),
+    Opcode.CALL: Definition("OpCall", (1,)),
+    Opcode.RETURN_VALUE: Definition("OpReturnValue", ()),
+    Opcode.CLOSURE: Definition("OpClosure", (2,)),
+}
+
+
+def lookup(op: int) -> Definition:
+    try:
+        return DEFINITIONS[Opcode(op)]
+    except ValueError as error:
+        raise ValueError(f"opcode {op} undefined") from error
+
+
+def make(op: Opcode, *operands: int) -> bytes:
+    definition = DEFINITIONS[op]
+    instruction = bytearray([op])
+    for operand, width in zip(operands, definition.operand_widths):
+        instruction.extend(operand.to_bytes(width, "big"))
+    return bytes(instruction)
+
+
+def read_operands(definition: Definition, instructions: bytes, offset: int):
+    operands = []
+    for width in definition.operand_widths:
+        operands.append(
+            int.from_bytes(instructions[offset: offset + width], "big")
+        )
+        offset += width
+    return operands, offset
+
+
+def instructions_to_str(instructions: bytes) -> str:
+    lines = []
+    i = 0
+    while i < len(instructions):
+        definition = lookup(instructions[i])
+        operands, next_offset = read_operands(definition, instructions, i + 1)
+        text = " ".join([definition.name] + [str(operand) for operand in operands])
+        lines.append(f"{i:04d} {text}")
+        i = next_offset
+    return "\n".join(lines) + "\n" if lines else ""
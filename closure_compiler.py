@@ -0,0 +1,462 @@
+from operator import add, sub, mul, lt, gt, eq, ne
+from typing import Callable
+
+from astree import (
+    Program,
+    IntegerLiteral,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BooleanLiteral,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    StringLiteral,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+    Statement,
+)
+from evaluator import (
+    Environment,
+    _Return,
+    _SLOTS_START,
+    _lookup_global,
+    _lookup_unbound,
+    _new_string,
+    _infix_operator,
+    _eval_prefix_expression,
+    _eval_index_expression,
+    _is_truthy,
+)
+from objects import (
+    MError,
+    MInteger,
+    MObject,
+    MBoolean,
+    TRUE,
+    FALSE,
+    NULL,
+    MFunction,
+    MArray,
+    MHash,
+    MValue,
+    HashPair,
+    apply_function,
+)
+from resolver import Address, FunctionLayout, Resolution, resolve
+
+Code = Callable[[Environment | list], MObject | None]
+
+
+class CompiledFunction(MFunction):
+    def __init__(self, parameters, body, env, code: Code, layout: FunctionLayout):
+        super().__init__(parameters, body, env, layout)
+        self.code = code
+
+    def type_desc(self) -> str:
+        return MFunction.__name__
+
+    def apply(self, args: list):
+        return _box(_call(self, [_unbox(arg) for arg in args]))
+
+
+def _box(value):
+    # Integers and booleans travel unboxed inside the closures. They are only
+    # wrapped when they reach the Environment, a container, a builtin or the caller
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return MInteger(value)
+    if value_type is bool:
+        return TRUE if value else FALSE
+    # else:
+    return value
+
+
+def _unbox(value):
+    value_type = type(value)
+    if value_type is MInteger or value_type is MBoolean:
+        return value.value
+    # else:
+    return value
+
+
+def _call(function, args):
+    if type(function) is CompiledFunction:
+        layout = function.layout
+        num_parameters = layout.num_parameters
+        if len(args) < num_parameters:
+            return MError(
+                f"wrong number of arguments. got={len(args)}, want={num_parameters}"
+            )
+        frame = [function.env, layout]
+        frame += args[:num_parameters]
+        if len(layout.names) > num_parameters:
+            frame += [None] * (len(layout.names) - num_parameters)
+        try:
+            return function.code(frame)
+        except _Return as returned:
+            return returned.value
+    # else:
+    return _unbox(apply_function(_box(function), [_box(arg) for arg in args]))
+
+
+def _compile_global(name: str, level: int) -> Code:
+    def global_identifier(frame):
+        for _ in range(level):
+            frame = frame[0]
+        value = frame.store.get(name, None)
+        if value is not None:
+            return _unbox(value)
+        return _unbox(_lookup_global(name, frame))
+
+    return global_identifier
+
+
+def _compile_local(name: str, address: Address) -> Code:
+    depth = address.depth
+    index = address.slot + _SLOTS_START
+
+    if depth == 0:
+
+        def local(frame):
+            value = frame[index]
+            if value is None:
+                return _unbox(_lookup_unbound(name, frame[0]))
+            return value
+
+        return local
+
+    def free(frame):
+        for _ in range(depth):
+            frame = frame[0]
+        value = frame[index]
+        if value is None:
+            return _unbox(_lookup_unbound(name, frame[0]))
+        return value
+
+    return free
+
+
+_INT_OPERATORS = {
+    "+": add,
+    "-": sub,
+    "*": mul,
+    "<": lt,
+    ">": gt,
+    "==": eq,
+    "!=": ne,
+}
+
+
+def _compile_infix(operator: str, left: Code, right: Code) -> Code:
+    dispatch = _infix_operator(operator)
+
+    def boxed(lhs, rhs):
+        return _unbox(dispatch(_box(lhs), _box(rhs)))
+
+    match operator:
+        case "+":
+
+            def plus(env):
+                lhs = left(env)
+                if type(lhs) is MError:
+                    return lhs
+                rhs = right(env)
+                if type(rhs) is MError:
+                    return rhs
+                if type(lhs) is int and type(rhs) is int:
+                    return lhs + rhs
+                return boxed(lhs, rhs)
+
+            return plus
+        case "-":
+
+            def minus(env):
+                lhs = left(env)
+                if type(lhs) is MError:
+                    return lhs
+                rhs = right(env)
+                if type(rhs) is MError:
+                    return rhs
+                if type(lhs) is int and type(rhs) is int:
+                    return lhs - rhs
+                return boxed(lhs, rhs)
+
+            return minus
+        case "<":
+
+            def less_than(env):
+                lhs = left(env)
+                if type(lhs) is MError:
+                    return lhs
+                rhs = right(env)
+                if type(rhs) is MError:
+                    return rhs
+                if type(lhs) is int and type(rhs) is int:
+                    return lhs < rhs
+                return boxed(lhs, rhs)
+
+            return less_than
+        case _:
+            int_operator = _INT_OPERATORS.get(operator, None)
+
+            def infix(env):
+                lhs = left(env)
+                if type(lhs) is MError:
+                    return lhs
+                rhs = right(env)
+                if type(rhs) is MError:
+                    return rhs
+                if int_operator is not None and type(lhs) is int and type(rhs) is int:
+                    return int_operator(lhs, rhs)
+                return boxed(lhs, rhs)
+
+            return infix
+
+
+def _compile_prefix(operator: str, right: Code) -> Code:
+    def prefix(env):
+        r = right(env)
+        if type(r) is MError:
+            return r
+        return _unbox(_eval_prefix_expression(operator, _box(r)))
+
+    return prefix
+
+
+def _compile_block(statements: list[Code]) -> Code:
+    if len(statements) == 1:
+        return statements[0]
+
+    def block(env):
+        result = None
+        for statement in statements:
+            result = statement(env)
+            if type(result) is MError:
+                return result
+        return result
+
+    return block
+
+
+def _compile_if(condition: Code, consequence: Code, alternative: Code | None) -> Code:
+    def if_expression(env):
+        c = condition(env)
+        if type(c) is MError:
+            return c
+        if c is True or (c is not False and _is_truthy(c)):
+            return consequence(env)
+        if alternative is not None:
+            return alternative(env)
+        # else:
+        return NULL
+
+    return if_expression
+
+
+def _compile_call(function: Code, arguments: list[Code]) -> Code:
+    def call(env):
+        f = function(env)
+        if type(f) is MError:
+            return f
+        args = []
+        for argument in arguments:
+            evaluated = argument(env)
+            if type(evaluated) is MError:
+                return evaluated
+            args.append(evaluated)
+        return _call(f, args)
+
+    return call
+
+
+def _compile_return(value: Code) -> Code:
+    # a return exits the whole function call, even from within an expression
+    def return_statement(env):
+        v = value(env)
+        if type(v) is MError:
+            return v
+        raise _Return(v)
+
+    return return_statement
+
+
+def _compile_let_global(name: str, value: Code) -> Code:
+    def let_statement(env):
+        v = value(env)
+        if type(v) is MError:
+            return v
+        env.store[name] = _box(v)
+        return None
+
+    return let_statement
+
+
+def _compile_let_local(address: Address, value: Code) -> Code:
+    index = address.slot + _SLOTS_START
+
+    def let_statement(frame):
+        v = value(frame)
+        if type(v) is MError:
+            return v
+        frame[index] = v
+        return None
+
+    return let_statement
+
+
+def _compile_index(left: Code, index: Code) -> Code:
+    def index_expression(env):
+        obj = left(env)
+        if type(obj) is MError:
+            return obj
+        i = index(env)
+        if type(i) is MError:
+            return i
+        return _unbox(_eval_index_expression(_box(obj), _box(i)))
+
+    return index_expression
+
+
+def _compile_hash(pairs: list[tuple[Code, Code]]) -> Code:
+    def hash_literal(env):
+        result = {}
+        for key_code, value_code in pairs:
+            key = key_code(env)
+            if type(key) is MError:
+                return key
+            key = _box(key)
+            if not isinstance(key, MValue):
+                return MError(f"unusable as hash key: {key.type_desc()}")
+            value = value_code(env)
+            if type(value) is MError:
+                return value
+            result[key.hash_key()] = HashPair(key, _box(value))
+        return MHash(result)
+
+    return hash_literal
+
+
+def _compile_array(elements: list[Code]) -> Code:
+    def array_literal(env):
+        result = []
+        for element in elements:
+            evaluated = element(env)
+            if type(evaluated) is MError:
+                return evaluated
+            result.append(_box(evaluated))
+        return MArray(result)
+
+    return array_literal
+
+
+def _constant(value) -> Code:
+    return lambda env: value
+
+
+class _Compiler:
+    def __init__(self, resolution: Resolution):
+        self._resolution = resolution
+        self._level = 0
+
+    def compile(self, node: Statement | None) -> Code:
+        match node:
+            case Identifier(value):
+                address = self._resolution.address(node)
+                if address is None:
+                    return _compile_global(value, self._level)
+                # else:
+                return _compile_local(value, address)
+            case IntegerLiteral(value):
+                return _constant(value)
+            case InfixExpression(left, operator, right):
+                return _compile_infix(operator, self.compile(left), self.compile(right))
+            case BlockStatement():
+                return _compile_block(
+                    [self.compile(statement) for statement in node.statements]
+                )
+            case ExpressionStatement(expression):
+                return self.compile(expression)
+            case IfExpression():
+                alternative = (
+                    None if node.alternative is None else self.compile(node.alternative)
+                )
+                return _compile_if(
+                    self.compile(node.condition),
+                    self.compile(node.consequence),
+                    alternative,
+                )
+            case CallExpression(function, arguments):
+                return _compile_call(
+                    self.compile(function),
+                    [self.compile(argument) for argument in arguments],
+                )
+            case ReturnStatement(value):
+                return _compile_return(self.compile(value))
+            case PrefixExpression(operator, right):
+                return _compile_prefix(operator, self.compile(right))
+            case BooleanLiteral(value):
+                return _constant(value)
+            case LetStatement(name, value):
+                address = self._resolution.address(name)
+                if address is None:
+                    return _compile_let_global(name.value, self.compile(value))
+                # else:
+                return _compile_let_local(address, self.compile(value))
+            case FunctionLiteral():
+                return self._compile_function(node)
+            case StringLiteral(value):
+                return lambda env: _new_string(value)
+            case IndexExpression(left, index):
+                return _compile_index(self.compile(left), self.compile(index))
+            case HashLiteral(pairs):
+                return _compile_hash(
+                    [
+                        (self.compile(key), self.compile(value))
+                        for key, value in pairs.items()
+                    ]
+                )
+            case ArrayLiteral(elements):
+                return _compile_array([self.compile(element) for element in elements])
+            case _:
+                return _constant(None)
+
+    def _compile_function(self, node: FunctionLiteral) -> Code:
+        parameters = node.parameters
+        body = node.body
+        layout = self._resolution.layout(node)
+        self._level += 1
+        code = self.compile(body)
+        self._level -= 1
+
+        def function_literal(frame):
+            return CompiledFunction(parameters, body, frame, code, layout)
+
+        return function_literal
+
+
+def compile_program(program: Program) -> Code:
+    compiler = _Compiler(resolve(program))
+    statements = [compiler.compile(statement) for statement in program.statements]
+
+    def run(env):
+        result = None
+        try:
+            for statement in statements:
+                result = statement(env)
+                if type(result) is MError:
+                    return result
+        except _Return as returned:
+            return _box(returned.value)
+        return _box(result)
+
+    return run
+
+
+def evaluate(program: Program, env: Environment):
+    return compile_program(program)(env)
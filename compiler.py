@@ -0,0 +1,243 @@
+from typing import NamedTuple
+
+from astree import (
+    Node,
+    Program,
+    IntegerLiteral,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BooleanLiteral,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    StringLiteral,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+)
+from bytecode import DEFINITIONS, Opcode, make
+from objects import MInteger
+from resolver import Resolution, resolve
+
+MAX_LOCALS = 256
+
+_INFIX_OPCODES = {
+    "+": Opcode.ADD,
+    "-": Opcode.SUB,
+    "*": Opcode.MUL,
+    "/": Opcode.DIV,
+    "==": Opcode.EQUAL,
+    "!=": Opcode.NOT_EQUAL,
+    ">": Opcode.GREATER_THAN,
+    "<": Opcode.LESS_THAN,
+}
+
+_PREFIX_OPCODES = {"-": Opcode.MINUS, "!": Opcode.BANG}
+
+
+class CompilationError(Exception):
+    pass
+
+
+def _make(op: Opcode, *operands: int) -> bytes:
+    # operands that do not fit their width would fail in int.to_bytes
+    definition = DEFINITIONS[op]
+    for operand, width in zip(operands, definition.operand_widths):
+        limit = (1 << (8 * width)) - 1
+        if operand > limit:
+            raise CompilationError(f"{definition.name} operand too large: {operand}, max={limit}")
+    return make(op, *operands)
+
+
+class FunctionCode(NamedTuple):
+    instructions: bytes
+    num_parameters: int
+    names: tuple[str, ...]
+    slots: dict[str, int]
+    parameters: list[Identifier]
+    body: BlockStatement
+    constants: list
+
+
+class Bytecode(NamedTuple):
+    instructions: bytes
+    constants: list
+
+
+class CompilationScope:
+    def __init__(self):
+        self.instructions = bytearray()
+
+
+class Compiler:
+    def __init__(self):
+        self.constants = []
+        self._constant_indexes = {}
+        self._scopes = [CompilationScope()]
+        self._resolution = Resolution()
+
+    def bytecode(self) -> Bytecode:
+        return Bytecode(bytes(self._scope().instructions), self.constants)
+
+    def compile_program(self, program: Program):
+        self._resolution = resolve(program)
+        self._compile_statements(program.statements)
+        self._emit(Opcode.RETURN_VALUE)
+
+    def _scope(self) -> CompilationScope:
+        return self._scopes[-1]
+
+    def _emit(self, op: Opcode, *operands: int) -> int:
+        instructions = self._scope().instructions
+        position = len(instructions)
+        instructions.extend(_make(op, *operands))
+        return position
+
+    def _change_operand(self, position: int, operand: int):
+        instructions = self._scope().instructions
+        op = Opcode(instructions[position])
+        instructions[position: position + 3] = _make(op, operand)
+
+    def _add_constant(self, value, key=None) -> int:
+        key = (type(value), value if key is None else key)
+        index = self._constant_indexes.get(key, None)
+        if index is None:
+            index = len(self.constants)
+            self.constants.append(value)
+            self._constant_indexes[key] = index
+        return index
+
+    def _compile_statements(self, statements: list):
+        if len(statements) == 0:
+            self._emit(Opcode.NONE)
+            return
+        last = len(statements) - 1
+        for i, statement in enumerate(statements):
+            self._compile_statement(statement, keep_value=i == last)
+
+    def _compile_statement(self, node, keep_value: bool):
+        match node:
+            case LetStatement(name, value):
+                self._compile(value)
+                self._emit_set(name)
+                if keep_value:
+                    self._emit(Opcode.NONE)
+            case ReturnStatement(value):
+                self._compile(value)
+                self._emit(Opcode.RETURN_VALUE)
+            case ExpressionStatement(expression):
+                self._compile(expression)
+                if not keep_value:
+                    self._emit(Opcode.POP)
+            case _:
+                if keep_value:
+                    self._emit(Opcode.NONE)
+
+    def _emit_set(self, name: Identifier):
+        address = self._resolution.address(name)
+        if address is None:
+            self._emit(Opcode.SET_GLOBAL, self._add_constant(name.value))
+        else:
+            self._emit(Opcode.SET_LOCAL, address.slot)
+
+    def _emit_get(self, identifier: Identifier):
+        address = self._resolution.address(identifier)
+        if address is None:
+            self._emit(Opcode.GET_GLOBAL, self._add_constant(identifier.value))
+        elif address.depth == 0:
+            self._emit(Opcode.GET_LOCAL, address.slot)
+        else:
+            self._emit(Opcode.GET_FREE, address.depth, address.slot)
+
+    def _compile(self, node: Node | None):
+        match node:
+            case Identifier():
+                self._emit_get(node)
+            case IntegerLiteral(value):
+                self._emit(Opcode.CONSTANT, self._add_constant(MInteger(value), value))
+            case InfixExpression(left, operator, right):
+                self._compile(left)
+                self._compile(right)
+                self._emit(_INFIX_OPCODES[operator])
+            case PrefixExpression(operator, right):
+                self._compile(right)
+                self._emit(_PREFIX_OPCODES[operator])
+            case BooleanLiteral(value):
+                self._emit(Opcode.TRUE if value else Opcode.FALSE)
+            case StringLiteral(value):
+                self._emit(Opcode.STRING, self._add_constant(value))
+            case IfExpression():
+                self._compile_if(node)
+            case BlockStatement(statements=statements):
+                self._compile_statements(statements)
+            case CallExpression(function, arguments):
+                self._compile(function)
+                for argument in arguments:
+                    self._compile(argument)
+                self._emit(Opcode.CALL, len(arguments))
+            case FunctionLiteral():
+                self._compile_function(node)
+            case IndexExpression(left, index):
+                self._compile(left)
+                self._compile(index)
+                self._emit(Opcode.INDEX)
+            case ArrayLiteral(elements):
+                for element in elements:
+                    self._compile(element)
+                self._emit(Opcode.ARRAY, len(elements))
+            case HashLiteral(pairs):
+                for key, value in pairs.items():
+                    self._compile(key)
+                    self._emit(Opcode.HASH_KEY)
+                    self._compile(value)
+                self._emit(Opcode.HASH, len(pairs))
+            case _:
+                self._emit(Opcode.NONE)
+
+    def _compile_if(self, node: IfExpression):
+        self._compile(node.condition)
+        jump_not_truthy = self._emit(Opcode.JUMP_NOT_TRUTHY, 0)
+        self._compile(node.consequence)
+        jump = self._emit(Opcode.JUMP, 0)
+        self._change_operand(jump_not_truthy, len(self._scope().instructions))
+        if node.alternative is None:
+            self._emit(Opcode.NULL)
+        else:
+            self._compile(node.alternative)
+        self._change_operand(jump, len(self._scope().instructions))
+
+    def _compile_function(self, node: FunctionLiteral):
+        layout = self._resolution.layout(node)
+        if len(layout.names) > MAX_LOCALS:
+            raise CompilationError(
+                f"too many local bindings: {len(layout.names)}, max={MAX_LOCALS}"
+            )
+
+        self._scopes.append(CompilationScope())
+        self._compile(node.body)
+        self._emit(Opcode.RETURN_VALUE)
+        scope = self._scopes.pop()
+
+        code = FunctionCode(
+            bytes(scope.instructions),
+            layout.num_parameters,
+            layout.names,
+            layout.slots,
+            node.parameters,
+            node.body,
+            self.constants,
+        )
+        index = len(self.constants)
+        self.constants.append(code)
+        self._emit(Opcode.CLOSURE, index)
+
+
+def compile_program(program: Program) -> Bytecode:
+    compiler = Compiler()
+    compiler.compile_program(program)
+    return compiler.bytecode()
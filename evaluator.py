@@ -1,3 +1,6 @@
+from operator import add, sub, mul, truediv, lt, gt, eq, ne
+from typing import NamedTuple
+
 from astree import (
     Node,
     Program,
@@ -19,7 +22,6 @@ from astree import (
     ArrayLiteral, Statement,
 )
 from objects import (
-    MReturnValue,
     MError,
     MInteger,
     MObject,
@@ -30,13 +32,23 @@ from objects import (
     NULL,
     MNull,
     MFunction,
+    MemoizedFunction,
     MBuiltinFunction,
     BUILTINS,
     MArray,
+    elementwise,
     MHash,
     MValue,
+    Hashable,
     HashPair,
 )
+from resolver import GLOBAL, function_layout, resolve
+
+# Function frames are plain lists: [outer frame, layout, slot 0, slot 1, ...], where
+# the layout has the names and slots of the function, like FunctionLayout. The
+# outermost frame is the Environment holding the globals. closure_compiler.py and
+# vm.py use the same frames
+_SLOTS_START = 2
 
 
 class Environment:
@@ -48,19 +60,41 @@ class Environment:
         self.store[key] = value
 
     def __getitem__(self, key):
-        obj = self.store.get(key, None)
-        return self.outer[key] if obj is None and self.outer is not None else obj
+        env = self
+        while env is not None:
+            obj = env.store.get(key, None)
+            if obj is not None:
+                return obj
+            env = env.outer
+        return None
+
+
+class _Return(Exception):
+    # Unwinds to the function call (or program) that the return statement exits
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Abort(Exception):
+    # A runtime error aborts the whole evaluation
+    __slots__ = ("error",)
+
+    def __init__(self, error: MError):
+        self.error = error
+
+
+def _check(obj):
+    if type(obj) is MError:
+        raise _Abort(obj)
+    return obj
 
 
 def _eval_block_statement(block_statement: BlockStatement, env):
     result = None
     for statement in block_statement.statements:
         result = _evaluate(statement, env)
-        match result:
-            case MReturnValue():
-                return result
-            case MError():
-                return result
     return result
 
 
@@ -92,109 +126,313 @@ def _eval_prefix_expression(operator, right):
             return MError(f"Unknown operator : {operator}{right.type_desc()}")
 
 
-def _eval_infix_expression(operator: str, left: MObject, right: MObject):
-    exp = (left, operator, right)
-    match exp:
-        case (MInteger(), "+", MInteger()):
-            return left + right
-        case (MInteger(), "-", MInteger()):
-            return left - right
-        case (MInteger(), "*", MInteger()):
-            return left * right
-        case (MInteger(), "/", MInteger()):
-            return left / right
-        case (MInteger(), "<", MInteger()):
-            return _to_monkey(left < right)
-        case (MInteger(), ">", MInteger()):
-            return _to_monkey(left > right)
-        case (MInteger(), "==", MInteger()):
-            return _to_monkey(left == right)
-        case (MInteger(), "!=", MInteger()):
-            return _to_monkey(left != right)
-        case (_, "==", _):
+_INFIX_HANDLERS = {
+    (MInteger, "+", MInteger): lambda left, right: MInteger(left.value + right.value),
+    (MInteger, "-", MInteger): lambda left, right: MInteger(left.value - right.value),
+    (MInteger, "*", MInteger): lambda left, right: MInteger(left.value * right.value),
+    (MInteger, "/", MInteger): lambda left, right: MInteger(left.value / right.value),
+    (MInteger, "<", MInteger): lambda left, right: TRUE if left.value < right.value else FALSE,
+    (MInteger, ">", MInteger): lambda left, right: TRUE if left.value > right.value else FALSE,
+    (MInteger, "==", MInteger): lambda left, right: TRUE if left.value == right.value else FALSE,
+    (MInteger, "!=", MInteger): lambda left, right: TRUE if left.value != right.value else FALSE,
+    (MBoolean, "==", MBoolean): lambda left, right: TRUE if left.value == right.value else FALSE,
+    (MBoolean, "!=", MBoolean): lambda left, right: TRUE if left.value != right.value else FALSE,
+    (MString, "+", MString): lambda left, right: left + right,
+}
+
+
+def _elementwise_handler(operator: str):
+    def handler(left, right):
+        result = elementwise(operator, left, right)
+        if result is None:
+            return _eval_generic_infix_expression(operator, left, right)
+        # else:
+        return result
+
+    return handler
+
+
+for _operator in ("+", "-", "*", "/"):
+    _INFIX_HANDLERS[(MArray, _operator, MArray)] = _elementwise_handler(_operator)
+    _INFIX_HANDLERS[(MArray, _operator, MInteger)] = _elementwise_handler(_operator)
+    _INFIX_HANDLERS[(MInteger, _operator, MArray)] = _elementwise_handler(_operator)
+
+
+# Operators on plain Python numbers and booleans, for _evaluate_unboxed
+_UNBOXED_INFIX = {
+    "+": add,
+    "-": sub,
+    "*": mul,
+    "/": truediv,
+    "<": lt,
+    ">": gt,
+    "==": eq,
+    "!=": ne,
+}
+
+
+def _eval_generic_infix_expression(operator: str, left: MObject, right: MObject):
+    # Operand types without an entry in _INFIX_HANDLERS
+    match operator:
+        case "==":
             return _to_monkey(left == right)
-        case (_, "!=", _):
+        case "!=":
             return _to_monkey(left != right)
-        case (_, _, _) if left.type_desc() != right.type_desc():
+        case _ if left.type_desc() != right.type_desc():
             return MError(
                 f"type mismatch: {left.type_desc()} {operator} {right.type_desc()}"
             )
-        case (MString(), "+", MString()):
-            return left + right
-        case (_, _, _):
+        case _:
             return MError(
                 f"unknown operator: {left.type_desc()} {operator} {right.type_desc()}"
             )
 
 
-def _to_monkey(value: bool):
-    return MBoolean.from_bool(value)
+def _eval_infix_expression(operator: str, left: MObject, right: MObject):
+    handler = _INFIX_HANDLERS.get((type(left), operator, type(right)), None)
+    if handler is None:
+        return _eval_generic_infix_expression(operator, left, right)
+    # else:
+    return handler(left, right)
 
 
-def _eval_if_expression(if_expression: IfExpression, env):
-    def body(condition):
-        if _is_truthy(condition):
-            return _evaluate(if_expression.consequence, env)
-        if if_expression.alternative is not None:
-            return _evaluate(if_expression.alternative, env)
-        # else:
-        return NULL
+def _infix_operator(operator: str):
+    # Resolves the operator once, for engines that know it ahead of evaluation
+    handlers = {
+        (left, right): handler
+        for (left, handler_operator, right), handler in _INFIX_HANDLERS.items()
+        if handler_operator == operator
+    }
 
-    return _if_not_error(_evaluate(if_expression.condition, env), body)
+    def infix(left: MObject, right: MObject):
+        handler = handlers.get((type(left), type(right)), None)
+        if handler is None:
+            return _eval_generic_infix_expression(operator, left, right)
+        # else:
+        return handler(left, right)
 
+    return infix
 
-def _error(obj):
-    return isinstance(obj, MError)
 
+def _to_monkey(value: bool):
+    return MBoolean.from_bool(value)
 
-def _eval_expressions(arguments, env) -> list:
-    args = []
-    for argument in arguments:
-        evaluated = _evaluate(argument, env)
-        if _error(evaluated):
-            return [evaluated]
 
-        args.append(evaluated)
-    return args
+def _eval_if_expression(if_expression: IfExpression, env):
+    condition = _evaluate_unboxed(if_expression.condition, env)
+    if condition is True or (condition is not False and _is_truthy(condition)):
+        return _evaluate(if_expression.consequence, env)
+    if if_expression.alternative is not None:
+        return _evaluate(if_expression.alternative, env)
+    # else:
+    return NULL
 
 
-def _extend_function_env(function, args):
-    env = Environment({}, function.env)
-    for i, identifier in enumerate(function.parameters):
-        env[identifier.value] = args[i]
-    return env
+def _eval_expressions(arguments, env) -> list:
+    return [_evaluate(argument, env) for argument in arguments]
+
+
+def _function_frame(function: MFunction, args):
+    # The frame of a call, or an MError when arguments are missing
+    layout = function.layout
+    if layout is None:
+        # a function whose literal was not resolved, e.g. one built by hand
+        layout = function.layout = function_layout(function)
+    num_parameters = layout.num_parameters
+    if len(args) < num_parameters:
+        return MError(f"wrong number of arguments. got={len(args)}, want={num_parameters}")
+    frame = [function.env, layout]
+    frame += args[:num_parameters]
+    if len(layout.names) > num_parameters:
+        frame += [None] * (len(layout.names) - num_parameters)
+    return frame
+
+
+class _TailCall(NamedTuple):
+    function: MFunction
+    args: list
+
+
+def _eval_tail_call(call: CallExpression, env):
+    function = _evaluate(call.function, env)
+    args = _eval_expressions(call.arguments, env)
+    if type(function) is MFunction or type(function) is MemoizedFunction:
+        return _TailCall(function, args)
+    # else:
+    return _call(function, args)
 
 
-def _unwrap_return_value(evaluated):
-    match evaluated:
-        case MReturnValue(value):
-            return value
+def _eval_function_body(node: Statement, env, tail: bool):
+    # Follows the statement structure of a function body. Calls in tail position
+    # (the last expression, or `return f(...)`) come back as a _TailCall so
+    # _call can run them without growing the Python stack
+    match node:
+        case BlockStatement():
+            result = None
+            last = len(node.statements) - 1
+            for i, statement in enumerate(node.statements):
+                result = _eval_function_body(statement, env, tail and i == last)
+                if type(result) is _TailCall:
+                    return result
+            return result
+        case ReturnStatement(CallExpression() as call):
+            result = _eval_tail_call(call, env)
+            if type(result) is _TailCall:
+                return result
+            raise _Return(result)
+        case ExpressionStatement(CallExpression() as call) if tail:
+            return _eval_tail_call(call, env)
+        case ExpressionStatement(IfExpression() as if_expression):
+            condition = _evaluate_unboxed(if_expression.condition, env)
+            if condition is True or (condition is not False and _is_truthy(condition)):
+                return _eval_function_body(if_expression.consequence, env, tail)
+            if if_expression.alternative is not None:
+                return _eval_function_body(if_expression.alternative, env, tail)
+            # else:
+            return NULL
         case _:
+            return _evaluate(node, env)
+
+
+def _run_function(function: MFunction, args):
+    # Tail calls into a MemoizedFunction run here too, bypassing its cache
+    while True:
+        frame = _check(_function_frame(function, args))
+        try:
+            evaluated = _eval_function_body(function.body, frame, True)
+        except _Return as returned:
+            return returned.value
+        if type(evaluated) is not _TailCall:
             return evaluated
+        function, args = evaluated
+
+
+def _memo_key(args):
+    key = []
+    for arg in args:
+        if not isinstance(arg, Hashable):
+            return None
+        if type(arg) is MString:
+            # MString compares by identity, so the string itself is the key
+            key.append(arg)
+        else:
+            # the hash of a HashKey can collide, so the value itself is part of the
+            # key, with its exact type so that 2 and 2.0 stay apart
+            value = arg.value
+            key.append((type(arg), type(value), value))
+    return tuple(key)
+
+
+def _call_memoized(function: MemoizedFunction, args):
+    key = _memo_key(args[: len(function.parameters)])
+    if key is None:
+        return _run_function(function, args)
+    result = function.cache.get(key)
+    if result is None:
+        result = _run_function(function, args)
+        _cache_result(function, key, result)
+    return result
+
+
+def _cache_result(function: MemoizedFunction, key, result):
+    # MString compares by identity and arrays and hashes are mutable,
+    # so only results that compare by value can be shared between calls
+    if type(result) is MInteger or type(result) is MBoolean or result is NULL:
+        function.cache.put(key, result)
 
 
-def _apply_function(function, args):
+def _call(function, args):
     match function:
-        case MFunction():
-            extend_env = _extend_function_env(function, args)
-            evaluated = _evaluate(function.body, extend_env)
-            return _unwrap_return_value(evaluated)
+        case MemoizedFunction():
+            return _call_memoized(function, args)
+        case MFunction() if type(function) is MFunction:
+            return _run_function(function, args)
         case MBuiltinFunction():
             result = function.fn(args)
             if result is None:
                 return NULL
             # else:
-            return result
+            return _check(result)
+        case MFunction():
+            # a function made by another engine runs there
+            return _check(function.apply(args))
         case _:
-            return MError(f"not a function: {function.type_desc()}")
+            raise _Abort(MError(f"not a function: {function.type_desc()}"))
+
+
+def _apply_function(function: MFunction, args):
+    # MFunction.apply, for callers outside the tree-walker: errors come back as MError
+    try:
+        return _call(function, args)
+    except _Abort as aborted:
+        return aborted.error
+
+
+MFunction.tree_walker = _apply_function
 
 
-def _eval_identifier(identifier, env):
-    value = env[identifier]
+def _new_string(value: str) -> MString:
+    # MString compares by identity, so every evaluation of a string literal needs a
+    # fresh object
+    return MString(value)
+
+
+def _lookup_global(name: str, env: Environment):
+    value = env[name]
     if value is not None:
         return value
-    builtin = BUILTINS.get(identifier, None)
-    return MError(f"identifier not found: {identifier}") if builtin is None else builtin
+    builtin = BUILTINS.get(name, None)
+    return MError(f"identifier not found: {name}") if builtin is None else builtin
+
+
+def _lookup_unbound(name: str, frame):
+    # A local whose slot is still None was not assigned yet. Like the Environment
+    # chain that the frames replace, the name then resolves in the enclosing frames
+    # that did assign it, and finally in the globals
+    while type(frame) is list:
+        slot = frame[1].slots.get(name, None)
+        if slot is not None:
+            value = frame[slot + _SLOTS_START]
+            if value is not None:
+                return value
+        frame = frame[0]
+    return _lookup_global(name, frame)
+
+
+def _eval_identifier(identifier: Identifier, env):
+    address = identifier.address
+    if address is None:
+        return _lookup_unbound(identifier.value, env)
+    # else:
+    depth, slot = address
+    while depth:
+        env = env[0]
+        depth -= 1
+    if slot == GLOBAL:
+        value = env.store.get(identifier.value, None)
+        return _lookup_global(identifier.value, env) if value is None else value
+    # else:
+    value = env[slot + _SLOTS_START]
+    return _lookup_unbound(identifier.value, env[0]) if value is None else value
+
+
+def _assign(name: Identifier, value, env):
+    address = name.address
+    if address is None:
+        if type(env) is list:
+            env[env[1].slots[name.value] + _SLOTS_START] = value
+        else:
+            env[name.value] = value
+        return
+    # else:
+    depth, slot = address
+    while depth:
+        env = env[0]
+        depth -= 1
+    if slot == GLOBAL:
+        env[name.value] = value
+    else:
+        env[slot + _SLOTS_START] = value
 
 
 def _eval_hash_index_expression(pairs, index):
@@ -228,47 +466,122 @@ def _eval_hash_literal(hash_pairs, env):
     pairs = {}
     for key_node, value_node in hash_pairs.items():
         key = _evaluate(key_node, env)
-        if _error(key):
-            return key
         match key:
             case MValue():
-                value = _evaluate(value_node, env)
-                if _error(value):
-                    return value
-
-                pairs[key.hash_key()] = HashPair(key, value)
+                pairs[key.hash_key()] = HashPair(key, _evaluate(value_node, env))
             case _:
-                return MError(f"unusable as hash key: {key.type_desc()}")
+                raise _Abort(MError(f"unusable as hash key: {key.type_desc()}"))
     return MHash(pairs)
 
 
 def evaluate(program: Program, env: Environment):
+    resolve(program)
     result = None
-    for statement in program.statements:
-        result = _evaluate(statement, env)
-        match result:
-            case MReturnValue(value):
-                return value
-            case MError():
-                return result
+    try:
+        for statement in program.statements:
+            result = _evaluate(statement, env)
+    except _Return as returned:
+        return returned.value
+    except _Abort as aborted:
+        return aborted.error
 
     return result
 
 
+def _box(value):
+    value_type = type(value)
+    if value_type is int or value_type is float:
+        return MInteger(value)
+    if value_type is bool:
+        return TRUE if value else FALSE
+    if value_type is str:
+        return MString(value)
+    # else:
+    return value
+
+
+def _eval_unboxed_infix(operator: str, left, right):
+    left_type = type(left)
+    right_type = type(right)
+    if (left_type is int or left_type is float) and (right_type is int or right_type is float):
+        return _UNBOXED_INFIX[operator](left, right)
+    if left_type is bool and right_type is bool and (operator == "==" or operator == "!="):
+        return _UNBOXED_INFIX[operator](left, right)
+    if left_type is str and right_type is str and operator == "+":
+        return left + right
+    # else:
+    result = _check(_eval_infix_expression(operator, _box(left), _box(right)))
+    result_type = type(result)
+    return result.value if result_type is MInteger or result_type is MBoolean else result
+
+
+def _eval_unboxed_prefix(operator: str, right):
+    if operator == "!":
+        return right is False or right is NULL
+    right_type = type(right)
+    if operator == "-" and (right_type is int or right_type is float):
+        return -right
+    # else:
+    return _check(_eval_prefix_expression(operator, _box(right)))
+
+
+def _evaluate_unboxed(node: Statement, env: Environment):
+    # Like _evaluate, but integers and booleans come back as plain Python values,
+    # and so do strings the expression builds itself. A string read from a name
+    # stays an MString: MString compares by identity, so boxing its value again
+    # would give another object. The operands of operators and conditions are
+    # evaluated this way, so only the value of a whole expression is boxed
+    match node:
+        case Identifier():
+            address = node.address
+            if address is not None and address[0] == 0 and address[1] != GLOBAL:
+                value = env[address[1] + _SLOTS_START]
+                if value is None:
+                    value = _check(_eval_identifier(node, env))
+            else:
+                value = _check(_eval_identifier(node, env))
+            value_type = type(value)
+            return value.value if value_type is MInteger or value_type is MBoolean else value
+        case IntegerLiteral(value):
+            return value
+        case InfixExpression(left, operator, right):
+            lhs = _evaluate_unboxed(left, env)
+            rhs = _evaluate_unboxed(right, env)
+            if type(lhs) is int and type(rhs) is int:
+                return _UNBOXED_INFIX[operator](lhs, rhs)
+            # else:
+            return _eval_unboxed_infix(operator, lhs, rhs)
+        case BooleanLiteral(value):
+            return value
+        case StringLiteral(value):
+            return value
+        case PrefixExpression(operator, right):
+            return _eval_unboxed_prefix(operator, _evaluate_unboxed(right, env))
+        case _:
+            value = _evaluate(node, env)
+            value_type = type(value)
+            return value.value if value_type is MInteger or value_type is MBoolean else value
+
+
 def _evaluate(node: Statement, env: Environment):
     match node:
-        case Identifier(value):
-            return _eval_identifier(value, env)
+        case Identifier():
+            # a local of the current frame, the common case, is read without a call
+            address = node.address
+            if address is not None and address[0] == 0 and address[1] != GLOBAL:
+                value = env[address[1] + _SLOTS_START]
+                if value is not None:
+                    return value
+            return _check(_eval_identifier(node, env))
         case IntegerLiteral(value):
             return MInteger(value)
         case InfixExpression(left, operator, right):
-            return _if_not_error(
-                _evaluate(left, env),
-                lambda l: _if_not_error(
-                    _evaluate(right, env),
-                    lambda r: _eval_infix_expression(operator, l, r),
-                ),
-            )
+            lhs = _evaluate_unboxed(left, env)
+            rhs = _evaluate_unboxed(right, env)
+            if type(lhs) is int and type(rhs) is int:
+                return _box(_UNBOXED_INFIX[operator](lhs, rhs))
+            # else:
+            return _box(_eval_unboxed_infix(operator, lhs, rhs))
         case BlockStatement():
             return _eval_block_statement(node, env)
         case ExpressionStatement(expression):
@@ -276,63 +589,33 @@ def _evaluate(node: Statement, env: Environment):
         case IfExpression():
             return _eval_if_expression(node, env)
         case CallExpression(function, arguments):
-            def call_body(f):
-                args = _eval_expressions(arguments, env)
-                if len(args) == 1 and _error(args[0]):
-                    return args[0]
-                # else:
-                return _apply_function(f, args)
-
-            return _if_not_error(_evaluate(function, env), call_body)
+            f = _evaluate(function, env)
+            return _call(f, _eval_expressions(arguments, env))
         case ReturnStatement(value):
-            return _if_not_error(_evaluate(value, env), MReturnValue)
+            raise _Return(_evaluate(value, env))
         case PrefixExpression(operator, right):
-            return _if_not_error(
-                _evaluate(right, env), lambda r: _eval_prefix_expression(operator, r)
-            )
+            return _box(_eval_unboxed_prefix(operator, _evaluate_unboxed(right, env)))
         case BooleanLiteral(value):
             return _to_monkey(value)
         case LetStatement(name, value):
-
-            def let_body(val):
-                env[name.value] = val
-
-            return _if_not_error(_evaluate(value, env), let_body)
+            _assign(name, _evaluate(value, env), env)
         case FunctionLiteral(parameters, body):
-            return MFunction(parameters, body, env)
+            return MFunction(parameters, body, env, node.layout)
         case StringLiteral(value):
-            return MString(value)
+            return _new_string(value)
         case IndexExpression(left, index):
             left_evaluated = _evaluate(left, env)
-            if _error(left_evaluated):
-                return left_evaluated
-
             index_evaluated = _evaluate(index, env)
-            if _error(index_evaluated):
-                return index_evaluated
-
-            return _eval_index_expression(left_evaluated, index_evaluated)
+            return _check(_eval_index_expression(left_evaluated, index_evaluated))
         case HashLiteral(pairs):
             return _eval_hash_literal(pairs, env)
         case ArrayLiteral(elements):
-            elems = _eval_expressions(elements, env)
-            if len(elems) == 1 and _error(elems[0]):
-                return elems[0]
-            # else
-            return MArray(elems)
+            return MArray(_eval_expressions(elements, env))
         case _:
             print(f"{node} => {type(node)}")
             return None
 
 
-def _if_not_error(obj, body):
-    match obj:
-        case MError():
-            return obj
-        case _:
-            return body(obj)
-
-
 def _is_truthy(obj) -> bool:
     match obj:
         case MBoolean(value):
@@ -0,0 +1,305 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import cached_property
+
+from astree import Program
+from lexer import TokenStream, scan, tokenize
+from parser import Parser
+from tokens import TOKEN_KINDS, TokenType
+
+_STRING_KIND = TOKEN_KINDS[TokenType.STRING]
+
+
+# the most elements a chunk holds, and half of it the fewest an edited one does
+CHUNK_SIZE = 1024
+# the text first scanned past a re-lexed position, doubled while no token fits
+_WINDOW = 4096
+
+
+class Chunks:
+    # A persistent sequence split into chunks of at most CHUNK_SIZE elements:
+    # array("i") of ints, lists of objects or strs of text. offsets[c] is the
+    # index of the first element of chunk c. With shifts, the values of chunk c
+    # are read with shifts[c] added, so moving every offset after an edit only
+    # touches one int per chunk. splice copies the chunks around the edit and
+    # shares all the others with the old sequence
+    __slots__ = ("_chunks", "_offsets", "_shifts", "_length")
+
+    def __init__(self, chunks: list, offsets: array, shifts: array | None, length: int):
+        self._chunks = chunks
+        self._offsets = offsets
+        self._shifts = shifts
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def _chunk(self, index: int) -> int:
+        return min(max(bisect_right(self._offsets, index) - 1, 0), len(self._chunks) - 1)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._text(index)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("Chunks index out of range")
+        chunk = bisect_right(self._offsets, index) - 1
+        value = self._chunks[chunk][index - self._offsets[chunk]]
+        if self._shifts is None:
+            return value
+        # else:
+        return value + self._shifts[chunk]
+
+    def _text(self, index: slice) -> str:
+        start, stop, _ = index.indices(self._length)
+        if start >= stop:
+            return ""
+        first = self._chunk(start)
+        last = self._chunk(stop - 1)
+        offsets = self._offsets
+        if first == last:
+            return self._chunks[first][start - offsets[first]: stop - offsets[first]]
+        # else:
+        return "".join(
+            [
+                self._chunks[first][start - offsets[first]:],
+                *self._chunks[first + 1: last],
+                self._chunks[last][: stop - offsets[last]],
+            ]
+        )
+
+    def __iter__(self):
+        for chunk, values in enumerate(self._chunks):
+            if self._shifts is None or self._shifts[chunk] == 0:
+                yield from values
+            else:
+                yield from map(self._shifts[chunk].__add__, values)
+
+    def __str__(self):
+        return "".join(self._chunks)
+
+    def _values(self, chunk: int, start: int, stop: int | None, shift: int):
+        values = self._chunks[chunk][start:stop]
+        if self._shifts is not None:
+            shift += self._shifts[chunk]
+        if shift == 0:
+            return values
+        # else:
+        return array("i", map(shift.__add__, values))
+
+    def splice(self, first: int, tail: int, inserted, shift: int = 0) -> "Chunks":
+        # A new Chunks with the elements from first to tail replaced by inserted,
+        # and shift added to the values from tail on
+        chunks = self._chunks
+        offsets = self._offsets
+        low = self._chunk(first)
+        high = self._chunk(tail)
+        edited = (
+            self._values(low, 0, first - offsets[low], 0)
+            + inserted
+            + self._values(high, tail - offsets[high], None, shift)
+        )
+        # an edited chunk too small is merged with a neighbour, so chunks do not
+        # shrink edit after edit
+        if len(edited) < CHUNK_SIZE // 2 and high + 1 < len(chunks):
+            high += 1
+            edited += self._values(high, 0, None, shift)
+        elif len(edited) < CHUNK_SIZE // 2 and low > 0:
+            low -= 1
+            edited = self._values(low, 0, None, 0) + edited
+        # split evenly, so every new chunk holds at least half of CHUNK_SIZE
+        # unless it is the only one. It is empty when the sequence is
+        count = -(-len(edited) // CHUNK_SIZE)
+        size = max(-(-len(edited) // max(count, 1)), 1)
+        pieces = [edited[index: index + size] for index in range(0, max(len(edited), 1), size)]
+
+        growth = len(inserted) - (tail - first)
+        start = offsets[low]
+        new_offsets = offsets[:low]
+        new_offsets.extend(range(start, start + size * len(pieces), size))
+        later = offsets[high + 1:]
+        new_offsets += later if growth == 0 else array("q", map(growth.__add__, later))
+        new_shifts = None
+        if self._shifts is not None:
+            new_shifts = self._shifts[:low] + array("q", bytes(8 * len(pieces)))
+            later = self._shifts[high + 1:]
+            new_shifts += later if shift == 0 else array("q", map(shift.__add__, later))
+        return Chunks(
+            chunks[:low] + pieces + chunks[high + 1:],
+            new_offsets,
+            new_shifts,
+            self._length + growth,
+        )
+
+
+def chunked(values, shifted: bool = False) -> Chunks:
+    # values, which is an array("i"), a list or a str, as a Chunks. Shifted
+    # Chunks hold ints and take a shift in splice
+    length = len(values)
+    pieces = [values[index: index + CHUNK_SIZE] for index in range(0, length, CHUNK_SIZE)]
+    offsets = array("q", range(0, length, CHUNK_SIZE))
+    if length == 0:
+        pieces = [values]
+        offsets = array("q", [0])
+    shifts = array("q", bytes(8 * len(pieces))) if shifted else None
+    return Chunks(pieces, offsets, shifts, length)
+
+
+class ParsedSource:
+    # A source with its tokens and top-level statements. boundaries[i] is the
+    # index of the first token of statements[i], and the last boundary is the
+    # EOF token. A statement that failed to parse is kept as None. The text, the
+    # token arrays and the statements are all Chunks, which edits share
+    def __init__(
+        self,
+        tokens: TokenStream,
+        statements: Chunks,
+        boundaries: Chunks,
+        errors: Chunks,
+    ):
+        self.tokens = tokens
+        self.statements = statements
+        self.boundaries = boundaries
+        self.statement_errors = errors
+
+    @cached_property
+    def program(self) -> Program:
+        return Program([statement for statement in self.statements if statement is not None])
+
+    @cached_property
+    def source(self) -> str:
+        return str(self.tokens.source)
+
+    def errors(self) -> list[str]:
+        return [error for errors in self.statement_errors for error in errors]
+
+
+def _parse_from(tokens: TokenStream, position: int, resume):
+    # Parses statements from token position until the EOF token, or until
+    # resume returns the index of an old statement starting at the next token
+    parser = Parser(tokens, position)
+    statements = []
+    boundaries = array("i")
+    errors = []
+    while True:
+        start = parser.token_index()
+        reused = resume(start)
+        if reused is not None:
+            return statements, boundaries, errors, reused
+        boundaries.append(start)
+        if parser.at_end():
+            return statements, boundaries, errors, None
+        count = len(parser.errors())
+        statements.append(parser.parse_top_level_statement())
+        errors.append(parser.errors()[count:])
+
+
+def parse_source(source: str) -> ParsedSource:
+    tokens = tokenize(source)
+    statements, boundaries, errors, _ = _parse_from(tokens, 0, lambda start: None)
+    return ParsedSource(
+        TokenStream(
+            chunked(source),
+            chunked(tokens.kinds),
+            chunked(tokens.starts, shifted=True),
+            chunked(tokens.ends, shifted=True),
+        ),
+        chunked(statements),
+        chunked(boundaries, shifted=True),
+        chunked(errors),
+    )
+
+
+def _scan(text: Chunks, position: int):
+    # scan over the text from position on, slicing only as much of it as the
+    # tokens read. A token reaching the end of a slice could go on past it, so
+    # it is scanned again from a slice twice as long
+    size = _WINDOW
+    while True:
+        stop = min(position + size, len(text))
+        window = text[position:stop]
+        for kind, start, end in scan(window):
+            if end >= len(window) and stop < len(text):
+                position += start - (kind == _STRING_KIND)
+                size *= 2
+                break
+            yield kind, start + position, end + position
+        else:
+            return
+
+
+def _relex(old: TokenStream, text: Chunks, offset: int, removed: int, inserted: int):
+    # Re-lexes the text from before the edit until a token starts where an old
+    # token did, past the edit. From there on the text, so the tokens, are the
+    # same. Returns the new stream, the first re-lexed index, the number of
+    # re-lexed tokens and the old index of the first reused token
+    delta = inserted - removed
+    edit_end = offset + inserted
+    # the token before the last one starting ahead of the edit can merge with it
+    first = max(bisect_left(old.starts, offset) - 2, 0)
+    position = 0
+    if first > 0:
+        position = old.starts[first] - (old.kinds[first] == _STRING_KIND)
+
+    kinds = array("i")
+    starts = array("i")
+    ends = array("i")
+    for kind, start, end in _scan(text, position):
+        if start - (kind == _STRING_KIND) >= edit_end:
+            old_start = start - delta
+            tail = bisect_left(old.starts, old_start, first)
+            if tail < len(old) and old.starts[tail] == old_start and old.kinds[tail] == kind:
+                break
+        kinds.append(kind)
+        starts.append(start)
+        ends.append(end)
+    else:
+        # no old token lined up again, so every one from first on is replaced
+        tail = len(old)
+
+    tokens = TokenStream(
+        text,
+        old.kinds.splice(first, tail, kinds),
+        old.starts.splice(first, tail, starts, delta),
+        old.ends.splice(first, tail, ends, delta),
+    )
+    return tokens, first, len(kinds), tail
+
+
+def edit(parsed: ParsedSource, offset: int, removed: int, inserted: str) -> ParsedSource:
+    # Replaces removed characters at offset with inserted. Only the tokens around
+    # the edit are lexed again, and only the statements reading those tokens are
+    # parsed again; the other Statement nodes, and the chunks holding them, are
+    # reused
+    old_text = parsed.tokens.source
+    if offset < 0 or removed < 0 or offset + removed > len(old_text):
+        raise ValueError(f"edit at {offset} removing {removed} is outside the source")
+    text = old_text.splice(offset, offset + removed, inserted)
+    tokens, first, relexed, tail = _relex(parsed.tokens, text, offset, removed, len(inserted))
+    token_shift = first + relexed - tail
+
+    old_boundaries = parsed.boundaries
+    # a statement also reads the first token of the next one, to look for a
+    # semicolon or an operator
+    reparsed = bisect_left(old_boundaries, first, 1) - 1
+
+    def resume(start: int):
+        if start < first + relexed:
+            return None
+        index = bisect_left(old_boundaries, start - token_shift, reparsed)
+        if index < len(old_boundaries) and old_boundaries[index] == start - token_shift:
+            return index
+        return None
+
+    statements, boundaries, errors, reused = _parse_from(
+        tokens, old_boundaries[reparsed], resume
+    )
+    if reused is None:
+        reused = len(old_boundaries)
+    return ParsedSource(
+        tokens,
+        parsed.statements.splice(reparsed, reused, statements),
+        old_boundaries.splice(reparsed, reused, boundaries, token_shift),
+        parsed.statement_errors.splice(reparsed, reused, errors),
+    )
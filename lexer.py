@@ -1,4 +1,9 @@
-from tokens import Token, TokenType, lookup_ident
+import codecs
+import re
+
+from array import array
+
+from tokens import Token, TokenType, TOKEN_KINDS, TOKEN_TYPES, KEYWORDS, lookup_ident
 
 
 def _is_identifier(char):
@@ -9,11 +14,13 @@ class Lexer:
     ZERO = ""
     WHITE_SPACES = (" ", "\t", "\n", "\r")
 
-    def __init__(self, input_source):
+    def __init__(self, input_source, position: int = 0):
+        # lexes input_source from position on, offsets stay relative to its start
         self._input = input_source
-        self._position = 0
-        self._read_position = 0
+        self._position = position
+        self._read_position = position
         self._ch = Lexer.ZERO
+        self._token_start = position
         self._read_char()
 
     def _read_char(self):
@@ -37,6 +44,7 @@ class Lexer:
             return Token(two_chars, value)
 
         self._skip_whitespace()
+        self._token_start = self._position
 
         match self._ch:
             case "=":
@@ -90,6 +98,16 @@ class Lexer:
         self._read_char()
         return r
 
+    def next_token_span(self) -> tuple[Token, int, int]:
+        # The next token with the offsets of its first character and of the
+        # character after it. Unlike next_token, an ILLEGAL character is
+        # consumed, so the following token comes from the characters after it
+        token = self.next_token()
+        if token.token_type is TokenType.ILLEGAL:
+            self._read_char()
+        # an unterminated string leaves the lexer one past the end
+        return token, self._token_start, min(self._position, len(self._input))
+
     def _peak_char(self):
         return (
             Lexer.ZERO
@@ -124,3 +142,264 @@ class Lexer:
                 break
 
         return self._input[start: self._position]
+
+
+_SINGLE_CHARS = {
+    "=": TokenType.ASSIGN,
+    ";": TokenType.SEMICOLON,
+    ":": TokenType.COLON,
+    ",": TokenType.COMMA,
+    "(": TokenType.LPAREN,
+    ")": TokenType.RPAREN,
+    "{": TokenType.LBRACE,
+    "}": TokenType.RBRACE,
+    "[": TokenType.LBRACKET,
+    "]": TokenType.RBRACKET,
+    "+": TokenType.PLUS,
+    "-": TokenType.MINUS,
+    "*": TokenType.ASTERISK,
+    "/": TokenType.SLASH,
+    "<": TokenType.LT,
+    ">": TokenType.GT,
+    "!": TokenType.BANG,
+}
+
+# Operators and delimiters carry no data, so one Token per literal is shared
+_OPERATOR_TOKENS = {
+    literal: Token(token_type, literal)
+    for literal, token_type in [
+        ("==", TokenType.EQ),
+        ("!=", TokenType.NOT_EQ),
+        *_SINGLE_CHARS.items(),
+    ]
+}
+
+_MASTER_PATTERN = re.compile(
+    "|".join(
+        [
+            r"(?P<WHITESPACE>[ \t\n\r]+)",
+            r"(?P<IDENT>[A-Za-z_]+)",
+            r"(?P<INT>[0-9]+)",
+            f"(?P<OPERATOR>==|!=|[{re.escape(''.join(_SINGLE_CHARS))}])",
+            r'(?P<STRING>"[^"]*"?)',
+            r"(?P<ILLEGAL>.)",
+        ]
+    ),
+    re.DOTALL,
+)
+
+_EOF = Token(TokenType.EOF, "")
+
+
+class RegexLexer:
+    # Same tokens as Lexer, from a single pass of one compiled pattern.
+    # Lexer classifies characters with str.isalpha and str.isdigit, which a
+    # pattern cannot reproduce exactly, so sources with non-ASCII characters
+    # are handed to Lexer. Unlike Lexer.next_token, an ILLEGAL character is
+    # consumed, so the next token comes from the characters after it
+    def __init__(self, input_source: str):
+        self._fallback = None if input_source.isascii() else Lexer(input_source)
+        self._matches = _MASTER_PATTERN.finditer(input_source)
+
+    def next_token(self) -> Token:
+        if self._fallback is not None:
+            return self._fallback.next_token_span()[0]
+        for match in self._matches:
+            kind = match.lastgroup
+            if kind == "WHITESPACE":
+                continue
+            literal = match.group()
+            if kind == "IDENT":
+                return Token(lookup_ident(literal), literal)
+            if kind == "OPERATOR":
+                return _OPERATOR_TOKENS[literal]
+            if kind == "INT":
+                return Token(TokenType.INT, literal)
+            if kind == "STRING":
+                terminated = len(literal) > 1 and literal[-1] == '"'
+                return Token(TokenType.STRING, literal[1:-1] if terminated else literal[1:])
+            # else:
+            return Token(TokenType.ILLEGAL, literal)
+        return _EOF
+
+
+_IDENT_KIND = TOKEN_KINDS[TokenType.IDENT]
+_INT_KIND = TOKEN_KINDS[TokenType.INT]
+_STRING_KIND = TOKEN_KINDS[TokenType.STRING]
+_ILLEGAL_KIND = TOKEN_KINDS[TokenType.ILLEGAL]
+_EOF_KIND = TOKEN_KINDS[TokenType.EOF]
+_KEYWORD_KINDS = {literal: TOKEN_KINDS[token_type] for literal, token_type in KEYWORDS.items()}
+_OPERATOR_KINDS = {
+    literal: TOKEN_KINDS[token.token_type] for literal, token in _OPERATOR_TOKENS.items()
+}
+
+# The shared Token of every kind whose literal never changes. IDENT, INT, STRING
+# and ILLEGAL are None: their literals are sliced from the source when needed
+_FIXED_TOKENS = {
+    token.token_type: token
+    for token in [
+        *_OPERATOR_TOKENS.values(),
+        *(Token(token_type, literal) for literal, token_type in KEYWORDS.items()),
+        _EOF,
+    ]
+}
+FIXED_TOKENS = [_FIXED_TOKENS.get(token_type, None) for token_type in TOKEN_TYPES]
+
+
+class TokenStream:
+    # Parallel arrays: token i has kind kinds[i] (an index into TOKEN_TYPES) and
+    # its literal is source[starts[i]:ends[i]], sliced only when asked for
+    def __init__(self, source: str, kinds: array, starts: array, ends: array):
+        self.source = source
+        self.kinds = kinds
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def token_type(self, index: int) -> TokenType:
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def literal(self, index: int) -> str:
+        return self.source[self.starts[index]: self.ends[index]]
+
+    def token(self, index: int) -> Token:
+        kind = self.kinds[index]
+        token = FIXED_TOKENS[kind]
+        if token is None:
+            return Token(TOKEN_TYPES[kind], self.literal(index))
+        # else:
+        return token
+
+
+def _scan_with_lexer(source: str, position: int):
+    lexer = Lexer(source, position)
+    while True:
+        token, start, _ = lexer.next_token_span()
+        if token.token_type is TokenType.EOF:
+            yield _EOF_KIND, len(source), len(source)
+            return
+        if token.token_type is TokenType.STRING:
+            start += 1
+        yield TOKEN_KINDS[token.token_type], start, start + len(token.literal)
+
+
+def scan(source: str, position: int = 0):
+    # (kind, start, end) for every token from position on, ending with EOF.
+    # A STRING token's offsets cover its contents without the quotes
+    if not source.isascii():
+        yield from _scan_with_lexer(source, position)
+        return
+
+    for match in _MASTER_PATTERN.finditer(source, position):
+        kind = match.lastgroup
+        if kind == "WHITESPACE":
+            continue
+        start, end = match.span()
+        if kind == "IDENT":
+            yield _KEYWORD_KINDS.get(source[start:end], _IDENT_KIND), start, end
+        elif kind == "OPERATOR":
+            yield _OPERATOR_KINDS[source[start:end]], start, end
+        elif kind == "INT":
+            yield _INT_KIND, start, end
+        elif kind == "STRING":
+            terminated = end - start > 1 and source[end - 1] == '"'
+            yield _STRING_KIND, start + 1, end - 1 if terminated else end
+        else:
+            yield _ILLEGAL_KIND, start, end
+    yield _EOF_KIND, len(source), len(source)
+
+
+def tokenize(source: str) -> TokenStream:
+    # The whole source at once, ending with an EOF token
+    kinds = array("i")
+    starts = array("i")
+    ends = array("i")
+    add_kind = kinds.append
+    add_start = starts.append
+    add_end = ends.append
+    for kind, start, end in scan(source):
+        add_kind(kind)
+        add_start(start)
+        add_end(end)
+    return TokenStream(source, kinds, starts, ends)
+
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def _buffer_tokens(buffer: str, final: bool):
+    # The tokens of buffer, and where the unread part starts. Unless final, a
+    # token reaching the end of the buffer may continue in the next chunk, so
+    # it is left to be read again together with that chunk
+    tokens = []
+    size = len(buffer)
+    if buffer.isascii():
+        for match in _MASTER_PATTERN.finditer(buffer):
+            start, end = match.span()
+            if end == size and not final:
+                return tokens, start
+            kind = match.lastgroup
+            if kind == "WHITESPACE":
+                continue
+            literal = match.group()
+            if kind == "IDENT":
+                tokens.append(Token(lookup_ident(literal), literal))
+            elif kind == "OPERATOR":
+                tokens.append(_OPERATOR_TOKENS[literal])
+            elif kind == "INT":
+                tokens.append(Token(TokenType.INT, literal))
+            elif kind == "STRING":
+                terminated = len(literal) > 1 and literal[-1] == '"'
+                tokens.append(Token(TokenType.STRING, literal[1:-1] if terminated else literal[1:]))
+            else:
+                tokens.append(Token(TokenType.ILLEGAL, literal))
+        return tokens, size
+
+    lexer = Lexer(buffer)
+    while True:
+        token, start, end = lexer.next_token_span()
+        if token.token_type is TokenType.EOF:
+            return tokens, size
+        if end >= size and not final:
+            return tokens, start
+        tokens.append(token)
+
+
+class StreamLexer:
+    # Same tokens as RegexLexer, read lazily from a file object or an mmap, one
+    # chunk at a time. Binary sources are decoded with encoding as they are read
+    def __init__(self, source, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = "utf-8"):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk size must be positive: {chunk_size}")
+        self._source = source
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._tokens = self._read_tokens()
+
+    def _read(self, size: int) -> tuple[str, bool]:
+        chunk = self._source.read(size)
+        final = len(chunk) == 0
+        if isinstance(chunk, str):
+            return chunk, final
+        # else:
+        return self._decoder.decode(chunk, final), final
+
+    def _read_tokens(self):
+        pending = ""
+        final = False
+        while not final:
+            # a token longer than a chunk doubles the next read, so it is
+            # scanned a bounded number of times
+            chunk, final = self._read(max(self._chunk_size, len(pending)))
+            buffer = pending + chunk
+            tokens, unread = _buffer_tokens(buffer, final)
+            yield from tokens
+            pending = buffer[unread:]
+
+    def __iter__(self):
+        return self._tokens
+
+    def next_token(self) -> Token:
+        return next(self._tokens, _EOF)
@@ -0,0 +1,238 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+from astree import (
+    Program,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+)
+from evaluator import Environment, evaluate as evaluate_program
+from objects import MFunction, MemoizedFunction, BUILTINS
+from resolver import Resolution, resolve
+
+DEFAULT_MAXSIZE = 128
+
+LRU = "lru"
+FIFO = "fifo"
+
+# How many of the latest programs a MemoizingEnvironment remembers the pure functions of
+_MAX_PROGRAMS = 16
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int | None
+    currsize: int
+
+
+class FunctionCache:
+    def __init__(self, maxsize: int | None = DEFAULT_MAXSIZE, eviction: str = LRU):
+        if eviction not in (LRU, FIFO):
+            raise ValueError(f"unknown eviction policy: {eviction}")
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key, None)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == LRU:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize is not None and self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        if self.maxsize is not None and len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries.clear()
+
+
+class _Usage:
+    def __init__(self):
+        self.globals: set[str] = set()
+        self.calls_unknown = False
+        self.has_closures = False
+
+
+def _collect(node, resolution: Resolution, usage: _Usage):
+    match node:
+        case Identifier():
+            if resolution.address(node) is None:
+                usage.globals.add(node.value)
+        case LetStatement(_, value):
+            _collect(value, resolution, usage)
+        case FunctionLiteral():
+            usage.has_closures = True
+        case Program(statements) | BlockStatement(statements=statements):
+            for statement in statements:
+                _collect(statement, resolution, usage)
+        case ExpressionStatement(expression):
+            _collect(expression, resolution, usage)
+        case ReturnStatement(value):
+            _collect(value, resolution, usage)
+        case PrefixExpression(_, right):
+            _collect(right, resolution, usage)
+        case InfixExpression(left, _, right):
+            _collect(left, resolution, usage)
+            _collect(right, resolution, usage)
+        case IfExpression():
+            _collect(node.condition, resolution, usage)
+            _collect(node.consequence, resolution, usage)
+            _collect(node.alternative, resolution, usage)
+        case CallExpression(function, arguments):
+            # only named globals can be checked, a local could hold any function
+            if not isinstance(function, Identifier) or resolution.address(function) is not None:
+                usage.calls_unknown = True
+            _collect(function, resolution, usage)
+            for argument in arguments:
+                _collect(argument, resolution, usage)
+        case IndexExpression(left, index):
+            _collect(left, resolution, usage)
+            _collect(index, resolution, usage)
+        case ArrayLiteral(elements):
+            for element in elements:
+                _collect(element, resolution, usage)
+        case HashLiteral(pairs):
+            for key, value in pairs.items():
+                _collect(key, resolution, usage)
+                _collect(value, resolution, usage)
+
+
+def pure_functions(program: Program) -> dict[str, FunctionLiteral]:
+    # Top-level functions that only read their arguments, call builtins or other
+    # pure functions, and do not create closures. A global bound more than
+    # once could change between calls, so it disqualifies every function using it
+    return {name: function for name, (function, _) in _pure_usages(program).items()}
+
+
+def _pure_usages(program: Program) -> dict[str, tuple[FunctionLiteral, _Usage]]:
+    bindings = {}
+    for statement in program.statements:
+        match statement:
+            case LetStatement(name, value):
+                bindings.setdefault(name.value, []).append(value)
+
+    resolution = resolve(program)
+    usages = {}
+    for name, values in bindings.items():
+        if len(values) == 1 and isinstance(values[0], FunctionLiteral):
+            usage = _Usage()
+            _collect(values[0].body, resolution, usage)
+            if not usage.calls_unknown and not usage.has_closures:
+                usages[name] = usage
+
+    changed = True
+    while changed:
+        changed = False
+        for name, usage in list(usages.items()):
+            for used in usage.globals:
+                if used in usages:
+                    continue
+                if used in BUILTINS and used not in bindings:
+                    continue
+                del usages[name]
+                changed = True
+                break
+
+    return {name: (bindings[name][0], usage) for name, usage in usages.items()}
+
+
+class MemoizingEnvironment(Environment):
+    def __init__(self, maxsize: int | None = DEFAULT_MAXSIZE, eviction: str = LRU):
+        super().__init__()
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.caches: dict[str, FunctionCache] = {}
+        # by program id: the program and the names and globals of its pure functions
+        # by body id. The programs are kept alive, so the ids of their bodies stay unique
+        self._programs: OrderedDict[
+            int, tuple[Program, dict[int, tuple[str, set[str]]]]
+        ] = OrderedDict()
+        # the globals each memoized function reads
+        self._globals: dict[str, set[str]] = {}
+
+    def memoize(self, program: Program):
+        # Only the latest programs are remembered, so a long session does not keep
+        # every program alive. A function bound later by an older one is not memoized
+        pure = {
+            id(function.body): (name, usage.globals)
+            for name, (function, usage) in _pure_usages(program).items()
+        }
+        self._programs.pop(id(program), None)
+        self._programs[id(program)] = (program, pure)
+        if len(self._programs) > _MAX_PROGRAMS:
+            self._programs.popitem(last=False)
+
+    def _pure_globals(self, name: str, function: MFunction) -> set[str] | None:
+        for _, pure in self._programs.values():
+            found = pure.get(id(function.body), None)
+            if found is not None and found[0] == name:
+                return found[1]
+        return None
+
+    def _forget_users(self, name: str):
+        # A memoized function reading a global that is bound again (or a builtin
+        # that is shadowed) could give other results now, so it stops being memoized,
+        # and so do the functions calling it
+        for user, used in list(self._globals.items()):
+            if name not in used or user not in self._globals:
+                continue
+            del self._globals[user]
+            cache = self.caches.pop(user)
+            cache.clear()
+            # the function may be bound to other names too
+            cache.maxsize = 0
+            function = self.store.get(user, None)
+            if type(function) is MemoizedFunction and function.cache is cache:
+                self.store[user] = MFunction(
+                    function.parameters, function.body, function.env, function.layout
+                )
+            self._forget_users(user)
+
+    def __setitem__(self, key, value):
+        if key in self.store or key in BUILTINS:
+            self._forget_users(key)
+            self._globals.pop(key, None)
+            self.caches.pop(key, None)
+        if type(value) is MFunction:
+            used = self._pure_globals(key, value)
+            if used is not None:
+                cache = FunctionCache(self.maxsize, self.eviction)
+                self.caches[key] = cache
+                self._globals[key] = used
+                value = MemoizedFunction(value, cache)
+        self.store[key] = value
+
+    def cache_info(self) -> dict[str, CacheInfo]:
+        return {name: cache.info() for name, cache in self.caches.items()}
+
+
+def evaluate(program: Program, env: MemoizingEnvironment):
+    env.memoize(program)
+    return evaluate_program(program, env)
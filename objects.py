@@ -1,7 +1,14 @@
 from abc import ABC, abstractmethod
+from collections.abc import Mapping, Sequence
 from enum import IntEnum, auto
+from operator import add, sub, mul
 from typing import NamedTuple, Any
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class HashType(IntEnum):
     INTEGER = auto()
@@ -95,12 +102,107 @@ class MError(MObject):
         return f"ERROR: {self.message}"
 
 
+# Concatenations shorter than this are copied right away, longer ones build a rope
+ROPE_THRESHOLD = 256
+
+
 class MString(Hashable):
+    # One of three forms, materialized into _flat (once) the first time value
+    # is read:
+    # - flat: the str itself in _flat
+    # - rope: the concatenation of the MStrings _left and _right
+    # - view: _length characters of the str _buffer from _start, which keeps
+    #   the whole buffer alive until the view is materialized
+    __slots__ = ("_flat", "_left", "_right", "_buffer", "_start", "_length")
+
+    def __init__(self, value: str):
+        self._flat = value
+        self._left = None
+        self._right = None
+        self._buffer = None
+        self._start = 0
+        self._length = len(value)
+
+    @staticmethod
+    def _new(left, right, buffer, start: int, length: int):
+        string = MString.__new__(MString)
+        string._flat = None
+        string._left = left
+        string._right = right
+        string._buffer = buffer
+        string._start = start
+        string._length = length
+        return string
+
+    @property
+    def value(self) -> str:
+        if self._flat is None:
+            self._flat = self._flatten()
+            self._left = None
+            self._right = None
+            self._buffer = None
+            self._start = 0
+        return self._flat
+
+    def _flatten(self) -> str:
+        # iterative, so deep chains of `acc + piece` do not hit the recursion limit
+        pieces = []
+        pending = [self]
+        while pending:
+            node = pending.pop()
+            if node._flat is not None:
+                pieces.append(node._flat)
+            elif node._buffer is not None:
+                pieces.append(node._buffer[node._start: node._start + node._length])
+            else:
+                pending.append(node._right)
+                pending.append(node._left)
+        return "".join(pieces)
+
+    def _buffer_range(self) -> tuple[str, int]:
+        if self._flat is None and self._buffer is not None:
+            return self._buffer, self._start
+        # else:
+        return self.value, 0
+
+    def view(self, start: int, end: int):
+        # characters start..end (clamped to the string) without copying them
+        start = min(max(start, 0), self._length)
+        end = min(max(end, start), self._length)
+        buffer, offset = self._buffer_range()
+        return MString._new(None, None, buffer, offset + start, end - start)
+
+    def find(self, other) -> int:
+        buffer, offset = self._buffer_range()
+        index = buffer.find(other.value, offset, offset + self._length)
+        return -1 if index < 0 else index - offset
+
+    def split(self, separator) -> list:
+        buffer, offset = self._buffer_range()
+        end = offset + self._length
+        separator = separator.value
+        parts = []
+        start = offset
+        while True:
+            index = buffer.find(separator, start, end)
+            if index < 0:
+                parts.append(MString._new(None, None, buffer, start, end - start))
+                return parts
+            parts.append(MString._new(None, None, buffer, start, index - start))
+            start = index + len(separator)
+
+    def __len__(self):
+        return self._length
+
     def hash_type(self) -> HashType:
         return HashType.STRING
 
     def __add__(self, other):
-        return MString(self.value + other.value)
+        length = self._length + other._length
+        if length < ROPE_THRESHOLD:
+            return MString(self.value + other.value)
+        # else:
+        return MString._new(self, other, None, 0, length)
 
 
 class MBoolean(Hashable):
@@ -135,10 +237,21 @@ NULL = MNull()
 
 
 class MFunction(MObject):
-    def __init__(self, parameters, body, env):
+    # Runs a plain MFunction with the tree-walking evaluator. evaluator imports
+    # this module, so it sets this once it is loaded
+    tree_walker = None
+
+    def __init__(self, parameters, body, env, layout=None):
         self.parameters = parameters
         self.body = body
         self.env = env
+        # the FunctionLayout of the frames of a call, see resolver.py
+        self.layout = layout
+
+    def apply(self, args: list):
+        # Calls the function with evaluated arguments, an error comes back as an
+        # MError. The functions of the other engines override this to run their code
+        return MFunction.tree_walker(self, args)
 
     def __repr__(self):
         if self.parameters is None:
@@ -148,6 +261,16 @@ class MFunction(MObject):
         return f"fn({parameters}) {{\n\t{self.body}\n}}"
 
 
+class MemoizedFunction(MFunction):
+    # A pure function whose results are kept in cache, see memoize.py
+    def __init__(self, function: MFunction, cache):
+        super().__init__(function.parameters, function.body, function.env, function.layout)
+        self.cache = cache
+
+    def type_desc(self) -> str:
+        return MFunction.__name__
+
+
 class MBuiltinFunction(MObject):
     def __init__(self, fn):
         self.fn = fn
@@ -155,22 +278,312 @@ class MBuiltinFunction(MObject):
     def __repr__(self):
         return "builtin function"
 
+    def apply(self, args: list):
+        result = self.fn(args)
+        if result is None:
+            return NULL
+        # else:
+        return result
+
+
+def apply_function(function, args: list):
+    # Calls a function or builtin from outside the engine that created it
+    if isinstance(function, (MFunction, MBuiltinFunction)):
+        return function.apply(args)
+    # else:
+    return MError(f"not a function: {function.type_desc()}")
+
+
+class Vector(Sequence):
+    # An immutable view over a backing list that is only ever appended to.
+    # rest() moves the start of the view, and push() appends in place when no
+    # other vector has grown the backing list past this view; otherwise it copies
+    __slots__ = ("_items", "_start", "_end")
+
+    def __init__(self, items: list, start: int = 0, end: int | None = None):
+        self._items = items
+        self._start = start
+        self._end = len(items) if end is None else end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, end, step = index.indices(len(self))
+            if step != 1:
+                return Vector(list(self)[index])
+            return Vector(self._items, self._start + start, self._start + max(start, end))
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("vector index out of range")
+        return self._items[self._start + index]
+
+    def __iter__(self):
+        items = self._items
+        for i in range(self._start, self._end):
+            yield items[i]
+
+    def push(self, value):
+        if self._end == len(self._items):
+            self._items.append(value)
+            return Vector(self._items, self._start, self._end + 1)
+        # else:
+        return Vector(self._items[self._start: self._end] + [value])
+
+    def rest(self):
+        return Vector(self._items, self._start + 1, self._end)
+
+
+# Arrays of at least this many integers are stored in a NumPy buffer, when available
+NUMPY_MIN_SIZE = 32
+_INT64_MIN = -(2 ** 63)
+_INT64_MAX = 2 ** 63 - 1
+
+
+class IntBuffer(Sequence):
+    # Integers stored in a read-only NumPy int64 array. rest() and slices are
+    # NumPy views; push() falls back to a Vector, which can grow in place
+    __slots__ = ("values",)
+
+    def __init__(self, values):
+        values.flags.writeable = False
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return IntBuffer(self.values[index])
+        return MInteger(int(self.values[index]))
+
+    def __iter__(self):
+        for value in self.values.tolist():
+            yield MInteger(value)
+
+    def push(self, value):
+        return Vector(list(self) + [value])
+
+    def rest(self):
+        return IntBuffer(self.values[1:])
+
+    def bound(self) -> int:
+        # the largest absolute value, in Python ints so it cannot overflow
+        if len(self.values) == 0:
+            return 0
+        return max(abs(int(self.values.min())), abs(int(self.values.max())))
+
+
+def _pack(elements: list):
+    if numpy is None or len(elements) < NUMPY_MIN_SIZE:
+        return Vector(elements)
+    for element in elements:
+        if type(element) is not MInteger or type(element.value) is not int:
+            return Vector(elements)
+        if element.value < _INT64_MIN or element.value > _INT64_MAX:
+            return Vector(elements)
+    return IntBuffer(numpy.array([element.value for element in elements], dtype=numpy.int64))
+
 
 class MArray(MObject):
     __match_args__ = ("elements",)
 
     def __init__(self, elements):
-        self.elements = elements
+        # a list passed in is owned by the array from then on
+        if type(elements) is Vector or type(elements) is IntBuffer:
+            self.elements = elements
+        else:
+            self.elements = _pack(elements)
 
     def __repr__(self):
         return f"[{', '.join(str(elements) for elements in self.elements)}]"
 
 
+_TRIE_BITS = 5
+_TRIE_MASK = (1 << _TRIE_BITS) - 1
+_TRIE_HASH_BITS = 32
+
+
+class _TrieNode:
+    # entries holds (key, value) tuples and sub-nodes, ordered by bit position
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+
+class _TrieCollision:
+    # keys whose hashes are equal in all the bits the trie uses
+    __slots__ = ("entries",)
+
+    def __init__(self, entries: tuple):
+        self.entries = entries
+
+
+def _trie_hash(key) -> int:
+    return hash(key) & 0xFFFFFFFF
+
+
+def _trie_pair(first: tuple, second: tuple, shift: int):
+    if shift >= _TRIE_HASH_BITS:
+        return _TrieCollision((first, second))
+    first_bit = (_trie_hash(first[0]) >> shift) & _TRIE_MASK
+    second_bit = (_trie_hash(second[0]) >> shift) & _TRIE_MASK
+    if first_bit == second_bit:
+        return _TrieNode(1 << first_bit, (_trie_pair(first, second, shift + _TRIE_BITS),))
+    if first_bit > second_bit:
+        first, second = second, first
+    return _TrieNode((1 << first_bit) | (1 << second_bit), (first, second))
+
+
+def _trie_get(node, key, default):
+    shift = 0
+    key_hash = _trie_hash(key)
+    while node is not None:
+        if type(node) is _TrieCollision:
+            for entry in node.entries:
+                if entry[0] == key:
+                    return entry[1]
+            return default
+        bit = 1 << ((key_hash >> shift) & _TRIE_MASK)
+        if not node.bitmap & bit:
+            return default
+        entry = node.entries[(node.bitmap & (bit - 1)).bit_count()]
+        if type(entry) is tuple:
+            return entry[1] if entry[0] == key else default
+        node = entry
+        shift += _TRIE_BITS
+    return default
+
+
+def _trie_set(node, entry: tuple, key_hash: int, shift: int):
+    # returns the new node and whether the key was added
+    if node is None:
+        return _TrieNode(1 << (key_hash & _TRIE_MASK), (entry,)), True
+    if type(node) is _TrieCollision:
+        for i, existing in enumerate(node.entries):
+            if existing[0] == entry[0]:
+                return _TrieCollision(node.entries[:i] + (entry,) + node.entries[i + 1:]), False
+        return _TrieCollision(node.entries + (entry,)), True
+    bit = 1 << ((key_hash >> shift) & _TRIE_MASK)
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entries = node.entries
+    if not node.bitmap & bit:
+        return _TrieNode(node.bitmap | bit, entries[:index] + (entry,) + entries[index:]), True
+    existing = entries[index]
+    if type(existing) is tuple:
+        if existing[0] == entry[0]:
+            child, added = entry, False
+        else:
+            child, added = _trie_pair(existing, entry, shift + _TRIE_BITS), True
+    else:
+        child, added = _trie_set(existing, entry, key_hash, shift + _TRIE_BITS)
+    return _TrieNode(node.bitmap, entries[:index] + (child,) + entries[index + 1:]), added
+
+
+def _trie_delete(node, key, key_hash: int, shift: int):
+    # returns the same node when the key is missing, and None when the node empties
+    if type(node) is _TrieCollision:
+        entries = tuple(entry for entry in node.entries if entry[0] != key)
+        if len(entries) == len(node.entries):
+            return node
+        if len(entries) == 1:
+            return entries[0]
+        return _TrieCollision(entries)
+    bit = 1 << ((key_hash >> shift) & _TRIE_MASK)
+    if not node.bitmap & bit:
+        return node
+    index = (node.bitmap & (bit - 1)).bit_count()
+    entries = node.entries
+    existing = entries[index]
+    if type(existing) is tuple:
+        if existing[0] != key:
+            return node
+        child = None
+    else:
+        child = _trie_delete(existing, key, key_hash, shift + _TRIE_BITS)
+        if child is existing:
+            return node
+        # a sub-node left with a single entry collapses into this level
+        if type(child) is _TrieNode and len(child.entries) == 1 and type(child.entries[0]) is tuple:
+            child = child.entries[0]
+    if child is None:
+        if node.bitmap == bit:
+            return None
+        return _TrieNode(node.bitmap ^ bit, entries[:index] + entries[index + 1:])
+    # else:
+    return _TrieNode(node.bitmap, entries[:index] + (child,) + entries[index + 1:])
+
+
+def _trie_items(node):
+    if node is None:
+        return
+    for entry in node.entries:
+        if type(entry) is tuple:
+            yield entry
+        else:
+            yield from _trie_items(entry)
+
+
+_MISSING = object()
+
+
+class HashTrie(Mapping):
+    # A persistent hash array mapped trie: set() and delete() return a new trie
+    # that shares every untouched node with this one
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, root=None, size: int = 0):
+        self._root = root
+        self._size = size
+
+    @staticmethod
+    def from_items(items):
+        trie = HashTrie()
+        for key, value in items:
+            trie = trie.set(key, value)
+        return trie
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, key):
+        value = _trie_get(self._root, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return _trie_get(self._root, key, default)
+
+    def __iter__(self):
+        for key, _ in _trie_items(self._root):
+            yield key
+
+    def items(self):
+        return _trie_items(self._root)
+
+    def set(self, key, value):
+        root, added = _trie_set(self._root, (key, value), _trie_hash(key), 0)
+        return HashTrie(root, self._size + 1 if added else self._size)
+
+    def delete(self, key):
+        if self._root is None:
+            return self
+        root = _trie_delete(self._root, key, _trie_hash(key), 0)
+        if root is self._root:
+            return self
+        return HashTrie(root, self._size - 1)
+
+
 class MHash(MObject):
     __match_args__ = ("pairs",)
 
     def __init__(self, pairs):
-        self.pairs = pairs
+        self.pairs = pairs if type(pairs) is HashTrie else HashTrie.from_items(pairs.items())
 
     def __repr__(self):
         return "{{0}}".format(
@@ -178,6 +591,98 @@ class MHash(MObject):
         )
 
 
+def _divide(left, right):
+    # Integer division rounding toward zero, on ints or NumPy arrays alike: the
+    # floored quotient is one too low when it is negative and inexact
+    quotient = left // right
+    return quotient + ((quotient < 0) & (quotient * right != left))
+
+
+_ELEMENTWISE_OPERATORS = {"+": add, "-": sub, "*": mul, "/": _divide}
+
+
+def _numpy_operand(operand):
+    if isinstance(operand, MArray):
+        if type(operand.elements) is IntBuffer:
+            return operand.elements.values, operand.elements.bound()
+        return None, None
+    if type(operand.value) is int and _INT64_MIN <= operand.value <= _INT64_MAX:
+        return operand.value, abs(operand.value)
+    # else:
+    return None, None
+
+
+def _elementwise_with_numpy(operator: str, left, right):
+    # None when an operand is not in a buffer or the result could overflow int64
+    left_values, left_bound = _numpy_operand(left)
+    right_values, right_bound = _numpy_operand(right)
+    if left_values is None or right_values is None:
+        return None
+    if operator == "*":
+        bound = left_bound * right_bound
+    elif operator == "/":
+        # the quotient is no larger than the dividend, but -2 ** 63 // -1 overflows
+        bound = left_bound
+    else:
+        bound = left_bound + right_bound
+    if bound > _INT64_MAX:
+        return None
+    return MArray(IntBuffer(_ELEMENTWISE_OPERATORS[operator](left_values, right_values)))
+
+
+def _integer_values(operand, length: int):
+    if isinstance(operand, MArray):
+        values = []
+        for element in operand.elements:
+            if type(element) is not MInteger:
+                return None
+            values.append(element.value)
+        return values
+    # else:
+    return [operand.value] * length
+
+
+def _holds_integers(operand) -> bool:
+    if isinstance(operand, MArray) and type(operand.elements) is not IntBuffer:
+        return all(type(element) is MInteger for element in operand.elements)
+    # else: an integer, or an array of integers in a buffer
+    return True
+
+
+def _holds_zero(operand) -> bool:
+    if isinstance(operand, MArray):
+        if type(operand.elements) is IntBuffer:
+            return not operand.elements.values.all()
+        return any(element.value == 0 for element in operand.elements)
+    # else:
+    return operand.value == 0
+
+
+def elementwise(operator: str, left, right):
+    # Arithmetic between two integer arrays, or an integer array and an integer.
+    # None when an array holds anything but integers, which is checked before
+    # the lengths so that such arrays get the usual operator error
+    if not _holds_integers(left) or not _holds_integers(right):
+        return None
+    if isinstance(left, MArray) and isinstance(right, MArray) and len(left.elements) != len(right.elements):
+        return MError(
+            f"array length mismatch: {len(left.elements)} {operator} {len(right.elements)}"
+        )
+    if operator == "/" and _holds_zero(right):
+        return MError("division by zero")
+    result = _elementwise_with_numpy(operator, left, right)
+    if result is not None:
+        return result
+    length = len(left.elements if isinstance(left, MArray) else right.elements)
+    function = _ELEMENTWISE_OPERATORS[operator]
+    return MArray(
+        [
+            MInteger(function(lhs, rhs))
+            for lhs, rhs in zip(_integer_values(left, length), _integer_values(right, length))
+        ]
+    )
+
+
 def _arg_size_check(expected_size, args, body):
     length = len(args)
     if length == expected_size:
@@ -201,8 +706,8 @@ def _len(args):
     def body(arguments):
         arg = arguments[0]
         match arg:
-            case MString(value):
-                return MInteger(len(value))
+            case MString():
+                return MInteger(len(arg))
             case MArray(elements):
                 return MInteger(len(elements))
             case _:
@@ -213,8 +718,7 @@ def _len(args):
 
 def _push(args):
     def body(array, _):
-        array.elements.append(args[1])
-        return MArray(array.elements)
+        return MArray(array.elements.push(args[1]))
 
     return _arg_size_check(
         2, args, lambda arguments: _array_check(PUSH_NAME, arguments, body)
@@ -243,23 +747,222 @@ def _rest(args):
     def body(array, length):
         if length <= 0:
             return NULL
-        del array.elements[0]
-        return MArray(array.elements)
+        return MArray(array.elements.rest())
 
     return _arg_size_check(
         1, args, lambda arguments: _array_check(REST_NAME, arguments, body)
     )
 
 
+def _hash_check(name, args, body):
+    hash_object = args[0]
+    match hash_object:
+        case MHash():
+            key = args[1]
+            if not isinstance(key, Hashable):
+                return MError(f"unusable as hash key: {key.type_desc()}")
+            return body(hash_object.pairs, key)
+        case _:
+            return MError(
+                f"argument to `{name}` must be HASH, got {hash_object.type_desc()}"
+            )
+
+
+def _set(args):
+    def body(pairs, key):
+        return MHash(pairs.set(key.hash_key(), HashPair(key, args[2])))
+
+    return _arg_size_check(
+        3, args, lambda arguments: _hash_check(SET_NAME, arguments, body)
+    )
+
+
+def _delete(args):
+    def body(pairs, key):
+        return MHash(pairs.delete(key.hash_key()))
+
+    return _arg_size_check(
+        2, args, lambda arguments: _hash_check(DELETE_NAME, arguments, body)
+    )
+
+
+def _string_check(name, args, body):
+    string = args[0]
+    if not isinstance(string, MString):
+        return MError(f"argument to `{name}` must be STRING, got {string.type_desc()}")
+    for arg in args[1:]:
+        if not isinstance(arg, MInteger):
+            return MError(f"argument to `{name}` must be INTEGER, got {arg.type_desc()}")
+    return body(string, *(arg.value for arg in args[1:]))
+
+
+def _slice(args):
+    def body(string, start, end):
+        return string.view(start, end)
+
+    return _arg_size_check(
+        3, args, lambda arguments: _string_check(SLICE_NAME, arguments, body)
+    )
+
+
+def _char_at(args):
+    def body(string, index):
+        if index < 0 or index >= len(string):
+            return NULL
+        return string.view(index, index + 1)
+
+    return _arg_size_check(
+        2, args, lambda arguments: _string_check(CHAR_AT_NAME, arguments, body)
+    )
+
+
+def _two_strings_check(name, args, body):
+    for arg in args:
+        if not isinstance(arg, MString):
+            return MError(f"argument to `{name}` must be STRING, got {arg.type_desc()}")
+    return body(args[0], args[1])
+
+
+def _find(args):
+    def body(string, other):
+        return MInteger(string.find(other))
+
+    return _arg_size_check(
+        2, args, lambda arguments: _two_strings_check(FIND_NAME, arguments, body)
+    )
+
+
+def _split(args):
+    def body(string, separator):
+        if len(separator) == 0:
+            return MError(f"separator for `{SPLIT_NAME}` must not be empty")
+        return MArray(string.split(separator))
+
+    return _arg_size_check(
+        2, args, lambda arguments: _two_strings_check(SPLIT_NAME, arguments, body)
+    )
+
+
+def _map(args):
+    def body(array, _):
+        function = args[1]
+        result = []
+        for element in array.elements:
+            value = apply_function(function, [element])
+            if type(value) is MError:
+                return value
+            result.append(value)
+        return MArray(result)
+
+    return _arg_size_check(
+        2, args, lambda arguments: _array_check(MAP_NAME, arguments, body)
+    )
+
+
+def _filter(args):
+    def body(array, _):
+        function = args[1]
+        result = []
+        for element in array.elements:
+            value = apply_function(function, [element])
+            if type(value) is MError:
+                return value
+            if value is not FALSE and value is not NULL:
+                result.append(element)
+        return MArray(result)
+
+    return _arg_size_check(
+        2, args, lambda arguments: _array_check(FILTER_NAME, arguments, body)
+    )
+
+
+def _reduce(args):
+    def body(array, _):
+        accumulator = args[1]
+        function = args[2]
+        for element in array.elements:
+            accumulator = apply_function(function, [accumulator, element])
+            if type(accumulator) is MError:
+                return accumulator
+        return accumulator
+
+    return _arg_size_check(
+        3, args, lambda arguments: _array_check(REDUCE_NAME, arguments, body)
+    )
+
+
+def _range(args):
+    if len(args) not in (1, 2):
+        return MError(f"wrong number of arguments. got={len(args)}, want=1 or 2")
+    for arg in args:
+        if not isinstance(arg, MInteger):
+            return MError(f"argument to `{RANGE_NAME}` must be INTEGER, got {arg.type_desc()}")
+    start, end = (0, args[0].value) if len(args) == 1 else (args[0].value, args[1].value)
+    return MArray([MInteger(i) for i in range(start, end)])
+
+
+def _sort(args):
+    def body(array, _):
+        elements = list(array.elements)
+        for element_type in (MInteger, MString):
+            if all(type(element) is element_type for element in elements):
+                return MArray(sorted(elements, key=lambda element: element.value))
+        return MError(f"argument to `{SORT_NAME}` must be ARRAY of INTEGER or STRING")
+
+    return _arg_size_check(
+        1, args, lambda arguments: _array_check(SORT_NAME, arguments, body)
+    )
+
+
+def _sum(args):
+    def body(array, _):
+        total = 0
+        for element in array.elements:
+            if type(element) is not MInteger:
+                return MError(
+                    f"argument to `{SUM_NAME}` must be ARRAY of INTEGER, got {element.type_desc()}"
+                )
+            total += element.value
+        return MInteger(total)
+
+    return _arg_size_check(
+        1, args, lambda arguments: _array_check(SUM_NAME, arguments, body)
+    )
+
+
 LEN_NAME = "len"
 PUSH_NAME = "push"
 FIRST_NAME = "first"
 LAST_NAME = "last"
 REST_NAME = "rest"
+SET_NAME = "set"
+DELETE_NAME = "delete"
+SLICE_NAME = "slice"
+SPLIT_NAME = "split"
+FIND_NAME = "find"
+CHAR_AT_NAME = "char_at"
+MAP_NAME = "map"
+FILTER_NAME = "filter"
+REDUCE_NAME = "reduce"
+RANGE_NAME = "range"
+SORT_NAME = "sort"
+SUM_NAME = "sum"
 BUILTINS = {
     LEN_NAME: MBuiltinFunction(_len),
     PUSH_NAME: MBuiltinFunction(_push),
     FIRST_NAME: MBuiltinFunction(_first),
     LAST_NAME: MBuiltinFunction(_last),
     REST_NAME: MBuiltinFunction(_rest),
+    SET_NAME: MBuiltinFunction(_set),
+    DELETE_NAME: MBuiltinFunction(_delete),
+    SLICE_NAME: MBuiltinFunction(_slice),
+    SPLIT_NAME: MBuiltinFunction(_split),
+    FIND_NAME: MBuiltinFunction(_find),
+    CHAR_AT_NAME: MBuiltinFunction(_char_at),
+    MAP_NAME: MBuiltinFunction(_map),
+    FILTER_NAME: MBuiltinFunction(_filter),
+    REDUCE_NAME: MBuiltinFunction(_reduce),
+    RANGE_NAME: MBuiltinFunction(_range),
+    SORT_NAME: MBuiltinFunction(_sort),
+    SUM_NAME: MBuiltinFunction(_sum),
 }
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import tempfile
+
+from astree import Program
+from lexer import Lexer
+from parser import Parser
+from serializer import FORMAT_VERSION, FormatError, dumps, loads_with_errors
+
+CACHE_DIRECTORY = "__brunocache__"
+
+
+class ParseCache:
+    # Parsed programs on disk, one file per distinct source named after the
+    # SHA-256 of the source and the serializer's format version, so a changed
+    # source or format never reads a stale entry
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, source: str) -> str:
+        digest = hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.v{FORMAT_VERSION}.ast")
+
+    def parse(self, source: str) -> tuple[Program, list[str]]:
+        # The program and the parser errors, read from the cache when possible.
+        # Unreadable or outdated entries are parsed again and replaced
+        path = self.path(source)
+        try:
+            with open(path, "rb") as file:
+                program, errors = loads_with_errors(file.read())
+            self.hits += 1
+            return program, errors
+        except (OSError, FormatError):
+            self.misses += 1
+
+        parser = Parser(Lexer(source))
+        program = parser.parse_program()
+        errors = list(parser.errors())
+        self._write(path, dumps(program, errors))
+        return program, errors
+
+    def parse_file(self, path: str) -> tuple[Program, list[str]]:
+        with open(path, encoding="utf-8") as file:
+            return self.parse(file.read())
+
+    def _write(self, path: str, data: bytes):
+        # Written to a temporary file in the same directory, then renamed over
+        # the entry, so concurrent readers see a whole file or none. A cache
+        # that cannot be written is not an error, the source is parsed again
+        # next time
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except OSError:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+
+
+def cache_for(path: str) -> ParseCache:
+    # the cache next to a source file, like __pycache__
+    return ParseCache(os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIRECTORY))
@@ -20,8 +20,8 @@ from astree import (
     StringLiteral,
     HashLiteral,
 )
-from lexer import Lexer
-from tokens import TokenType, Token
+from lexer import FIXED_TOKENS, Lexer, TokenStream
+from tokens import TokenType, Token, TOKEN_KINDS, TOKEN_TYPES
 
 
 class Precedence(IntEnum):
@@ -35,52 +35,142 @@ class Precedence(IntEnum):
     INDEX = auto()
 
 
-class Parser:
-    def __init__(self, lexer: Lexer):
+# what an IterativeParser stack entry is waiting to complete
+_PREFIX = "prefix"
+_INFIX = "infix"
+_GROUP = "group"
+_INDEX = "index"
+_ARRAY = "array"
+_CALL = "call"
+
+# The parser compares integer token kinds, see TOKEN_KINDS
+_EOF_KIND = TOKEN_KINDS[TokenType.EOF]
+_IDENT_KIND = TOKEN_KINDS[TokenType.IDENT]
+_ASSIGN_KIND = TOKEN_KINDS[TokenType.ASSIGN]
+_COMMA_KIND = TOKEN_KINDS[TokenType.COMMA]
+_SEMICOLON_KIND = TOKEN_KINDS[TokenType.SEMICOLON]
+_COLON_KIND = TOKEN_KINDS[TokenType.COLON]
+_MINUS_KIND = TOKEN_KINDS[TokenType.MINUS]
+_BANG_KIND = TOKEN_KINDS[TokenType.BANG]
+_LPAREN_KIND = TOKEN_KINDS[TokenType.LPAREN]
+_RPAREN_KIND = TOKEN_KINDS[TokenType.RPAREN]
+_LBRACE_KIND = TOKEN_KINDS[TokenType.LBRACE]
+_RBRACE_KIND = TOKEN_KINDS[TokenType.RBRACE]
+_LBRACKET_KIND = TOKEN_KINDS[TokenType.LBRACKET]
+_RBRACKET_KIND = TOKEN_KINDS[TokenType.RBRACKET]
+_LET_KIND = TOKEN_KINDS[TokenType.LET]
+_TRUE_KIND = TOKEN_KINDS[TokenType.TRUE]
+_ELSE_KIND = TOKEN_KINDS[TokenType.ELSE]
+_RETURN_KIND = TOKEN_KINDS[TokenType.RETURN]
+
+# Enum attribute lookups are slow, so IterativeParser reads these instead
+_LOWEST = Precedence.LOWEST
+_PREFIX_PRECEDENCE = Precedence.PREFIX
+
+
+def _by_kind(table: dict) -> dict:
+    return {TOKEN_KINDS[token_type]: value for token_type, value in table.items()}
+
+
+class _StreamReader:
+    # Reads the kinds of a TokenStream from position on. A token is referred to
+    # by its index, and its literal is only sliced when a Token is built
+    def __init__(self, stream: TokenStream, position: int):
+        self._kinds = stream.kinds
+        self._stream = stream
+        self._last = len(stream) - 1
+        self._position = position
+
+    def read(self) -> tuple[int, int]:
+        index = self._position
+        if index < self._last:
+            self._position = index + 1
+        return self._kinds[index], index
+
+    def token(self, kind: int, index: int) -> Token:
+        token = FIXED_TOKENS[kind]
+        if token is None:
+            return Token(TOKEN_TYPES[kind], self._stream.literal(index))
+        # else:
+        return token
+
+
+class _LexerReader:
+    # Reads the Tokens of a lexer one at a time; a token is referred to by itself
+    def __init__(self, lexer):
         self._lexer = lexer
-        self._cur_token: Token | None = None
-        self._peek_token: Token | None = None
+
+    def read(self) -> tuple[int, Token]:
+        token = self._lexer.next_token()
+        return TOKEN_KINDS[token.token_type], token
+
+    @staticmethod
+    def token(_: int, token: Token) -> Token:
+        return token
+
+
+class Parser:
+    # Parses a TokenStream by reading its kinds from position on, or the Tokens
+    # of a lexer such as Lexer, RegexLexer or StreamLexer
+    def __init__(self, lexer: Lexer | TokenStream, position: int = 0):
+        reader = (
+            _StreamReader(lexer, position)
+            if isinstance(lexer, TokenStream)
+            else _LexerReader(lexer)
+        )
+        self._read = reader.read
+        self._make_token = reader.token
+        self._cur_kind = _EOF_KIND
+        self._cur_ref = None
+        self._peek_kind = _EOF_KIND
+        self._peek_ref = None
         self._errors = []
-        self._prefix_parsers = {
-            TokenType.INT: self._parse_integer_literal,
-            TokenType.TRUE: self._parse_boolean_literal,
-            TokenType.FALSE: self._parse_boolean_literal,
-            TokenType.IDENT: self._parse_identifier,
-            TokenType.BANG: self._parse_prefix_expression,
-            TokenType.MINUS: self._parse_prefix_expression,
-            TokenType.LPAREN: self._parse_group_expression,
-            TokenType.LBRACKET: self._parse_array_literal,
-            TokenType.IF: self._parse_if_expression,
-            TokenType.FUNCTION: self._parse_function_literal,
-            TokenType.STRING: self._parse_string_literal,
-            TokenType.LBRACE: self._parse_hash_literal,
-        }
-        self._infix_parsers = {
-            TokenType.PLUS: self._parse_infix_expression,
-            TokenType.MINUS: self._parse_infix_expression,
-            TokenType.SLASH: self._parse_infix_expression,
-            TokenType.ASTERISK: self._parse_infix_expression,
-            TokenType.EQ: self._parse_infix_expression,
-            TokenType.NOT_EQ: self._parse_infix_expression,
-            TokenType.LT: self._parse_infix_expression,
-            TokenType.GT: self._parse_infix_expression,
-            TokenType.LPAREN: self._parse_call_expression,
-            TokenType.LBRACKET: self._parse_index_expression,
-        }
+        self._prefix_parsers = _by_kind(
+            {
+                TokenType.INT: self._parse_integer_literal,
+                TokenType.TRUE: self._parse_boolean_literal,
+                TokenType.FALSE: self._parse_boolean_literal,
+                TokenType.IDENT: self._parse_identifier,
+                TokenType.BANG: self._parse_prefix_expression,
+                TokenType.MINUS: self._parse_prefix_expression,
+                TokenType.LPAREN: self._parse_group_expression,
+                TokenType.LBRACKET: self._parse_array_literal,
+                TokenType.IF: self._parse_if_expression,
+                TokenType.FUNCTION: self._parse_function_literal,
+                TokenType.STRING: self._parse_string_literal,
+                TokenType.LBRACE: self._parse_hash_literal,
+            }
+        )
+        self._infix_parsers = _by_kind(
+            {
+                TokenType.PLUS: self._parse_infix_expression,
+                TokenType.MINUS: self._parse_infix_expression,
+                TokenType.SLASH: self._parse_infix_expression,
+                TokenType.ASTERISK: self._parse_infix_expression,
+                TokenType.EQ: self._parse_infix_expression,
+                TokenType.NOT_EQ: self._parse_infix_expression,
+                TokenType.LT: self._parse_infix_expression,
+                TokenType.GT: self._parse_infix_expression,
+                TokenType.LPAREN: self._parse_call_expression,
+                TokenType.LBRACKET: self._parse_index_expression,
+            }
+        )
         self._next_token()
         self._next_token()
-        self._precedences = {
-            TokenType.EQ: Precedence.EQUALS,
-            TokenType.NOT_EQ: Precedence.EQUALS,
-            TokenType.LT: Precedence.LESS_GREATER,
-            TokenType.GT: Precedence.LESS_GREATER,
-            TokenType.PLUS: Precedence.SUM,
-            TokenType.MINUS: Precedence.SUM,
-            TokenType.SLASH: Precedence.PRODUCT,
-            TokenType.ASTERISK: Precedence.PRODUCT,
-            TokenType.LPAREN: Precedence.CALL,
-            TokenType.LBRACKET: Precedence.INDEX,
-        }
+        self._precedences = _by_kind(
+            {
+                TokenType.EQ: Precedence.EQUALS,
+                TokenType.NOT_EQ: Precedence.EQUALS,
+                TokenType.LT: Precedence.LESS_GREATER,
+                TokenType.GT: Precedence.LESS_GREATER,
+                TokenType.PLUS: Precedence.SUM,
+                TokenType.MINUS: Precedence.SUM,
+                TokenType.SLASH: Precedence.PRODUCT,
+                TokenType.ASTERISK: Precedence.PRODUCT,
+                TokenType.LPAREN: Precedence.CALL,
+                TokenType.LBRACKET: Precedence.INDEX,
+            }
+        )
 
     def errors(self):
         return self._errors
@@ -88,77 +178,95 @@ class Parser:
     def parse_program(self):
         # print("parse_program")
         statements = []
-        while self._cur_token.token_type != TokenType.EOF:
-            statement = self._parse_statement()
+        while not self.at_end():
+            statement = self.parse_top_level_statement()
             # print(f"statement = {statement}")
             if statement is not None:
                 statements.append(statement)
-            self._next_token()
 
         return Program(statements)
 
+    def at_end(self):
+        return self._cur_kind == _EOF_KIND
+
+    def token_index(self) -> int:
+        # The index of the current token, when parsing a TokenStream
+        return self._cur_ref
+
+    def parse_top_level_statement(self):
+        # One statement of parse_program, which may be None after an error. The
+        # parser is left on the first token of the next statement
+        statement = self._parse_statement()
+        self._next_token()
+        return statement
+
     def _parse_statement(self):
         # print("_parse_statement")
-        match self._cur_token.token_type:
-            case TokenType.LET:
-                return self._parse_let_statement()
-            case TokenType.RETURN:
-                return self._parse_return_statement()
-            case _:
-                return self._parse_expression_statement()
+        kind = self._cur_kind
+        if kind == _LET_KIND:
+            return self._parse_let_statement()
+        if kind == _RETURN_KIND:
+            return self._parse_return_statement()
+        # else:
+        return self._parse_expression_statement()
 
     def _next_token(self):
         # print("_next_token")
-        self._cur_token = self._peek_token
-        self._peek_token = self._lexer.next_token()
+        self._cur_kind = self._peek_kind
+        self._cur_ref = self._peek_ref
+        self._peek_kind, self._peek_ref = self._read()
+
+    def _cur_token(self) -> Token:
+        return self._make_token(self._cur_kind, self._cur_ref)
 
     def _parse_let_statement(self):
         # print("_parse_let_statement")
-        token = self._cur_token
-        if not self._expect_peek(TokenType.IDENT):
+        token = self._cur_token()
+        if not self._expect_peek(_IDENT_KIND):
             return None
 
-        name = Identifier(self._cur_token, self._cur_token.literal)
+        name_token = self._cur_token()
+        name = Identifier(name_token, name_token.literal)
 
-        if not self._expect_peek(TokenType.ASSIGN):
+        if not self._expect_peek(_ASSIGN_KIND):
             return None
 
         self._next_token()
 
         value = self._parse_expression(Precedence.LOWEST)
 
-        if self._peek_token_is(TokenType.SEMICOLON):
+        if self._peek_token_is(_SEMICOLON_KIND):
             self._next_token()
 
         return LetStatement(token, name, value)
 
-    def _expect_peek(self, token_type):
+    def _expect_peek(self, kind):
         # print("_expect_peek")
-        if self._peek_token_is(token_type):
+        if self._peek_kind == kind:
             self._next_token()
             return True
 
-        self._peek_error(token_type)
+        self._peek_error(kind)
         return False
 
-    def _peek_token_is(self, token_type):
+    def _peek_token_is(self, kind):
         # print("_peek_token_is")
-        return self._peek_token.token_type == token_type
+        return self._peek_kind == kind
 
     def _parse_expression(self, precedence):
         # print("_parse_expression")
-        prefix = self._prefix_parsers.get(self._cur_token.token_type, None)
+        prefix = self._prefix_parsers.get(self._cur_kind, None)
         if prefix is None:
-            self._no_prefix_parser_error(self._cur_token.token_type)
+            self._no_prefix_parser_error(self._cur_kind)
             return None
 
         left = prefix()
 
         while (
-            not self._peek_token_is(TokenType.SEMICOLON)
+            not self._peek_token_is(_SEMICOLON_KIND)
             and precedence < self._peek_precedence()
         ):
-            infix = self._infix_parsers.get(self._peek_token.token_type, None)
+            infix = self._infix_parsers.get(self._peek_kind, None)
             if infix is None:
                 return left
 
@@ -167,21 +275,21 @@ class Parser:
 
         return left
 
-    def _no_prefix_parser_error(self, token_type):
+    def _no_prefix_parser_error(self, kind):
         # print("_no_prefix_parser_error")
-        self._errors.append(f"no prefix parser for {token_type} function")
+        self._errors.append(f"no prefix parser for {TOKEN_TYPES[kind]} function")
 
     def _parse_expression_statement(self):
         # print("_parse_expression_statement")
-        token = self._cur_token
+        token = self._cur_token()
         expression = self._parse_expression(Precedence.LOWEST)
-        if self._peek_token_is(TokenType.SEMICOLON):
+        if self._peek_token_is(_SEMICOLON_KIND):
             self._next_token()
 
         return ExpressionStatement(token, expression)
 
     def _parse_integer_literal(self):
-        token = self._cur_token
+        token = self._cur_token()
         try:
             value = int(token.literal)
             return IntegerLiteral(token, value)
@@ -190,26 +298,27 @@ class Parser:
             return None
 
     def _parse_boolean_literal(self):
-        return BooleanLiteral(self._cur_token, self._cur_token_is(TokenType.TRUE))
+        return BooleanLiteral(self._cur_token(), self._cur_token_is(_TRUE_KIND))
 
-    def _cur_token_is(self, token_type):
-        return self._cur_token.token_type == token_type
+    def _cur_token_is(self, kind):
+        return self._cur_kind == kind
 
     def _parse_identifier(self):
-        return Identifier(self._cur_token, self._cur_token.literal)
+        token = self._cur_token()
+        return Identifier(token, token.literal)
 
     def _parse_return_statement(self):
-        token = self._cur_token
+        token = self._cur_token()
         self._next_token()
         return_value = self._parse_expression(Precedence.LOWEST)
 
-        while self._peek_token_is(TokenType.SEMICOLON):
+        while self._peek_token_is(_SEMICOLON_KIND):
             self._next_token()
 
         return ReturnStatement(token, return_value)
 
     def _parse_prefix_expression(self):
-        token = self._cur_token
+        token = self._cur_token()
         operator = token.literal
         self._next_token()
 
@@ -218,7 +327,7 @@ class Parser:
         return PrefixExpression(token, operator, right)
 
     def _parse_infix_expression(self, left: Expression | None):
-        token = self._cur_token
+        token = self._cur_token()
         operator = token.literal
         precedence = self._cur_precedence()
         self._next_token()
@@ -226,23 +335,23 @@ class Parser:
         return InfixExpression(token, left, operator, right)
 
     def _parse_call_expression(self, expression: Expression | None):
-        token = self._cur_token
-        arguments = self._parse_expression_list(TokenType.RPAREN)
+        token = self._cur_token()
+        arguments = self._parse_expression_list(_RPAREN_KIND)
         return CallExpression(token, expression, arguments)
 
     def _parse_group_expression(self):
         self._next_token()
         exp = self._parse_expression(Precedence.LOWEST)
-        return exp if self._expect_peek(TokenType.RPAREN) else None
+        return exp if self._expect_peek(_RPAREN_KIND) else None
 
     def _peek_precedence(self):
-        return self._find_precedence(self._peek_token.token_type)
+        return self._find_precedence(self._peek_kind)
 
-    def _find_precedence(self, token_type) -> Precedence:
-        return self._precedences.get(token_type, Precedence.LOWEST)
+    def _find_precedence(self, kind) -> Precedence:
+        return self._precedences.get(kind, Precedence.LOWEST)
 
     def _cur_precedence(self):
-        return self._find_precedence(self._cur_token.token_type)
+        return self._find_precedence(self._cur_kind)
 
     def _parse_expression_list(self, end):
         arguments = []
@@ -253,7 +362,7 @@ class Parser:
         self._next_token()
         arguments.append(self._parse_expression(Precedence.LOWEST))
 
-        while self._peek_token_is(TokenType.COMMA):
+        while self._peek_token_is(_COMMA_KIND):
             self._next_token()
             self._next_token()
             arguments.append(self._parse_expression(Precedence.LOWEST))
@@ -261,39 +370,39 @@ class Parser:
         return arguments if self._expect_peek(end) else None
 
     def _parse_array_literal(self):
-        token = self._cur_token
-        return ArrayLiteral(token, self._parse_expression_list(TokenType.RBRACKET))
+        token = self._cur_token()
+        return ArrayLiteral(token, self._parse_expression_list(_RBRACKET_KIND))
 
     def _parse_index_expression(self, left):
-        token = self._cur_token
+        token = self._cur_token()
         self._next_token()
 
         index = self._parse_expression(Precedence.LOWEST)
 
         return (
             IndexExpression(token, left, index)
-            if self._expect_peek(TokenType.RBRACKET)
+            if self._expect_peek(_RBRACKET_KIND)
             else None
         )
 
     def _parse_if_expression(self):
-        token = self._cur_token
-        if not self._expect_peek(TokenType.LPAREN):
+        token = self._cur_token()
+        if not self._expect_peek(_LPAREN_KIND):
             return None
 
         self._next_token()
         condition = self._parse_expression(Precedence.LOWEST)
-        if not self._expect_peek(TokenType.RPAREN):
+        if not self._expect_peek(_RPAREN_KIND):
             return None
 
-        if not self._expect_peek(TokenType.LBRACE):
+        if not self._expect_peek(_LBRACE_KIND):
             return None
 
         consequence = self._parse_block_statement()
 
-        if self._peek_token_is(TokenType.ELSE):
+        if self._peek_token_is(_ELSE_KIND):
             self._next_token()
-            if not self._expect_peek(TokenType.LBRACE):
+            if not self._expect_peek(_LBRACE_KIND):
                 return None
             alternative = self._parse_block_statement()
         else:
@@ -302,12 +411,12 @@ class Parser:
         return IfExpression(token, condition, consequence, alternative)
 
     def _parse_block_statement(self):
-        token = self._cur_token
+        token = self._cur_token()
         statements = []
         self._next_token()
 
-        while not self._cur_token_is(TokenType.RBRACE) and not self._cur_token_is(
-            TokenType.EOF
+        while not self._cur_token_is(_RBRACE_KIND) and not self._cur_token_is(
+            _EOF_KIND
         ):
             statement = self._parse_statement()
             if statement is not None:
@@ -317,65 +426,189 @@ class Parser:
         return BlockStatement(token, statements)
 
     def _parse_function_literal(self):
-        token = self._cur_token
-        if not self._expect_peek(TokenType.LPAREN):
+        token = self._cur_token()
+        if not self._expect_peek(_LPAREN_KIND):
             return None
 
         parameters = self._parse_function_parameters()
 
-        if not self._expect_peek(TokenType.LBRACE):
+        if not self._expect_peek(_LBRACE_KIND):
             return None
 
         body = self._parse_block_statement()
         return FunctionLiteral(token, parameters, body)
 
-    def _peek_error(self, token_type):
+    def _peek_error(self, kind):
         self._errors.append(
-            f"Expected next token to be {token_type}, got {self._peek_token.token_type} instead"
+            f"Expected next token to be {TOKEN_TYPES[kind]}, "
+            f"got {TOKEN_TYPES[self._peek_kind]} instead"
         )
 
     def _parse_function_parameters(self):
         parameters = []
-        if self._peek_token_is(TokenType.RPAREN):
+        if self._peek_token_is(_RPAREN_KIND):
             self._next_token()
             return parameters
 
         self._next_token()
-        token = self._cur_token
+        token = self._cur_token()
 
         parameters.append(Identifier(token, token.literal))
 
-        while self._peek_token_is(TokenType.COMMA):
+        while self._peek_token_is(_COMMA_KIND):
             self._next_token()
             self._next_token()
-            inner_token = self._cur_token
+            inner_token = self._cur_token()
             parameters.append(Identifier(inner_token, inner_token.literal))
 
-        if not self._expect_peek(TokenType.RPAREN):
+        if not self._expect_peek(_RPAREN_KIND):
             return None
 
         return parameters
 
     def _parse_string_literal(self):
-        return StringLiteral(self._cur_token, self._cur_token.literal)
+        token = self._cur_token()
+        return StringLiteral(token, token.literal)
 
     def _parse_hash_literal(self):
-        token = self._cur_token
+        token = self._cur_token()
         pairs = {}
-        while not self._peek_token_is(TokenType.RBRACE):
+        while not self._peek_token_is(_RBRACE_KIND):
             self._next_token()
             key = self._parse_expression(Precedence.LOWEST)
-            if not self._expect_peek(TokenType.COLON):
+            if not self._expect_peek(_COLON_KIND):
                 return None
 
             self._next_token()
             value = self._parse_expression(Precedence.LOWEST)
             pairs[key] = value
-            if not self._peek_token_is(TokenType.RBRACE) and not self._expect_peek(
-                TokenType.COMMA
+            if not self._peek_token_is(_RBRACE_KIND) and not self._expect_peek(
+                _COMMA_KIND
             ):
                 return None
 
         return (
-            HashLiteral(token, pairs) if self._expect_peek(TokenType.RBRACE) else None
+            HashLiteral(token, pairs) if self._expect_peek(_RBRACE_KIND) else None
         )
+
+
+class IterativeParser(Parser):
+    # Same AST and errors as Parser, but expressions are parsed with an explicit
+    # stack of the prefix operators, infix operators, groups, array literals,
+    # calls and indexes still waiting for an operand. Long or deeply nested
+    # expressions do not hit the recursion limit; if, fn and hash literals
+    # still go through Parser's methods
+    def _parse_expression(self, precedence):
+        precedences = self._precedences
+        infix_parsers = self._infix_parsers
+        make_token = self._make_token
+        pending = []
+        left = None
+        expect_operand = True
+        while True:
+            operators = True
+            if expect_operand:
+                expect_operand = False
+                kind = self._cur_kind
+                if kind == _IDENT_KIND:
+                    token = make_token(kind, self._cur_ref)
+                    left = Identifier(token, token.literal)
+                elif kind == _MINUS_KIND or kind == _BANG_KIND:
+                    pending.append((_PREFIX, make_token(kind, self._cur_ref), precedence))
+                    self._next_token()
+                    precedence = _PREFIX_PRECEDENCE
+                    expect_operand = True
+                    continue
+                elif kind == _LPAREN_KIND:
+                    pending.append((_GROUP, None, precedence))
+                    self._next_token()
+                    precedence = _LOWEST
+                    expect_operand = True
+                    continue
+                elif kind == _LBRACKET_KIND:
+                    token = make_token(kind, self._cur_ref)
+                    if self._peek_kind != _RBRACKET_KIND:
+                        pending.append((_ARRAY, token, precedence, None, []))
+                        self._next_token()
+                        precedence = _LOWEST
+                        expect_operand = True
+                        continue
+                    self._next_token()
+                    left = ArrayLiteral(token, [])
+                else:
+                    prefix = self._prefix_parsers.get(kind, None)
+                    if prefix is None:
+                        self._no_prefix_parser_error(kind)
+                        left = None
+                        operators = False
+                    else:
+                        left = prefix()
+
+            while operators:
+                kind = self._peek_kind
+                if (
+                    kind == _SEMICOLON_KIND
+                    or precedence >= precedences.get(kind, _LOWEST)
+                    or kind not in infix_parsers
+                ):
+                    break
+                self._next_token()
+                token = make_token(kind, self._cur_ref)
+                if kind == _LPAREN_KIND:
+                    if self._peek_kind == _RPAREN_KIND:
+                        self._next_token()
+                        left = CallExpression(token, left, [])
+                        continue
+                    pending.append((_CALL, token, precedence, left, []))
+                    precedence = _LOWEST
+                elif kind == _LBRACKET_KIND:
+                    pending.append((_INDEX, token, precedence, left))
+                    precedence = _LOWEST
+                else:
+                    pending.append((_INFIX, token, precedence, left))
+                    precedence = precedences[kind]
+                self._next_token()
+                expect_operand = True
+                break
+            if expect_operand:
+                continue
+
+            # left is the operand the innermost pending construct was waiting for
+            if len(pending) == 0:
+                return left
+            frame = pending.pop()
+            construct = frame[0]
+            token = frame[1]
+            if construct is _INFIX:
+                left = InfixExpression(token, frame[3], token.literal, left)
+            elif construct is _PREFIX:
+                left = PrefixExpression(token, token.literal, left)
+            elif construct is _GROUP:
+                if not self._expect_peek(_RPAREN_KIND):
+                    left = None
+            elif construct is _INDEX:
+                left = (
+                    IndexExpression(token, frame[3], left)
+                    if self._expect_peek(_RBRACKET_KIND)
+                    else None
+                )
+            else:
+                elements = frame[4]
+                elements.append(left)
+                if self._peek_kind == _COMMA_KIND:
+                    self._next_token()
+                    self._next_token()
+                    pending.append(frame)
+                    precedence = _LOWEST
+                    expect_operand = True
+                    continue
+                # else: the list is complete
+                if construct is _ARRAY:
+                    if not self._expect_peek(_RBRACKET_KIND):
+                        elements = None
+                    left = ArrayLiteral(token, elements)
+                else:
+                    if not self._expect_peek(_RPAREN_KIND):
+                        elements = None
+                    left = CallExpression(token, frame[3], elements)
+            precedence = frame[2]
@@ -0,0 +1,46 @@
+from threading import Lock
+from typing import Any, NamedTuple
+
+from astree import Program
+from lexer import Lexer
+from memoize import CacheInfo, FunctionCache, DEFAULT_MAXSIZE, LRU
+from parser import Parser
+
+
+class CachedProgram(NamedTuple):
+    program: Program
+    prepared: Any
+    errors: list[str]
+
+
+class ProgramCache:
+    # Parsed programs keyed by their source text, least recently used first out.
+    # prepare turns a Program into the form an engine runs, such as compiled
+    # closures or bytecode, so a repeated source skips that step too
+    def __init__(self, prepare=None, maxsize: int | None = DEFAULT_MAXSIZE):
+        self._prepare = prepare
+        self._cache = FunctionCache(maxsize, LRU)
+        self._lock = Lock()
+
+    def get(self, source: str) -> CachedProgram:
+        with self._lock:
+            cached = self._cache.get(source)
+        if cached is not None:
+            return cached
+
+        # parsed outside the lock, two threads may both parse a new source
+        parser = Parser(Lexer(source))
+        program = parser.parse_program()
+        prepared = program if self._prepare is None else self._prepare(program)
+        cached = CachedProgram(program, prepared, list(parser.errors()))
+        with self._lock:
+            self._cache.put(source, cached)
+        return cached
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return self._cache.info()
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -1,23 +1,21 @@
 from evaluator import Environment, evaluate
-from lexer import Lexer
-from parser import Parser
+from program_cache import ProgramCache
 
 PROMPT = ">>"
 
 
 def main():
     env = Environment()
+    programs = ProgramCache()
     # print(PROMPT)
     while True:
         code = input(PROMPT)
-        lexer = Lexer(code)
-        parser = Parser(lexer)
-        program = parser.parse_program()
+        program, _, errors = programs.get(code)
 
-        if len(parser.errors()) > 0:
+        if len(errors) > 0:
             print("Whoops! we ran into some monkey business here")
             print("parser errors:")
-            for error in parser.errors():
+            for error in errors:
                 print(f"\t{error}")
 
         evaluated = evaluate(program, env)
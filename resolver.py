@@ -0,0 +1,167 @@
+from typing import NamedTuple
+
+from astree import (
+    Program,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+)
+
+
+class Address(NamedTuple):
+    depth: int
+    slot: int
+
+
+# The slot of a global's Address, whose depth counts the frames above the Environment
+GLOBAL = -1
+
+
+class FunctionLayout(NamedTuple):
+    names: tuple[str, ...]
+    slots: dict[str, int]
+    num_parameters: int
+
+
+def declared_names(node, names: list[str]):
+    # nested function literals get their own scope, so they are not visited
+    match node:
+        case LetStatement(name, value):
+            if name.value not in names:
+                names.append(name.value)
+            declared_names(value, names)
+        case Program(statements) | BlockStatement(statements=statements):
+            for statement in statements:
+                declared_names(statement, names)
+        case ExpressionStatement(expression):
+            declared_names(expression, names)
+        case ReturnStatement(value):
+            declared_names(value, names)
+        case PrefixExpression(_, right):
+            declared_names(right, names)
+        case InfixExpression(left, _, right):
+            declared_names(left, names)
+            declared_names(right, names)
+        case IfExpression():
+            declared_names(node.condition, names)
+            declared_names(node.consequence, names)
+            declared_names(node.alternative, names)
+        case CallExpression(function, arguments):
+            declared_names(function, names)
+            for argument in arguments:
+                declared_names(argument, names)
+        case IndexExpression(left, index):
+            declared_names(left, names)
+            declared_names(index, names)
+        case ArrayLiteral(elements):
+            for element in elements:
+                declared_names(element, names)
+        case HashLiteral(pairs):
+            for key, value in pairs.items():
+                declared_names(key, names)
+                declared_names(value, names)
+
+
+def function_layout(function: FunctionLiteral) -> FunctionLayout:
+    # Every parameter gets a slot, arguments are stored by position. A name
+    # repeated in the parameters refers to its last slot, like the evaluator's
+    # Environment where the last argument bound to it wins
+    names = [parameter.value for parameter in function.parameters]
+    num_parameters = len(names)
+    declared_names(function.body, names)
+    return FunctionLayout(
+        tuple(names), {name: slot for slot, name in enumerate(names)}, num_parameters
+    )
+
+
+class Resolution:
+    def __init__(self):
+        self.addresses: dict[int, Address] = {}
+        self.layouts: dict[int, FunctionLayout] = {}
+
+    def address(self, identifier: Identifier) -> Address | None:
+        # None means a global, looked up by name in the Environment and BUILTINS
+        return self.addresses.get(id(identifier), None)
+
+    def layout(self, function: FunctionLiteral) -> FunctionLayout:
+        return self.layouts[id(function)]
+
+
+class _Resolver:
+    def __init__(self):
+        self.resolution = Resolution()
+        self._scopes: list[FunctionLayout] = []
+
+    def _identifier(self, identifier: Identifier):
+        for depth, layout in enumerate(reversed(self._scopes)):
+            slot = layout.slots.get(identifier.value, None)
+            if slot is not None:
+                identifier.address = Address(depth, slot)
+                self.resolution.addresses[id(identifier)] = identifier.address
+                return
+        identifier.address = Address(len(self._scopes), GLOBAL)
+
+    def resolve(self, node):
+        match node:
+            case Identifier():
+                self._identifier(node)
+            case LetStatement(name, value):
+                self.resolve(value)
+                self._identifier(name)
+            case FunctionLiteral(parameters, body):
+                layout = function_layout(node)
+                node.layout = layout
+                self.resolution.layouts[id(node)] = layout
+                self._scopes.append(layout)
+                for parameter in parameters:
+                    self._identifier(parameter)
+                self.resolve(body)
+                self._scopes.pop()
+            case Program(statements) | BlockStatement(statements=statements):
+                for statement in statements:
+                    self.resolve(statement)
+            case ExpressionStatement(expression):
+                self.resolve(expression)
+            case ReturnStatement(value):
+                self.resolve(value)
+            case PrefixExpression(_, right):
+                self.resolve(right)
+            case InfixExpression(left, _, right):
+                self.resolve(left)
+                self.resolve(right)
+            case IfExpression():
+                self.resolve(node.condition)
+                self.resolve(node.consequence)
+                self.resolve(node.alternative)
+            case CallExpression(function, arguments):
+                self.resolve(function)
+                for argument in arguments:
+                    self.resolve(argument)
+            case IndexExpression(left, index):
+                self.resolve(left)
+                self.resolve(index)
+            case ArrayLiteral(elements):
+                for element in elements:
+                    self.resolve(element)
+            case HashLiteral(pairs):
+                for key, value in pairs.items():
+                    self.resolve(key)
+                    self.resolve(value)
+
+
+def resolve(program: Program) -> Resolution:
+    # The addresses and layouts are also stored on the Identifier and
+    # FunctionLiteral nodes, where the evaluators read them
+    resolver = _Resolver()
+    resolver.resolve(program)
+    return resolver.resolution
@@ -0,0 +1,434 @@
+import gc
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+
+from astree import (
+    Program,
+    Identifier,
+    StringLiteral,
+    IntegerLiteral,
+    BooleanLiteral,
+    LetStatement,
+    ExpressionStatement,
+    ReturnStatement,
+    PrefixExpression,
+    InfixExpression,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+    BlockStatement,
+    IfExpression,
+    FunctionLiteral,
+    HashLiteral,
+)
+from tokens import Token, TOKEN_KINDS, TOKEN_TYPES
+
+# Bump whenever the encoding, the AST classes or the parser's output change, so
+# that older cache entries are ignored
+FORMAT_VERSION = 1
+MAGIC = b"BRUNOAST"
+
+# magic, version, then the sizes of the string lengths, string pool, head table,
+# node table and error list
+_HEADER = struct.Struct("<8sHIIIII")
+
+# A node's position in this tuple is its kind in the head table
+_NODE_TYPES = (
+    Program,
+    Identifier,
+    StringLiteral,
+    IntegerLiteral,
+    BooleanLiteral,
+    LetStatement,
+    ExpressionStatement,
+    ReturnStatement,
+    PrefixExpression,
+    InfixExpression,
+    CallExpression,
+    ArrayLiteral,
+    IndexExpression,
+    BlockStatement,
+    IfExpression,
+    FunctionLiteral,
+    HashLiteral,
+)
+(
+    _PROGRAM,
+    _IDENTIFIER,
+    _STRING,
+    _INTEGER,
+    _BOOLEAN,
+    _LET,
+    _EXPRESSION,
+    _RETURN,
+    _PREFIX,
+    _INFIX,
+    _CALL,
+    _ARRAY,
+    _INDEX,
+    _BLOCK,
+    _IF,
+    _FUNCTION,
+    _HASH,
+) = range(len(_NODE_TYPES))
+_NODE_KINDS = {node_type: kind for kind, node_type in enumerate(_NODE_TYPES)}
+
+# a head with no token or no value
+_NONE = -1
+# the kinds whose head value is a string index
+_STRING_VALUES = frozenset([_IDENTIFIER, _STRING, _INTEGER, _PREFIX, _INFIX])
+
+
+class FormatError(ValueError):
+    pass
+
+
+@contextmanager
+def _without_gc():
+    # Building or walking a large tree allocates many containers, each of which
+    # can trigger a collection that traverses the whole tree built so far. AST
+    # nodes hold no cycles, so nothing is lost by collecting afterwards instead
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _sequence(nodes) -> list:
+    # a count, then the nodes
+    if nodes is None:
+        return [_NONE]
+    return [len(nodes), *nodes]
+
+
+def _layout(node, kind: int) -> tuple:
+    # What goes in the head besides the token, and the record's fields: child
+    # nodes, None, or ints for sequence lengths. Dispatches on the kind, as
+    # matching on the abstract node classes is slow
+    if kind == _IDENTIFIER or kind == _STRING:
+        return node.value, []
+    if kind == _INTEGER:
+        return str(node.value), []
+    if kind == _INFIX:
+        return node.operator, [node.left, node.right]
+    if kind == _EXPRESSION:
+        return None, [node.expression]
+    if kind == _CALL:
+        return None, [node.function, *_sequence(node.arguments)]
+    if kind == _BOOLEAN:
+        return node.value, []
+    if kind == _LET:
+        return None, [node.name, node.value]
+    if kind == _RETURN:
+        return None, [node.return_value]
+    if kind == _PREFIX:
+        return node.operator, [node.right]
+    if kind == _INDEX:
+        return None, [node.left, node.index]
+    if kind == _BLOCK or kind == _PROGRAM:
+        return None, _sequence(node.statements)
+    if kind == _ARRAY:
+        return None, _sequence(node.elements)
+    if kind == _IF:
+        return None, [node.condition, node.consequence, node.alternative]
+    if kind == _FUNCTION:
+        return None, [*_sequence(node.parameters), node.body]
+    # else: a hash literal
+    return None, [len(node.pairs), *[item for pair in node.pairs.items() for item in pair]]
+
+
+class _Encoder:
+    # Nodes are written children first, so decoding is one forward pass. Node
+    # n is referred to as n + 1, leaving 0 for None. Everything a node holds
+    # besides its children (kind, token and a literal value or operator) is
+    # interned as one head, so a leaf takes a single int
+    def __init__(self):
+        self.strings: dict[str, int] = {}
+        self.heads: dict[tuple, int] = {}
+        self.table = array("i")
+
+    def string(self, value: str) -> int:
+        index = self.strings.get(value, None)
+        if index is None:
+            index = len(self.strings)
+            self.strings[value] = index
+        return index
+
+    def _head(self, kind: int, node, value) -> int:
+        if kind == _PROGRAM:
+            head = (kind, _NONE, _NONE, _NONE)
+        else:
+            token = node.token()
+            if kind == _BOOLEAN:
+                value = int(value)
+            elif value is None:
+                value = _NONE
+            else:
+                value = self.string(value)
+            head = (kind, TOKEN_KINDS[token.token_type], self.string(token.literal), value)
+        index = self.heads.get(head, None)
+        if index is None:
+            index = len(self.heads)
+            self.heads[head] = index
+        return index
+
+    def encode(self, root: Program) -> int:
+        refs = {}
+        table = self.table
+        pending = [(root, None)]
+        while pending:
+            node, layout = pending.pop()
+            if id(node) in refs:
+                continue
+            if layout is None:
+                kind = _NODE_KINDS[type(node)]
+                value, items = _layout(node, kind)
+                pending.append((node, (kind, value, items)))
+                for item in reversed(items):
+                    if item is not None and type(item) is not int and id(item) not in refs:
+                        pending.append((item, None))
+                continue
+            kind, value, items = layout
+            table.append(self._head(kind, node, value))
+            table.extend(
+                [
+                    item if type(item) is int else 0 if item is None else refs[id(item)]
+                    for item in items
+                ]
+            )
+            refs[id(node)] = len(refs) + 1
+        return refs[id(root)]
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def dumps(program: Program, errors: list[str] = ()) -> bytes:
+    # A header, a string pool (lengths in characters, then the UTF-8 text), the
+    # head table (kind, token type, token literal, value per head), the node
+    # table and the parser errors as string indexes
+    encoder = _Encoder()
+    table = encoder.table
+    with _without_gc():
+        table.append(encoder.encode(program))
+    error_indexes = array("i", [encoder.string(error) for error in errors])
+
+    lengths = array("i", [len(value) for value in encoder.strings])
+    pool = "".join(encoder.strings).encode("utf-8", "surrogatepass")
+    heads = array("i", [field for head in encoder.heads for field in head])
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, len(lengths), len(pool), len(heads), len(table), len(error_indexes)
+    )
+    return b"".join(
+        [
+            header,
+            _little_endian(lengths).tobytes(),
+            pool,
+            _little_endian(heads).tobytes(),
+            _little_endian(table).tobytes(),
+            _little_endian(error_indexes).tobytes(),
+        ]
+    )
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        if len(data) < _HEADER.size:
+            raise FormatError("truncated header")
+        magic, version, *sizes = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise FormatError("not a serialized program")
+        if version != FORMAT_VERSION:
+            raise FormatError(f"format version {version}, expected {FORMAT_VERSION}")
+        string_count, pool_size, head_size, table_size, error_count = sizes
+        expected = _HEADER.size + pool_size + 4 * (string_count + head_size + table_size + error_count)
+        if len(data) != expected:
+            raise FormatError(f"expected {expected} bytes, got {len(data)}")
+        self._data = data
+        self._position = _HEADER.size
+        self.lengths = self._ints(string_count)
+        self.pool = self._bytes(pool_size)
+        self.heads = self._ints(head_size)
+        self.table = self._ints(table_size)
+        self.errors = self._ints(error_count)
+
+    def _bytes(self, size: int) -> bytes:
+        start = self._position
+        self._position += size
+        return self._data[start: self._position]
+
+    def _ints(self, count: int) -> list[int]:
+        values = array("i")
+        values.frombytes(self._bytes(4 * count))
+        return _little_endian(values).tolist()
+
+
+def _checked(index: int, size: int, what: str) -> int:
+    # index itself, when it is in range; a negative one would silently wrap
+    if not 0 <= index < size:
+        raise FormatError(f"{what} {index} out of range")
+    return index
+
+
+def _strings(lengths: list[int], pool: bytes) -> list[str]:
+    try:
+        text = pool.decode("utf-8", "surrogatepass")
+    except UnicodeDecodeError as error:
+        raise FormatError(f"corrupt string pool: {error}") from error
+    strings = []
+    offset = 0
+    for length in lengths:
+        _checked(length, len(text) - offset + 1, "string length")
+        strings.append(text[offset: offset + length])
+        offset += length
+    if offset != len(text):
+        raise FormatError("the string lengths do not cover the string pool")
+    return strings
+
+
+def _heads(fields: list[int], strings: list[str]) -> list[tuple]:
+    # (kind, token, value) per head, with the value already as the node holds it
+    kinds = fields[::4]
+    if len(kinds) > 0:
+        _checked(min(kinds), len(_NODE_TYPES), "node kind")
+        _checked(max(kinds), len(_NODE_TYPES), "node kind")
+    heads = []
+    for index in range(0, len(fields), 4):
+        kind, token_kind, literal, value = fields[index: index + 4]
+        # too large an index raises IndexError, a negative one has to be caught here
+        if kind == _PROGRAM:
+            token = None
+        elif token_kind < 0 or literal < 0:
+            raise FormatError(f"negative token in head {index // 4}")
+        else:
+            token = Token(TOKEN_TYPES[token_kind], strings[literal])
+        if kind == _BOOLEAN:
+            value = value == 1
+        elif kind in _STRING_VALUES:
+            if value < 0:
+                raise FormatError(f"negative value in head {index // 4}")
+            value = strings[value]
+            if kind == _INTEGER:
+                value = int(value)
+        heads.append((kind, token, value))
+    return heads
+
+
+def _decode(table: list[int], heads: list[tuple]) -> Program:
+    # References and head indices are not range checked one by one. -1 is the
+    # only negative value allowed, and only as the count of a missing sequence,
+    # so every other -1 shows up as a mismatch between the two counts at the end
+    if len(table) > 0 and min(table) < _NONE:
+        raise FormatError(f"negative entry {min(table)} in the node table")
+    nodes = [None]
+    append = nodes.append
+    end = len(table) - 1
+    position = 0
+    missing = 0
+
+    def sequence():
+        nonlocal position, missing
+        count = table[position]
+        if count == _NONE:
+            position += 1
+            missing += 1
+            return None
+        start = position + 1
+        position = start + count
+        return [nodes[index] for index in table[start: position]]
+
+    while position < end:
+        kind, token, value = heads[table[position]]
+        position += 1
+        if kind == _IDENTIFIER:
+            append(Identifier(token, value))
+        elif kind == _INTEGER:
+            append(IntegerLiteral(token, value))
+        elif kind == _INFIX:
+            append(InfixExpression(token, nodes[table[position]], value, nodes[table[position + 1]]))
+            position += 2
+        elif kind == _EXPRESSION:
+            append(ExpressionStatement(token, nodes[table[position]]))
+            position += 1
+        elif kind == _CALL:
+            function = nodes[table[position]]
+            position += 1
+            append(CallExpression(token, function, sequence()))
+        elif kind == _STRING:
+            append(StringLiteral(token, value))
+        elif kind == _BOOLEAN:
+            append(BooleanLiteral(token, value))
+        elif kind == _LET:
+            append(LetStatement(token, nodes[table[position]], nodes[table[position + 1]]))
+            position += 2
+        elif kind == _RETURN:
+            append(ReturnStatement(token, nodes[table[position]]))
+            position += 1
+        elif kind == _PREFIX:
+            append(PrefixExpression(token, value, nodes[table[position]]))
+            position += 1
+        elif kind == _INDEX:
+            append(IndexExpression(token, nodes[table[position]], nodes[table[position + 1]]))
+            position += 2
+        elif kind == _BLOCK:
+            append(BlockStatement(token, sequence()))
+        elif kind == _ARRAY:
+            append(ArrayLiteral(token, sequence()))
+        elif kind == _IF:
+            append(
+                IfExpression(
+                    token,
+                    nodes[table[position]],
+                    nodes[table[position + 1]],
+                    nodes[table[position + 2]],
+                )
+            )
+            position += 3
+        elif kind == _FUNCTION:
+            parameters = sequence()
+            append(FunctionLiteral(token, parameters, nodes[table[position]]))
+            position += 1
+        elif kind == _HASH:
+            count = _checked(table[position], end, "hash size")
+            start = position + 1
+            position = start + 2 * count
+            pairs = {}
+            for index in range(start, position, 2):
+                pairs[nodes[table[index]]] = nodes[table[index + 1]]
+            append(HashLiteral(token, pairs))
+        else:
+            append(Program(sequence()))
+
+    if position != end:
+        raise FormatError("the node table does not end on a record")
+    if table.count(_NONE) != missing:
+        raise FormatError("negative reference in the node table")
+    program = nodes[table[end]]
+    if type(program) is not Program:
+        raise FormatError("the root is not a program")
+    return program
+
+
+def loads_with_errors(data: bytes) -> tuple[Program, list[str]]:
+    reader = _Reader(data)
+    strings = _strings(reader.lengths, reader.pool)
+    try:
+        with _without_gc():
+            program = _decode(reader.table, _heads(reader.heads, strings))
+        errors = [strings[_checked(index, len(strings), "string")] for index in reader.errors]
+    except (IndexError, ValueError, TypeError) as error:
+        raise FormatError(f"corrupt node table: {error}") from error
+    return program, errors
+
+
+def loads(data: bytes) -> Program:
+    return loads_with_errors(data)[0]
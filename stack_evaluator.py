@@ -0,0 +1,302 @@
+from astree import (
+    Program,
+    IntegerLiteral,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BooleanLiteral,
+    IfExpression,
+    BlockStatement,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    StringLiteral,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+)
+from evaluator import (
+    Environment,
+    _eval_identifier,
+    _assign,
+    _new_string,
+    _eval_infix_expression,
+    _eval_prefix_expression,
+    _eval_index_expression,
+    _function_frame,
+    _is_truthy,
+    _memo_key,
+    _cache_result,
+    _to_monkey,
+)
+from objects import (
+    MReturnValue,
+    MError,
+    MInteger,
+    FALSE,
+    NULL,
+    MFunction,
+    MemoizedFunction,
+    MBuiltinFunction,
+    BUILTINS,
+    MAP_NAME,
+    FILTER_NAME,
+    REDUCE_NAME,
+    MArray,
+    MHash,
+    MValue,
+    HashPair,
+    apply_function,
+)
+from resolver import resolve
+
+DEFAULT_MAX_DEPTH = 100_000
+
+# Work items are tuples whose first element is one of these operations
+_EVAL = 0
+_INFIX = 1
+_PREFIX = 2
+_BLOCK = 3
+_IF = 4
+_CALL = 5
+_CALL_RETURN = 6
+_RETURN = 7
+_LET = 8
+_INDEX = 9
+_HASH_KEY = 10
+_HASH = 11
+_ARRAY = 12
+_EACH = 13
+
+# builtins whose callback runs on the work stack too, rather than in a nested
+# tree-walker call
+_MAP = BUILTINS[MAP_NAME]
+_FILTER = BUILTINS[FILTER_NAME]
+_REDUCE = BUILTINS[REDUCE_NAME]
+
+
+def _schedule(node, env, work: list, values: list):
+    # Pushes the work needed to evaluate node, or its value when it is immediate.
+    # Work is popped LIFO, so sub-expressions are pushed in reverse order
+    match node:
+        case Identifier():
+            values.append(_eval_identifier(node, env))
+        case IntegerLiteral(value):
+            values.append(MInteger(value))
+        case InfixExpression(left, operator, right):
+            work.append((_INFIX, operator))
+            work.append((_EVAL, right, env))
+            work.append((_EVAL, left, env))
+        case BlockStatement():
+            values.append(None)
+            work.append((_BLOCK, node.statements, 0, env))
+        case ExpressionStatement(expression):
+            work.append((_EVAL, expression, env))
+        case IfExpression():
+            work.append((_IF, node, env))
+            work.append((_EVAL, node.condition, env))
+        case CallExpression(function, arguments):
+            work.append((_CALL, len(arguments)))
+            for argument in reversed(arguments):
+                work.append((_EVAL, argument, env))
+            work.append((_EVAL, function, env))
+        case ReturnStatement(value):
+            work.append((_RETURN,))
+            work.append((_EVAL, value, env))
+        case PrefixExpression(operator, right):
+            work.append((_PREFIX, operator))
+            work.append((_EVAL, right, env))
+        case BooleanLiteral(value):
+            values.append(_to_monkey(value))
+        case LetStatement(name, value):
+            work.append((_LET, name, env))
+            work.append((_EVAL, value, env))
+        case FunctionLiteral(parameters, body):
+            values.append(MFunction(parameters, body, env, node.layout))
+        case StringLiteral(value):
+            values.append(_new_string(value))
+        case IndexExpression(left, index):
+            work.append((_INDEX,))
+            work.append((_EVAL, index, env))
+            work.append((_EVAL, left, env))
+        case HashLiteral(pairs):
+            work.append((_HASH, len(pairs)))
+            for key, value in reversed(pairs.items()):
+                work.append((_EVAL, value, env))
+                work.append((_HASH_KEY,))
+                work.append((_EVAL, key, env))
+        case ArrayLiteral(elements):
+            work.append((_ARRAY, len(elements)))
+            for element in reversed(elements):
+                work.append((_EVAL, element, env))
+        case _:
+            values.append(None)
+
+
+def _pop_values(values: list, size: int) -> list:
+    if size == 0:
+        return []
+    popped = values[-size:]
+    del values[-size:]
+    return popped
+
+
+def _is_tree_walker(function) -> bool:
+    return type(function) is MFunction or type(function) is MemoizedFunction
+
+
+def _callback(builtin, args: list):
+    # The callback of a map, filter or reduce call that can run on the work
+    # stack, or None to leave the call, and any argument error, to the builtin
+    if builtin is _MAP or builtin is _FILTER:
+        if len(args) == 2 and isinstance(args[0], MArray) and _is_tree_walker(args[1]):
+            return args[1]
+    elif builtin is _REDUCE:
+        if len(args) == 3 and isinstance(args[0], MArray) and _is_tree_walker(args[2]):
+            return args[2]
+    return None
+
+
+def _each(item, work: list, values: list):
+    # One step of map, filter or reduce: takes the result of the previous
+    # callback, then schedules the call for the next element. collected is the
+    # result list, or the accumulator of reduce
+    _, builtin, callback, elements, index, collected = item
+    if index > 0:
+        value = values.pop()
+        if builtin is _MAP:
+            collected.append(value)
+        elif builtin is _FILTER:
+            if value is not FALSE and value is not NULL:
+                collected.append(elements[index - 1])
+        else:
+            # a callback with an empty body gives no value, which reduce returns
+            # as null, as _call does for the result of any builtin
+            collected = NULL if value is None else value
+    if index == len(elements):
+        values.append(collected if builtin is _REDUCE else MArray(collected))
+        return
+    work.append((_EACH, builtin, callback, elements, index + 1, collected))
+    values.append(callback)
+    if builtin is _REDUCE:
+        values.append(collected)
+    values.append(elements[index])
+    work.append((_CALL, 2 if builtin is _REDUCE else 1))
+
+
+def _run(work: list, max_depth: int):
+    values = []
+    depth = 0
+    while work:
+        item = work.pop()
+        op = item[0]
+        if op == _EVAL:
+            _schedule(item[1], item[2], work, values)
+        elif op == _BLOCK:
+            _, statements, index, env = item
+            if index == len(statements):
+                continue
+            values.pop()
+            work.append((_BLOCK, statements, index + 1, env))
+            work.append((_EVAL, statements[index], env))
+        elif op == _INFIX:
+            right = values.pop()
+            left = values.pop()
+            values.append(_eval_infix_expression(item[1], left, right))
+        elif op == _IF:
+            _, node, env = item
+            if _is_truthy(values.pop()):
+                work.append((_EVAL, node.consequence, env))
+            elif node.alternative is not None:
+                work.append((_EVAL, node.alternative, env))
+            else:
+                values.append(NULL)
+        elif op == _CALL:
+            args = _pop_values(values, item[1])
+            function = values.pop()
+            callback = None
+            if type(function) is MBuiltinFunction:
+                callback = _callback(function, args)
+            key = None
+            if type(function) is MemoizedFunction:
+                key = _memo_key(args[: len(function.parameters)])
+            cached = None if key is None else function.cache.get(key)
+
+            if cached is not None:
+                values.append(cached)
+            elif _is_tree_walker(function):
+                if depth >= max_depth:
+                    return MError(f"maximum call depth exceeded: {max_depth}")
+                frame = _function_frame(function, args)
+                if type(frame) is MError:
+                    return frame
+                depth += 1
+                # the height of values is kept, so a return can drop what the call left there
+                work.append((_CALL_RETURN, function, key, len(values)))
+                work.append((_EVAL, function.body, frame))
+            elif callback is not None:
+                accumulator = args[1] if function is _REDUCE else []
+                _each((_EACH, function, callback, args[0].elements, 0, accumulator), work, values)
+            else:
+                values.append(apply_function(function, args))
+        elif op == _CALL_RETURN:
+            depth -= 1
+            if item[2] is not None:
+                _cache_result(item[1], item[2], values[-1])
+        elif op == _EACH:
+            _each(item, work, values)
+        elif op == _RETURN:
+            # a return exits the whole function call, even from within an
+            # expression, so the work and values of the call are dropped
+            value = values.pop()
+            while work and work[-1][0] != _CALL_RETURN:
+                work.pop()
+            if not work:
+                return MReturnValue(value)
+            del values[work[-1][3]:]
+            values.append(value)
+        elif op == _PREFIX:
+            values.append(_eval_prefix_expression(item[1], values.pop()))
+        elif op == _LET:
+            _, name, env = item
+            _assign(name, values.pop(), env)
+            values.append(None)
+        elif op == _INDEX:
+            index = values.pop()
+            left = values.pop()
+            values.append(_eval_index_expression(left, index))
+        elif op == _HASH_KEY:
+            key = values[-1]
+            if not isinstance(key, MValue):
+                return MError(f"unusable as hash key: {key.type_desc()}")
+        elif op == _HASH:
+            elements = _pop_values(values, 2 * item[1])
+            pairs = {}
+            for i in range(0, len(elements), 2):
+                key = elements[i]
+                pairs[key.hash_key()] = HashPair(key, elements[i + 1])
+            values.append(MHash(pairs))
+        elif op == _ARRAY:
+            values.append(MArray(_pop_values(values, item[1])))
+
+        # an error always aborts the whole evaluation, as it does in the tree-walker
+        if values and type(values[-1]) is MError:
+            return values[-1]
+
+    return values[-1]
+
+
+def evaluate(program: Program, env: Environment, max_depth: int = DEFAULT_MAX_DEPTH):
+    resolve(program)
+    result = None
+    for statement in program.statements:
+        result = _run([(_EVAL, statement, env)], max_depth)
+        match result:
+            case MReturnValue(value):
+                return value
+            case MError():
+                return result
+
+    return result
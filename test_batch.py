@@ -0,0 +1,102 @@
+import pytest
+
+from batch import call_batch, _vectorize
+from evaluator import Environment, evaluate
+from objects import MError, MInteger, TRUE
+from test_parser import create_program
+
+FUNCTIONS = [
+    "fn(x) { x * 2 + 1 }",
+    "fn(x, y) { if (x > y) { x - y } else { y - x } }",
+    "fn(x, y) { let d = x - y; if (d < 0) { return -d; } else { return d; } }",
+    "fn(x) { if (x == 3) { true } else { !(x > 5) } }",
+    "fn(x, y) { x * offset + y }",
+    "fn(x) { if (x < 0) { 0 } else { x * 9223372036854775807 } }",
+    "fn(x) { if (x < 2) { x } else { x + true } }",
+    "fn(x) { if (x < 2) { x } }",
+    "fn(x) { len([x]) }",
+    "fn(x, flag) { if (flag) { x } else { 0 - x } }",
+]
+
+COLUMNS = [
+    [-3, -1, 0, 1, 2, 3, 5, 6, 9],
+    [1, 1, 1, 2, 2, 2, 3, 3, 3],
+]
+# the column for parameters named flag
+FLAGS = [value % 2 == 0 for value in COLUMNS[0]]
+
+
+def _function(source):
+    env = Environment()
+    evaluate(create_program("let offset = 10;"), env)
+    return evaluate(create_program(source), env)
+
+
+def _columns(function):
+    return [
+        FLAGS if parameter.value == "flag" else column
+        for parameter, column in zip(function.parameters, COLUMNS)
+    ]
+
+
+def _row_by_row(function, columns):
+    results = []
+    for row in range(len(columns[0])):
+        env = Environment({"f": function})
+        args = ", ".join(str(column[row]).lower() for column in columns)
+        results.append(evaluate(create_program(f"f({args})"), env))
+    return results
+
+
+def test_same_results_as_row_by_row_calls():
+    for source in FUNCTIONS:
+        function = _function(source)
+        columns = _columns(function)
+        actual = call_batch(function, columns)
+        expected = _row_by_row(function, columns)
+        assert len(expected) == len(actual.elements), source
+        for expected_result, actual_result in zip(expected, actual.elements):
+            assert expected_result.type_desc() == actual_result.type_desc(), source
+            assert repr(expected_result) == repr(actual_result), source
+
+
+def test_vectorized_bodies():
+    pytest.importorskip("numpy")
+    tests = [
+        ("fn(x) { x * 2 + 1 }", True),
+        ("fn(x, y) { let d = x - y; if (d < 0) { return -d; } else { return d; } }", True),
+        ("fn(x, y) { x * offset + y }", True),
+        ("fn(x, flag) { if (flag) { x } else { 0 - x } }", True),
+        ("fn(x) { if (x < 0) { 0 } else { x * 9223372036854775807 } }", False),
+        ("fn(x) { if (x < 2) { x } else { x + true } }", False),
+        ("fn(x) { if (x < 2) { x } }", False),
+        ("fn(x) { len([x]) }", False),
+        ("fn(x) { x / 2 }", False),
+    ]
+
+    for source, vectorized in tests:
+        function = _function(source)
+        result = _vectorize(function, _columns(function), len(COLUMNS[0]))
+        assert vectorized == (result is not None), source
+
+
+def test_mixed_inputs():
+    function = _function("fn(x) { x }")
+    result = call_batch(function, [[1, True, "a", MInteger(4)]])
+    assert [1, True, "a", 4] == [element.value for element in result.elements]
+
+    with pytest.raises(ValueError):
+        call_batch(function, [[1], [1, 2]])
+    with pytest.raises(ValueError):
+        call_batch(function, [])
+    with pytest.raises(ValueError):
+        call_batch(_function("fn(x, y) { x }"), [[1]])
+
+    for column in ([1, 2.5], [None], [1, [2]]):
+        error = call_batch(function, [column])
+        assert isinstance(error, MError)
+        assert error.message.startswith("column 0 holds"), error.message
+
+    errors = call_batch(_function("fn(x) { x + true }"), [[1, 2]])
+    assert all(isinstance(error, MError) for error in errors.elements)
+    assert TRUE is call_batch(_function("fn(x) { x > 1 }"), [[2]]).elements[0]
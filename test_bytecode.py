@@ -0,0 +1,47 @@
+from bytecode import Opcode, make, instructions_to_str, lookup, read_operands
+
+
+def test_make():
+    tests = [
+        (Opcode.CONSTANT, [65534], bytes([Opcode.CONSTANT, 255, 254])),
+        (Opcode.ADD, [], bytes([Opcode.ADD])),
+        (Opcode.GET_LOCAL, [255], bytes([Opcode.GET_LOCAL, 255])),
+        (Opcode.GET_FREE, [2, 255], bytes([Opcode.GET_FREE, 2, 255])),
+    ]
+
+    for op, operands, expected in tests:
+        assert expected == make(op, *operands)
+
+
+def test_instructions_string():
+    instructions = b"".join(
+        [
+            make(Opcode.ADD),
+            make(Opcode.GET_LOCAL, 1),
+            make(Opcode.CONSTANT, 2),
+            make(Opcode.CONSTANT, 65535),
+            make(Opcode.GET_FREE, 1, 3),
+        ]
+    )
+    expected = (
+        "0000 OpAdd\n"
+        "0001 OpGetLocal 1\n"
+        "0003 OpConstant 2\n"
+        "0006 OpConstant 65535\n"
+        "0009 OpGetFree 1 3\n"
+    )
+    assert expected == instructions_to_str(instructions)
+
+
+def test_read_operands():
+    tests = [
+        (Opcode.CONSTANT, [65535], 2),
+        (Opcode.GET_LOCAL, [255], 1),
+        (Opcode.GET_FREE, [1, 255], 2),
+    ]
+
+    for op, operands, bytes_read in tests:
+        instruction = make(op, *operands)
+        read, offset = read_operands(lookup(op), instruction, 1)
+        assert operands == read
+        assert bytes_read + 1 == offset
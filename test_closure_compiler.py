@@ -0,0 +1,31 @@
+from closure_compiler import evaluate, compile_program
+from evaluator import Environment
+from objects import MInteger, TRUE
+from test_parser import create_program
+
+
+def test_compiled_program_is_reusable():
+    run = compile_program(create_program("let a = 5; a * 2"))
+    for _ in range(3):
+        result = run(Environment())
+        assert isinstance(result, MInteger)
+        assert 10 == result.value
+
+
+def test_environment_is_shared_between_programs():
+    env = Environment()
+    evaluate(create_program("let double = fn(x) { x * 2 };"), env)
+    result = evaluate(create_program("double(21)"), env)
+    assert 42 == result.value
+
+
+def test_values_are_boxed_at_the_boundaries():
+    env = Environment()
+    evaluate(create_program("let a = 1 + 2; let b = 1 < 2; let c = [a, b];"), env)
+    assert isinstance(env.store["a"], MInteger)
+    assert TRUE is env.store["b"]
+    assert isinstance(env.store["c"].elements[0], MInteger)
+    assert TRUE is env.store["c"].elements[1]
+    result = evaluate(create_program("len(\"ab\") + a"), env)
+    assert isinstance(result, MInteger)
+    assert 5 == result.value
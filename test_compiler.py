@@ -0,0 +1,89 @@
+import pytest
+
+from bytecode import Opcode, make, instructions_to_str
+from compiler import compile_program, CompilationError, FunctionCode
+from test_parser import create_program
+
+
+def assert_instructions(expected, actual):
+    assert instructions_to_str(b"".join(expected)) == instructions_to_str(actual)
+
+
+def test_integer_arithmetic():
+    bytecode = compile_program(create_program("1 + 2; 1"))
+    assert [1, 2] == [constant.value for constant in bytecode.constants]
+    assert_instructions(
+        [
+            make(Opcode.CONSTANT, 0),
+            make(Opcode.CONSTANT, 1),
+            make(Opcode.ADD),
+            make(Opcode.POP),
+            make(Opcode.CONSTANT, 0),
+            make(Opcode.RETURN_VALUE),
+        ],
+        bytecode.instructions,
+    )
+
+
+def test_conditionals():
+    bytecode = compile_program(create_program("if (true) { 10 }; 3333;"))
+    assert_instructions(
+        [
+            make(Opcode.TRUE),
+            make(Opcode.JUMP_NOT_TRUTHY, 10),
+            make(Opcode.CONSTANT, 0),
+            make(Opcode.JUMP, 11),
+            make(Opcode.NULL),
+            make(Opcode.POP),
+            make(Opcode.CONSTANT, 1),
+            make(Opcode.RETURN_VALUE),
+        ],
+        bytecode.instructions,
+    )
+
+
+def test_global_let_statements():
+    bytecode = compile_program(create_program("let one = 1; one;"))
+    assert ["one"] == bytecode.constants[1:]
+    assert_instructions(
+        [
+            make(Opcode.CONSTANT, 0),
+            make(Opcode.SET_GLOBAL, 1),
+            make(Opcode.GET_GLOBAL, 1),
+            make(Opcode.RETURN_VALUE),
+        ],
+        bytecode.instructions,
+    )
+
+
+def test_closures():
+    bytecode = compile_program(create_program("fn(a) { let b = 1; fn(c) { a + b + c } }"))
+    inner, outer = [
+        constant for constant in bytecode.constants if isinstance(constant, FunctionCode)
+    ]
+    assert ("c",) == inner.names
+    assert ("a", "b") == outer.names
+    assert 1 == outer.num_parameters
+    assert_instructions(
+        [
+            make(Opcode.GET_FREE, 1, 0),
+            make(Opcode.GET_FREE, 1, 1),
+            make(Opcode.ADD),
+            make(Opcode.GET_LOCAL, 0),
+            make(Opcode.ADD),
+            make(Opcode.RETURN_VALUE),
+        ],
+        inner.instructions,
+    )
+
+
+def test_operands_too_large():
+    tests = [
+        ("[" + ", ".join(["1"] * 70000) + "]", "OpArray operand too large: 70000, max=65535"),
+        ("if (true) { " + "1; " * 25000 + "}", "OpJump"),
+        ("f(" + ", ".join(["1"] * 300) + ")", "OpCall operand too large: 300, max=255"),
+    ]
+
+    for input_source, message in tests:
+        with pytest.raises(CompilationError, match=message):
+            compile_program(create_program(input_source))
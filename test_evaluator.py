@@ -1,5 +1,12 @@
-from evaluator import evaluate, Environment
-from objects import MInteger, MBoolean, NULL, MString, TRUE, FALSE
+import pytest
+
+import closure_compiler
+import memoize
+import stack_evaluator
+import transpiler
+import vm
+from evaluator import evaluate, Environment, _eval_infix_expression, _infix_operator
+from objects import MInteger, MBoolean, NULL, MString, TRUE, FALSE, MFunction
 from test_parser import create_program
 
 
@@ -92,6 +99,10 @@ def test_bang_operator():
         ("!!true", True),
         ("!!false", False),
         ("!!5", True),
+        ('!("a" == "a")', True),
+        ("!([1] == [1])", True),
+        ("!(1 == true)", True),
+        ('!(1 == "a")', True),
     ]
 
     for input_source, expected in tests:
@@ -186,6 +197,11 @@ def test_error_handling():
         ("foobar", "identifier not found: foobar"),
         ('("Hello" - "World")', "unknown operator: MString - MString"),
         ('{"name": "Monkey"}[fn(x) {x}];', "unusable as a hash key: MFunction"),
+        ("let f = fn(x) { x + true; 10 }; f(1); 5", "type mismatch: MInteger + MBoolean"),
+        ("let f = fn() { 1 }; f()(2)", "not a function: MInteger"),
+        ('[1, len(1), 3]', "argument to `len` not supported, got MInteger"),
+        ("1 + 2 * (3 - true)", "type mismatch: MInteger - MBoolean"),
+        ("(1 + 2 < 4) + 1", "type mismatch: MBoolean + MInteger"),
     ]
 
     for input_source, expected in tests:
@@ -193,6 +209,45 @@ def test_error_handling():
         assert expected == error.message
 
 
+def test_infix_operator_resolved_per_node():
+    hello = MString("hello")
+    operands = [MInteger(3), MInteger(7), TRUE, FALSE, hello, MString("hello"), NULL]
+    for operator in ["+", "-", "*", "<", ">", "==", "!="]:
+        infix = _infix_operator(operator)
+        for left in operands:
+            for right in operands + [hello]:
+                expected = _eval_infix_expression(operator, left, right)
+                actual = infix(left, right)
+                assert type(expected) is type(actual)
+                assert repr(expected) == repr(actual)
+
+
+def test_operator_results_are_boxed():
+    env = Environment()
+    source = """let a = 1 + 2 * 3 - 4 / 2; let b = [a * 2, 1 < a];
+    let c = "x" + "y" + "z"; let d = !(a < 1) == true; let e = -a;"""
+    evaluate(create_program(source), env)
+    assert isinstance(env.store["a"], MInteger)
+    assert 5 == env.store["a"].value
+    assert isinstance(env.store["b"].elements[0], MInteger)
+    assert TRUE is env.store["b"].elements[1]
+    assert isinstance(env.store["c"], MString)
+    assert "xyz" == env.store["c"].value
+    assert TRUE is env.store["d"]
+    assert -5 == env.store["e"].value
+
+    # a string read from a name keeps its identity, a new string gets its own
+    tests = [
+        ('let s = "a"; s == s', TRUE),
+        ('let s = "a"; s == s + ""', FALSE),
+        ('"a" == "a"', FALSE),
+        ("true == (1 < 2)", TRUE),
+        ("!0", FALSE),
+    ]
+    for input_source, expected in tests:
+        assert expected is _eval(input_source)
+
+
 def test_let_statement():
     tests = [
         ("let a = 5; a;", 5),
@@ -228,6 +283,51 @@ def test_function_application():
         assert_integer(input_source, expected)
 
 
+def test_identifiers_resolve_to_frame_slots():
+    tests = [
+        ("let a = 1; let f = fn() { let g = fn() { a }; g() }; f()", 1),
+        ("let f = fn(a) { fn() { fn(b) { a + b } } }; f(3)()(4)", 7),
+        ("let a = 1; let f = fn() { let b = a; let a = 2; b + a }; f()", 3),
+        ("let f = fn(a) { let g = fn() { let c = a; let a = 5; c + a }; g() }; f(2)", 7),
+        ("let f = fn(x) { let x = x + 1; x }; f(1)", 2),
+        ("let f = fn(x, x) { x }; f(1, 2)", 2),
+        ("let f = fn(n) { if (n > 0) { let n = n - 1; f(n) } else { n } }; f(3)", 0),
+    ]
+
+    for input_source, expected in tests:
+        assert_integer(input_source, expected)
+
+    program = create_program("let f = fn(a) { fn() { a + b } }")
+    evaluate(program, Environment())
+    inner = program.statements[0].value.body.statements[0].expression.body
+    a, b = inner.statements[0].expression.left, inner.statements[0].expression.right
+    assert (1, 0) == a.address
+    assert (2, -1) == b.address
+
+    assert "wrong number of arguments. got=1, want=2" == _eval("fn(a, b) { a }(1)").message
+
+
+def test_globals_lookup_walks_the_outer_chain():
+    outermost = Environment()
+    outermost["a"] = MInteger(1)
+    env = outermost
+    for depth in range(5000):
+        env = Environment(outer=env)
+    env["b"] = MInteger(2)
+
+    assert 3 == evaluate(create_program("fn() { a + b }()"), env).value
+    assert "identifier not found: c" == evaluate(create_program("c"), env).message
+
+
+def test_functions_built_outside_the_evaluator():
+    program = create_program("fn(a) { let b = a * 2; fn() { a + b + c } }")
+    literal = program.statements[0].expression
+    env = Environment({"c": MInteger(10)})
+    function = MFunction(literal.parameters, literal.body, env)
+
+    assert 13 == function.apply([MInteger(1)]).apply([]).value
+
+
 def test_enclosing_environments():
     input_source = """let first = 10;
     let second = 10;
@@ -263,6 +363,15 @@ def test_string_concatenation():
     assert_string('"Hello" + " " + "World!"', "Hello World!")
 
 
+def test_repeated_string_concatenation():
+    input_source = """
+    let build = fn(acc, n) { if (n == 0) { acc } else { build(acc + "0123456789", n - 1) } };
+    let report = build("", 20000);
+    len(report)
+    """
+    assert_integer(input_source, 200000)
+
+
 def test_builtin_functions():
     tests = [
         ('len("")', 0),
@@ -298,6 +407,145 @@ def test_builtin_functions():
                 assert_integer_object(evaluated.elements[i], element)
 
 
+def test_array_builtins_do_not_change_their_arguments():
+    tests = [
+        ("let a = [1, 2, 3]; rest(a); a", [1, 2, 3]),
+        ("let a = [1, 2, 3]; push(a, 4); a", [1, 2, 3]),
+        ("let a = [1, 2]; let b = push(a, 3); let c = push(a, 4); c", [1, 2, 4]),
+        ("let a = [1, 2]; let b = push(a, 3); let c = push(a, 4); b", [1, 2, 3]),
+        ("let a = rest([1, 2, 3]); let b = push(a, 4); push(a, 5)", [2, 3, 5]),
+        ("let a = rest(rest([1, 2, 3])); [first(a), last(a), len(a), a[0], a[1]]", [3, 3, 1, 3, None]),
+        (
+            """let sum = fn(xs) { if (len(xs) == 0) { 0 } else { first(xs) + sum(rest(xs)) } };
+            let fill = fn(xs, n) { if (n == 0) { xs } else { fill(push(xs, n), n - 1) } };
+            let xs = fill([], 60);
+            [sum(xs), len(xs)]""",
+            [1830, 60],
+        ),
+    ]
+
+    for input_source, expected in tests:
+        evaluated = _eval(input_source)
+        assert len(expected) == len(evaluated.elements), input_source
+        for element, value in zip(evaluated.elements, expected):
+            if value is None:
+                assert NULL is element
+            else:
+                assert_integer_object(element, value)
+
+
+def test_string_builtins():
+    tests = [
+        ('slice("hello world", 6, 11)', "world"),
+        ('slice("hello", 3, 100)', "lo"),
+        ('slice("hello", -5, 2)', "he"),
+        ('slice("hello", 4, 2)', ""),
+        ('slice(slice("hello world", 3, 10), 1, 4)', "o w"),
+        ('char_at("hello", 1)', "e"),
+        ('char_at("hello", 5)', None),
+        ('find("hello world", "o")', 4),
+        ('find(slice("hello world", 5, 11), "o")', 2),
+        ('find("hello", "z")', -1),
+        ('len(split("a,b,,c", ","))', 4),
+        ('split("a,b,,c", ",")[3]', "c"),
+        ('len(slice("hello world", 2, 9) + "!")', 8),
+        ('{"lo": 1}[slice("hello", 3, 5)]', 1),
+        ('slice(1, 0, 1)', "argument to `slice` must be STRING, got MInteger"),
+        ('slice("a", "0", 1)', "argument to `slice` must be INTEGER, got MString"),
+        ('split("a", 1)', "argument to `split` must be STRING, got MInteger"),
+        ('split("a", "")', "separator for `split` must not be empty"),
+        ('find("a")', "wrong number of arguments. got=1, want=2"),
+    ]
+
+    for input_source, expected in tests:
+        evaluated = _eval(input_source)
+        match expected:
+            case int():
+                assert_integer_object(evaluated, expected)
+            case str() if isinstance(evaluated, MString):
+                assert_string(input_source, expected)
+            case str():
+                assert expected == evaluated.message, input_source
+            case _:
+                assert_none_object(evaluated)
+
+
+def test_collection_builtins():
+    tests = [
+        ("map([1, 2, 3], fn(x) { x * 2 })", [2, 4, 6]),
+        ("map([], fn(x) { x * 2 })", []),
+        ("filter([1, 2, 3, 4], fn(x) { x > 2 })", [3, 4]),
+        ("reduce([1, 2, 3, 4], 10, fn(acc, x) { acc + x })", 20),
+        ("range(4)", [0, 1, 2, 3]),
+        ("range(2, 5)", [2, 3, 4]),
+        ("range(5, 2)", []),
+        ("sort([3, 1, 2])", [1, 2, 3]),
+        ('first(sort(["b", "c", "a"]))', "a"),
+        ("sum(range(101))", 5050),
+        ("sum([])", 0),
+        ("let a = [3, 1, 2]; sort(a); first(a)", 3),
+        ("map([1, 2], fn(x) { x + true })", "type mismatch: MInteger + MBoolean"),
+        ("map([1], 5)", "not a function: MInteger"),
+        ("filter(1, len)", "argument to `filter` must be ARRAY, got MInteger"),
+        ("reduce([1], 0)", "wrong number of arguments. got=2, want=3"),
+        ("range(1, 2, 3)", "wrong number of arguments. got=3, want=1 or 2"),
+        ('range("a")', "argument to `range` must be INTEGER, got MString"),
+        ('sort([1, "a"])', "argument to `sort` must be ARRAY of INTEGER or STRING"),
+        ("sum([1, true])", "argument to `sum` must be ARRAY of INTEGER, got MBoolean"),
+    ]
+
+    for input_source, expected in tests:
+        evaluated = _eval(input_source)
+        match expected:
+            case int():
+                assert_integer_object(evaluated, expected)
+            case list():
+                assert expected == [element.value for element in evaluated.elements]
+            case str() if isinstance(evaluated, MString):
+                assert_string(input_source, expected)
+            case str():
+                assert expected == evaluated.message, input_source
+
+
+def test_elementwise_array_arithmetic():
+    tests = [
+        ("[1, 2, 3] + [10, 20, 30]", [11, 22, 33]),
+        ("[1, 2, 3] * 2", [2, 4, 6]),
+        ("10 - [1, 2, 3]", [9, 8, 7]),
+        ("[2, 4] / 2", [1, 2]),
+        ("[7, -7, 7, -7, 1] / [2, 2, -2, -2, 3]", [3, -3, -3, 3, 0]),
+        ("100 / [7, -7]", [14, -14]),
+        ("range(40) / (range(40) + 1)", [0] * 40),
+        ("(range(40) - 20) / 3", [int((i - 20) / 3) for i in range(40)]),
+        ("sum(range(100) * range(100))", 328350),
+        ("(range(40) * 9223372036854775807)[39]", 39 * 9223372036854775807),
+        ("let a = range(50) + 1; [len(a), first(a), last(a), a[10], a[-1]]", [50, 1, 50, 11, None]),
+        ("rest(range(40) - 1)[0]", 0),
+        ("[1, 2] + [1, 2, 3]", "array length mismatch: 2 + 3"),
+        ('[1, "a"] + [1, 2]', "unknown operator: MArray + MArray"),
+        ('[1, "a"] + [1]', "unknown operator: MArray + MArray"),
+        ("range(40) + range(39)", "array length mismatch: 40 + 39"),
+        ('["a"] * 2', "type mismatch: MArray * MInteger"),
+        ("[1] < [2]", "unknown operator: MArray < MArray"),
+        ("[1, 2] / 0", "division by zero"),
+        ("[1, 2] / [1, 0]", "division by zero"),
+        ("10 / [5, 0]", "division by zero"),
+        ("range(40) / range(40)", "division by zero"),
+    ]
+
+    for input_source, expected in tests:
+        evaluated = _eval(input_source)
+        match expected:
+            case int():
+                assert_integer_object(evaluated, expected)
+            case list():
+                values = [None if element is NULL else element.value for element in evaluated.elements]
+                assert expected == values, input_source
+                assert [type(value) for value in expected] == [type(value) for value in values]
+            case str():
+                assert expected == evaluated.message, input_source
+
+
 def test_array_literal():
     result = _eval("[1, 2 * 2, 3 + 3]")
     assert 3 == len(result.elements)
@@ -355,6 +603,43 @@ def test_hash_literal():
         assert_integer_object(pair.value, expected_value)
 
 
+def test_hash_builtins():
+    tests = [
+        ('set({"a": 1}, "b", 2)["b"]', 2),
+        ('set({"a": 1}, "a", 2)["a"]', 2),
+        ('len([set({"a": 1}, "a", 2)])', 1),
+        ('let h = {"a": 1}; let g = set(h, "b", 2); h["b"]', None),
+        ('let h = {"a": 1, "b": 2}; let g = delete(h, "a"); [h["a"], g["a"], g["b"]]', [1, None, 2]),
+        ('delete({"a": 1}, "z")["a"]', 1),
+        ("""let fill = fn(h, n) { if (n == 0) { h } else { fill(set(h, n, n * n), n - 1) } };
+            let h = fill({}, 200);
+            [h[1], h[150], h[200], h[201], delete(h, 150)[150], h[150]]""",
+         [1, 22500, 40000, None, None, 22500]),
+        ('set(1, "a", 1)', "argument to `set` must be HASH, got MInteger"),
+        ('delete([], "a")', "argument to `delete` must be HASH, got MArray"),
+        ('set({}, fn(x) { x }, 1)', "unusable as hash key: MFunction"),
+        ('set({}, "a")', "wrong number of arguments. got=2, want=3"),
+        ('delete({})', "wrong number of arguments. got=1, want=2"),
+    ]
+
+    for input_source, expected in tests:
+        evaluated = _eval(input_source)
+        match expected:
+            case int():
+                assert_integer_object(evaluated, expected)
+            case str():
+                assert expected == evaluated.message
+            case list():
+                assert len(expected) == len(evaluated.elements)
+                for element, value in zip(evaluated.elements, expected):
+                    if value is None:
+                        assert NULL is element
+                    else:
+                        assert_integer_object(element, value)
+            case _:
+                assert_none_object(evaluated)
+
+
 def test_hash_index_expression():
     tests = [
         ('{"foo": 5, "bar": 7}["foo"]', 5),
@@ -391,3 +676,171 @@ fibonacci(15);
     """
     evaluated = _eval(input_source)
     assert_integer_object(evaluated, 610)
+
+
+CONFORMANCE_SOURCES = [
+    "5 + 5 * 2 - 10 / 2",
+    "-(3 - 10) * 2",
+    "!5 == !!false",
+    "1 < 2 == true",
+    "3 > 2 != false",
+    '"Hello" + " " + "World!"',
+    '"a" == "a"',
+    '!("a" == "a")',
+    "!([1] == [1])",
+    "!(1 == true)",
+    '!(1 == "a")',
+    'let s = "a"; if (!(s == "b")) { 1 } else { 2 }',
+    "5 + true;",
+    "-true",
+    "true + false; 5",
+    '"Hello" - "World"',
+    "foobar",
+    "if (1 > 2) { 10 }",
+    "if (1 < 2) { 10 } else { 20 }",
+    "if (10 > 1) { if (10 > 1) { return true + false; } return 1; }",
+    "9; return 2 * 5; 9;",
+    "let a = 5; let b = a; let c = a + b + 5; c;",
+    "let a = 5;",
+    "fn(x) { x + 2; };",
+    "fn(x) { x; }(5)",
+    "let f = fn() {}; f()",
+    "fn(x, y, x) { x * 10 + y }(1, 2, 3)",
+    "let add = fn(x, y) { x + y; }; add(5 + 5, add(5, 5));",
+    "let newAdder = fn(x) { fn(y) { x + y } }; let addTwo = newAdder(2); addTwo(3);",
+    "let f = fn(x) { let y = x * 2; return y; y + 1; }; f(4)",
+    "let f = fn() { [if (true) { return 7; } else { 0 }, 99] }; f()",
+    "let f = fn(x) { 1 + if (x) { return 2; } else { 3 } }; [f(true), f(false)]",
+    "[if (true) { return 7; } else { 0 }, 99]",
+    "map([1, 2], fn(x) { [if (x > 1) { return x; } else { 0 }] })",
+    "let f = fn(x) { if (x > 0) { let y = x; } y }; f(3)",
+    "let g = fn() { late }; let late = 7; g()",
+    "let first = 10; let ourFunction = fn(first) { let second = 20; first + second; }; "
+    "ourFunction(20) + first;",
+    "let x = 1; let f = fn() { let x = 2; x }; f() + x",
+    "let x = 1; let f = fn() { let a = x; let x = 2; a + x }; f()",
+    "let f = fn(a) { let g = fn() { a + b }; let b = 10; g() }; f(1)",
+    "1(2)",
+    "len(1)",
+    'len("one", "two")',
+    "len([1, 2, 3])",
+    "push([], 1)",
+    "first([1, 2, 3])",
+    "last([])",
+    "rest([1, 2, 3])",
+    "let a = [1, 2, 3]; rest(a); a",
+    "let a = [1, 2 * 2, 3 + 3]; a[0] + a[1] + a[2]",
+    "[1, 2, 3][3]",
+    "[1, 2, 3][-1]",
+    "1[0]",
+    '{"foo": 5, "bar": 7}["foo"]',
+    '{"foo": 5}["bar"]',
+    '{"name": "Monkey"}[fn(x) {x}];',
+    "{fn(x) {x}: 1}",
+    '{[1]: nope, "k": fn() { 1 }}',
+    '{"a": if (true) { 1 }, [2]: 2, "b": if (nope) { 3 }}',
+    '{"one": 1, true: 2, 3: 3}[true]',
+    'let h = {"a": 1}; let g = set(h, 2, 3); [h[2], g[2], delete(g, "a")["a"]]',
+    'set({}, [], 1)',
+    'let s = "a-b-c"; let parts = split(s, "-"); [len(parts), parts[1], find(s, "c"), char_at(s, 9)]',
+    'slice("abc", 1, 2) == slice("abc", 1, 2)',
+    "let double = fn(x) { x * 2 }; map([1, 2, 3], double)",
+    "let n = 10; map(range(3), fn(x) { if (x == 1) { return n; } x + n })",
+    "filter(range(10), fn(x) { x > 6 })",
+    "reduce(range(5), 100, fn(acc, x) { acc - x })",
+    "let r = reduce([1, 2, 3], 0, fn(a, x) { }); r == r",
+    "reduce([1, 2, 3], 0, fn(a, x) { })",
+    "let add = fn(a, b) { a + b }; reduce(map(range(4), fn(x) { reduce(range(x), 0, add) }), 0, add)",
+    "map([1, 2], fn(x) { x + true })",
+    "map([1], 5)",
+    "sum(map(range(1, 4), fn(x) { x * x }))",
+    "sort([3, 1, 2])",
+    "[1, 2, 3] * [4, 5, 6] - 1",
+    "let a = range(40) * 3; a[39] + len(push(a, 1))",
+    "[1, foo, 3]",
+    "let f = fn(x) { x }; f(foo)",
+    "let map = fn(arr, f) { let iter = fn(arr, acc) { if (len(arr) == 0) { acc } "
+    "else { iter(rest(arr), push(acc, f(first(arr)))) } }; iter(arr, []) }; "
+    "map([1, 2, 3, 4], fn(x) { x * 2 })",
+    "let reduce = fn(arr, initial, f) { let iter = fn(arr, result) { "
+    "if (len(arr) == 0) { result } else { iter(rest(arr), f(result, first(arr))) } }; "
+    "iter(arr, initial) }; reduce([1, 2, 3, 4, 5], 0, fn(acc, x) { acc + x })",
+    "let fibonacci = fn(x) { if (x < 2) { return x; } else { "
+    "fibonacci(x - 1) + fibonacci(x - 2); } }; fibonacci(15);",
+]
+
+
+def _memoized(program, env):
+    return memoize.evaluate(program, memoize.MemoizingEnvironment())
+
+
+ENGINES = {
+    "stack_evaluator": stack_evaluator.evaluate,
+    "closure_compiler": closure_compiler.evaluate,
+    "transpiler": transpiler.evaluate,
+    "vm": vm.evaluate,
+    "memoize": _memoized,
+}
+
+
+def assert_same_as_evaluator(evaluate_function, input_source):
+    program = create_program(input_source)
+    expected = evaluate(program, Environment())
+    actual = evaluate_function(create_program(input_source), Environment())
+    if expected is None:
+        assert actual is None, input_source
+        return
+    assert expected.type_desc() == actual.type_desc(), input_source
+    assert repr(expected) == repr(actual), input_source
+
+
+@pytest.mark.parametrize("engine", ENGINES.values(), ids=ENGINES.keys())
+def test_same_results_as_evaluator(engine):
+    for input_source in CONFORMANCE_SOURCES:
+        assert_same_as_evaluator(engine, input_source)
+
+
+def test_tail_calls_run_in_constant_stack():
+    tests = [
+        (
+            """let count = fn(n, acc) { if (n == 0) { acc } else { count(n - 1, acc + 1) } };
+            count(5000, 0)""",
+            5000,
+        ),
+        (
+            """let count = fn(n, acc) { if (n == 0) { return acc; } return count(n - 1, acc + 2); };
+            count(5000, 0)""",
+            10000,
+        ),
+        (
+            """let even = fn(n) { if (n == 0) { true } else { odd(n - 1) } };
+            let odd = fn(n) { if (n == 0) { false } else { even(n - 1) } };
+            if (even(5001)) { 1 } else { 0 }""",
+            0,
+        ),
+        ("let f = fn(x) { return len(x); 5 }; f([1, 2])", 2),
+    ]
+
+    for input_source, expected in tests:
+        assert_integer(input_source, expected)
+
+
+def test_functions_called_across_engines():
+    engines = [
+        evaluate,
+        stack_evaluator.evaluate,
+        closure_compiler.evaluate,
+        transpiler.evaluate,
+        vm.evaluate,
+    ]
+    definitions = "let adder = fn(x) { fn(y) { x + y } }; let addtwo = adder(2);"
+    for define in engines:
+        for call in engines:
+            env = Environment()
+            define(create_program(definitions), env)
+            engines_used = (define.__module__, call.__module__)
+            calls = "[addtwo(3), map([1, 2], addtwo), fn() { addtwo(4) }()]"
+            result = call(create_program(calls), env)
+            assert "[5, [3, 4], 6]" == str(result), engines_used
+            result = call(create_program("fn() { addtwo(true) }()"), env)
+            assert "type mismatch: MInteger + MBoolean" == result.message, engines_used
@@ -0,0 +1,133 @@
+import random
+
+from array import array
+
+import incremental
+from incremental import chunked, parse_source, edit
+from lexer import Lexer
+from parser import Parser
+
+SOURCE = """let add = fn(a, b) { a + b };
+let s = "a string; with } braces";
+if (add(1, 2) > 2) { return [1, 2][0]; } else { {"k": !true} }
+let unfinished = fn(x) { x * 2
+add(3, 4) - 5; é + 1
+"""
+
+
+def _describe(statement):
+    # str() fails on nodes left incomplete by a parse error
+    try:
+        return str(statement)
+    except TypeError:
+        return type(statement).__name__
+
+
+def _assert_same_as_full_parse(parsed):
+    expected = parse_source(parsed.source)
+    assert list(expected.tokens.kinds) == list(parsed.tokens.kinds)
+    assert list(expected.tokens.starts) == list(parsed.tokens.starts)
+    assert list(expected.tokens.ends) == list(parsed.tokens.ends)
+    assert list(expected.boundaries) == list(parsed.boundaries)
+    assert [_describe(s) for s in expected.statements] == [_describe(s) for s in parsed.statements]
+    assert expected.errors() == parsed.errors()
+
+
+def test_parse_source():
+    input_source = "let x = 1; x + 2; let = 3;"
+    parsed = parse_source(input_source)
+    parser = Parser(Lexer(input_source))
+    assert str(parser.parse_program()) == str(parsed.program)
+    assert parser.errors() == parsed.errors()
+    assert [0, 5, 9, 10, 11, 13] == list(parsed.boundaries)
+    assert [1, 1] == [len(errors) for errors in parsed.statement_errors if errors]
+
+
+def test_edits():
+    tests = [
+        (0, 0, "let z = 0; "),
+        (4, 3, "plus"),
+        (12, 1, ""),
+        (35, 1, ""),
+        (35, 0, '"'),
+        (60, 4, "=="),
+        (len(SOURCE), 0, "}"),
+        (0, len(SOURCE), ""),
+        (29, 1, ""),
+        (27, 1, " - a"),
+        (len(SOURCE), 0, '"x'),
+    ]
+
+    for offset, removed, inserted in tests:
+        parsed = edit(parse_source(SOURCE), offset, removed, inserted)
+        assert SOURCE[:offset] + inserted + SOURCE[offset + removed:] == parsed.source
+        _assert_same_as_full_parse(parsed)
+
+    # no old token lines up again after an edit inside an unterminated string
+    parsed = edit(parse_source('a "'), 3, 0, "x")
+    assert 'a "x' == parsed.source
+    _assert_same_as_full_parse(parsed)
+
+
+def test_random_edits():
+    randomness = random.Random(21)
+    alphabet = ['a', '1', ' ', '\n', ';', '"', '{', '}', '(', ')', '=', '!', '+', 'let ', 'fn']
+    parsed = parse_source(SOURCE)
+    for _ in range(300):
+        offset = randomness.randint(0, len(parsed.source))
+        removed = randomness.randint(0, min(3, len(parsed.source) - offset))
+        inserted = "".join(randomness.choices(alphabet, k=randomness.randint(0, 3)))
+        parsed = edit(parsed, offset, removed, inserted)
+        _assert_same_as_full_parse(parsed)
+
+
+def test_unchanged_statements_are_reused():
+    input_source = "".join(f"let v = {i} * 2;\n" for i in range(100))
+    parsed = parse_source(input_source)
+    offset = input_source.index("50 * 2")
+    edited = edit(parsed, offset, 2, "7")
+    assert "let v = (7 * 2)" == str(edited.statements[50])
+    for i, statement in enumerate(edited.statements):
+        if i != 50:
+            assert statement is parsed.statements[i]
+
+
+def test_chunks(monkeypatch):
+    monkeypatch.setattr(incremental, "CHUNK_SIZE", 4)
+    randomness = random.Random(7)
+    tests = [
+        (array("i", range(0, 300, 3)), True, lambda values: array("i", values)),
+        (list(range(50)), False, list),
+        ("some text " * 10, False, "".join),
+    ]
+
+    for values, shifted, build in tests:
+        expected = list(values)
+        chunks = chunked(values, shifted)
+        for _ in range(200):
+            first = randomness.randint(0, len(expected))
+            tail = randomness.randint(first, min(first + 9, len(expected)))
+            count = randomness.randint(0, 9)
+            inserted = build(randomness.choice(expected or [1]) for _ in range(count))
+            delta = randomness.randint(-5, 5) if shifted else 0
+            moved = [value + delta for value in expected[tail:]] if shifted else expected[tail:]
+            expected = expected[:first] + list(inserted) + moved
+            chunks = chunks.splice(first, tail, inserted, delta)
+            assert expected == list(chunks)
+            assert len(expected) == len(chunks)
+            assert expected == [chunks[index] for index in range(len(chunks))]
+            if expected:
+                assert expected[-1] == chunks[-1]
+        if isinstance(values, str):
+            text = "".join(expected)
+            assert text == str(chunks)
+            for start in range(len(text)):
+                assert text[start: start + 7] == chunks[start: start + 7]
+
+
+def test_edits_in_small_chunks(monkeypatch):
+    # tokens across chunk boundaries, and scanned from slices of a few characters
+    monkeypatch.setattr(incremental, "CHUNK_SIZE", 2)
+    monkeypatch.setattr(incremental, "_WINDOW", 3)
+    test_edits()
+    test_random_edits()
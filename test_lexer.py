@@ -1,5 +1,12 @@
-from lexer import Lexer
-from tokens import TokenType
+import io
+import mmap
+
+import pytest
+
+from lexer import Lexer, RegexLexer, StreamLexer, tokenize
+from parser import Parser
+from test_parser import create_program
+from tokens import TokenType, TOKEN_KINDS
 
 
 def test_validate_lexer():
@@ -124,3 +131,125 @@ def test_validate_lexer():
         token = lexer.next_token()
         assert token.token_type == token_type
         assert token.literal == literal
+
+
+def _tokens(lexer, limit=1000):
+    tokens = []
+    for _ in range(limit):
+        token = lexer.next_token()
+        tokens.append(token)
+        if token.token_type == TokenType.EOF:
+            break
+    return tokens
+
+
+@pytest.mark.parametrize(
+    "input_source",
+    [
+        "",
+        "   \n\t ",
+        "let five = 5;\nlet add = fn(x, y) {\n\tx + y;\n}\nlet result = add(five, 10);\n!-/*5;\n"
+        "5 < 10 > 5;\nif (5 < 10) {\n\treturn true;\n} else {\n\treturn false;\n}\n"
+        '10 == 10;\n10 != 9;\n"foobar"\n"foo bar"\n[1,2];\n{"foo":"bar"}',
+        "let x_1 = fn(a,b){a!=b==!a}; x_1(1,2)",
+        '"unterminated',
+        '"" "a b" "',
+        "abc123def 0042",
+        "let é = 1; ü + ²",
+        "if(x>=y){return x;}else{return y;}",
+    ],
+)
+def test_regex_lexer_matches_lexer(input_source):
+    assert _tokens(Lexer(input_source)) == _tokens(RegexLexer(input_source))
+
+
+def test_illegal_characters():
+    # Lexer never moves past an ILLEGAL character, so it returns it forever.
+    # RegexLexer consumes it and goes on with the characters after it
+    lexer = Lexer("a @ b")
+    assert (TokenType.IDENT, "a") == lexer.next_token()
+    for _ in range(3):
+        assert (TokenType.ILLEGAL, "@") == lexer.next_token()
+
+    tokens = _tokens(RegexLexer("a @ b # 1"))
+    assert [
+        (TokenType.IDENT, "a"),
+        (TokenType.ILLEGAL, "@"),
+        (TokenType.IDENT, "b"),
+        (TokenType.ILLEGAL, "#"),
+        (TokenType.INT, "1"),
+        (TokenType.EOF, ""),
+    ] == [(token.token_type, token.literal) for token in tokens]
+    # sources with non-ASCII characters are lexed by Lexer, with the same result
+    assert [
+        (TokenType.IDENT, "é"),
+        (TokenType.ILLEGAL, "@"),
+        (TokenType.IDENT, "b"),
+        (TokenType.EOF, ""),
+    ] == [(token.token_type, token.literal) for token in _tokens(RegexLexer("é @ b"))]
+
+
+def test_parser_accepts_regex_lexer():
+    input_source = 'let add = fn(a, b) { a + b * 2 }; add(1, [2, 3][0]); {"k": !true}'
+    program = Parser(RegexLexer(input_source)).parse_program()
+    assert str(create_program(input_source)) == str(program)
+
+
+def test_tokenize_matches_regex_lexer():
+    tests = [
+        "",
+        "let x_1 = fn(a,b){a!=b==!a}; x_1(1,2)",
+        '"unterminated',
+        '"" "a b" "',
+        "let é = 1; ü + ² \"ä\"",
+        "a @ b # 1",
+    ]
+
+    for input_source in tests:
+        stream = tokenize(input_source)
+        assert _tokens(RegexLexer(input_source)) == [stream.token(i) for i in range(len(stream))]
+
+
+def test_token_stream_offsets():
+    input_source = 'let s = "ab";'
+    stream = tokenize(input_source)
+    assert "i" == stream.kinds.typecode
+    assert [0, 4, 6, 9, 12, 13] == list(stream.starts)
+    assert [3, 5, 7, 11, 13, 13] == list(stream.ends)
+    assert TokenType.STRING == stream.token_type(3)
+    assert TOKEN_KINDS[TokenType.STRING] == stream.kinds[3]
+    assert "ab" == stream.literal(3)
+
+
+def test_parser_accepts_token_stream():
+    input_source = 'let add = fn(a, b) { a + b * 2 }; add(1, [2, 3][0]); {"k": !true}'
+    program = Parser(tokenize(input_source)).parse_program()
+    assert str(create_program(input_source)) == str(program)
+
+
+def test_stream_lexer_matches_tokenize():
+    tests = [
+        "",
+        "let x_1 = fn(a,b){a!=b==!a}; x_1(1,2)",
+        'let s = "a longer string literal"; s == "x"',
+        '"unterminated',
+        "let é = 1; ü + ² \"ä\" @",
+        "a @ b # 1 !",
+    ]
+
+    for input_source in tests:
+        stream = tokenize(input_source)
+        expected = [stream.token(i) for i in range(len(stream))]
+        for chunk_size in (1, 2, 3, 7, 1000):
+            assert expected == _tokens(StreamLexer(io.StringIO(input_source), chunk_size))
+            binary = io.BytesIO(input_source.encode("utf-8"))
+            assert expected == _tokens(StreamLexer(binary, chunk_size)), (input_source, chunk_size)
+
+
+def test_stream_lexer_reads_mmap(tmp_path):
+    input_source = 'let add = fn(a, b) { a + b * 2 }; add(1, [2, 3][0]); {"ключ": !true}\n' * 50
+    path = tmp_path / "program.monkey"
+    path.write_text(input_source, encoding="utf-8")
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as source:
+        program = Parser(StreamLexer(source, chunk_size=64)).parse_program()
+    assert str(create_program(input_source)) == str(program)
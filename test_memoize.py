@@ -0,0 +1,133 @@
+import memoize
+from memoize import (
+    FunctionCache,
+    MemoizingEnvironment,
+    pure_functions,
+    evaluate,
+    FIFO,
+)
+from evaluator import evaluate as evaluate_program
+from objects import MemoizedFunction
+from test_parser import create_program
+
+FIBONACCI = """
+let fibonacci = fn(x) {
+    if (x < 2) { return x; } else { fibonacci(x - 1) + fibonacci(x - 2); }
+};
+"""
+
+
+def _memoized(program, env):
+    return evaluate(program, MemoizingEnvironment())
+
+
+def test_pure_functions():
+    tests = [
+        (FIBONACCI, ["fibonacci"]),
+        ("let f = fn(x) { len(x) + first(x) }; let g = fn(x) { f(x) * 2 };", ["f", "g"]),
+        ("let f = fn(x) { push(x, 1) }; let g = fn(x) { rest(x) };", ["f", "g"]),
+        ("let f = fn(x) { let r = rest; r(x) };", []),
+        ("let f = fn(x, g) { g(x) };", []),
+        ("let f = fn(x) { fn(y) { x + y } };", []),
+        ("let a = 1; let f = fn(x) { x + a };", []),
+        ("let f = fn(x) { x }; let g = fn(x) { f(x) }; let f = fn(x) { 2 };", []),
+        ("let f = fn(x) { g(x) }; let g = fn(x) { h(x) };", []),
+        ("let len = fn(x) { 0 }; let f = fn(x) { len(x) };", ["len", "f"]),
+        ("let f = fn(x) { x }; let g = 5;", ["f"]),
+    ]
+
+    for input_source, expected in tests:
+        assert sorted(expected) == sorted(pure_functions(create_program(input_source)))
+
+
+def test_memoized_calls():
+    env = MemoizingEnvironment()
+    result = evaluate(create_program(FIBONACCI + "fibonacci(60)"), env)
+    assert 1548008755920 == result.value
+    assert isinstance(env.store["fibonacci"], MemoizedFunction)
+    info = env.cache_info()["fibonacci"]
+    assert 61 == info.misses
+    assert 58 == info.hits
+    assert 61 == info.currsize
+
+    evaluate(create_program("fibonacci(60)"), env)
+    assert 59 == env.cache_info()["fibonacci"].hits
+
+
+def test_only_value_results_are_cached():
+    env = MemoizingEnvironment()
+    result = evaluate(
+        create_program('let s = fn(x) { "a" }; let t = fn(x) { [x] }; s(1) == s(1)'),
+        env,
+    )
+    assert not result.value
+    evaluate(create_program("t(1); t(1)"), env)
+    assert 0 == env.cache_info()["s"].currsize
+    assert 0 == env.cache_info()["t"].currsize
+
+
+def test_cache_size_and_eviction():
+    env = MemoizingEnvironment(maxsize=2)
+    evaluate(create_program("let f = fn(x) { x * 2 }; f(1); f(2); f(1); f(3); f(2)"), env)
+    info = env.cache_info()["f"]
+    assert (1, 4, 2, 2) == (info.hits, info.misses, info.maxsize, info.currsize)
+
+    cache = FunctionCache(maxsize=2, eviction=FIFO)
+    cache.put(1, "one")
+    cache.put(2, "two")
+    assert "one" == cache.get(1)
+    cache.put(3, "three")
+    assert cache.get(1) is None
+    assert "two" == cache.get(2)
+
+    env = MemoizingEnvironment(maxsize=None)
+    evaluate(create_program("let f = fn(x) { x }; f(1); f(2); f(3)"), env)
+    assert 3 == env.cache_info()["f"].currsize
+
+
+def test_only_the_latest_programs_are_kept(monkeypatch):
+    monkeypatch.setattr(memoize, "_MAX_PROGRAMS", 2)
+    env = MemoizingEnvironment()
+    first = create_program("let f = fn(x) { x * 2 };")
+    env.memoize(first)
+    for _ in range(5):
+        evaluate(create_program("let g = fn(x) { x + 1 }; g(1)"), env)
+        assert isinstance(env.store["g"], MemoizedFunction)
+    assert 2 == len(env._programs)
+
+    # f was found pure in a program that is forgotten now
+    evaluate_program(first, env)
+    assert not isinstance(env.store["f"], MemoizedFunction)
+    evaluate(first, env)
+    assert isinstance(env.store["f"], MemoizedFunction)
+
+
+def test_rebinding_a_global_stops_memoizing_its_users():
+    env = MemoizingEnvironment()
+    result = evaluate(
+        create_program("let g = fn(x) { x }; let f = fn(x) { g(x) }; let h = fn(x) { f(x) }; h(1)"),
+        env,
+    )
+    assert 1 == result.value
+    result = evaluate(create_program("let g = fn(x) { x * 2 }; [f(1), h(1)]"), env)
+    assert "[2, 2]" == str(result)
+    assert not isinstance(env.store["f"], MemoizedFunction)
+    assert not isinstance(env.store["h"], MemoizedFunction)
+    assert ["g"] == list(env.cache_info())
+
+    evaluate(create_program("let f = fn(x) { len(x) }; let k = f; k([1])"), env)
+    result = evaluate(create_program("let len = fn(x) { 5 }; k([1])"), env)
+    assert 5 == result.value
+
+
+def test_memoized_calls_with_strings_and_floats():
+    env = MemoizingEnvironment()
+    result = evaluate(
+        create_program('let same = fn(a, b) { a == b }; let s = "x"; same(s, s)'), env
+    )
+    assert result.value
+    result = evaluate(create_program('same("x", "x")'), env)
+    assert not result.value
+
+    result = evaluate(create_program("let g = fn(x) { x }; [g(4 / 2), g(2)]"), env)
+    assert "[2.0, 2]" == str(result)
@@ -0,0 +1,148 @@
+import pytest
+
+import objects
+from objects import (
+    HashTrie,
+    IntBuffer,
+    MArray,
+    MInteger,
+    MString,
+    NUMPY_MIN_SIZE,
+    Vector,
+    elementwise,
+)
+
+
+class _CollidingKey:
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return self.value % 3
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def test_hash_trie():
+    versions = [HashTrie()]
+    for i in range(1000):
+        versions.append(versions[-1].set(i, i * i))
+    for size, trie in enumerate(versions):
+        assert size == len(trie)
+    trie = versions[-1]
+    assert 998001 == trie[999]
+    assert trie.get(1000) is None
+    assert sorted(trie) == list(range(1000))
+
+    smaller = trie.delete(500).delete(10_000)
+    assert 999 == len(smaller)
+    assert smaller.get(500) is None
+    assert 250000 == trie[500]
+    assert trie is trie.delete(10_000)
+
+    replaced = trie.set(7, "seven")
+    assert 1000 == len(replaced)
+    assert "seven" == replaced[7]
+    assert 49 == trie[7]
+
+    empty = HashTrie().set(1, 1).delete(1)
+    assert 0 == len(empty)
+    assert [] == list(empty.items())
+
+
+def test_hash_trie_collisions():
+    keys = [_CollidingKey(i) for i in range(20)]
+    trie = HashTrie.from_items((key, key.value) for key in keys)
+    assert 20 == len(trie)
+    for key in keys:
+        assert key.value == trie[key]
+    for key in keys[:19]:
+        trie = trie.delete(key)
+    assert [(keys[19], 19)] == list(trie.items())
+
+
+def test_vector():
+    vector = Vector([1, 2, 3])
+    rest = vector.rest()
+    assert [2, 3] == list(rest)
+    assert [2, 3, 4] == list(rest.push(4))
+    assert [1, 2, 3, 5] == list(vector.push(5))
+    assert [1, 2, 3] == list(vector)
+    assert 3 == vector[-1]
+    assert [2] == list(vector[1:2])
+    assert [3, 1] == list(vector[::-2])
+
+
+def test_string_rope():
+    piece = MString("x" * 100)
+    rope = MString("")
+    for _ in range(10_000):
+        rope = rope + piece
+    assert 1_000_000 == len(rope)
+    assert "x" * 1_000_000 == rope.value
+    assert rope.value is rope.value
+    assert "x" * 1_000_000 == repr(rope)
+
+    small = MString("ab") + MString("cd")
+    assert 4 == len(small)
+    assert "abcd" == small.value
+    assert "abcd" == repr(small)
+    long = MString("a" * 300) + MString("b")
+    assert 301 == len(long)
+    assert long.hash_key() == MString("a" * 300 + "b").hash_key()
+    assert "a" * 300 + "bc" == (long + MString("c")).value
+
+
+def test_string_views():
+    text = MString("alpha,beta,,gamma")
+    beta = text.view(6, 10)
+    assert text.value is beta._buffer
+    assert beta._flat is None
+    assert 4 == len(beta)
+    assert 1 == beta.find(MString("et"))
+    assert -1 == beta.find(MString("gamma"))
+    assert "et" == beta.view(1, 3).value
+    assert text.value is beta.view(1, 3)._buffer
+    assert "" == text.view(10, 5).value
+    assert "gamma" == text.view(12, 100).value
+
+    parts = text.split(MString(","))
+    assert all(part._buffer is text.value for part in parts)
+    assert ["alpha", "beta", "", "gamma"] == [part.value for part in parts]
+    assert ["e", "a"] == [part.value for part in beta.view(1, 4).split(MString("t"))]
+    assert beta.hash_key() == MString("beta").hash_key()
+    assert "beta!" == (beta + MString("!")).value
+
+
+def test_integer_arrays_in_numpy_buffers():
+    pytest.importorskip("numpy")
+    small = MArray([MInteger(i) for i in range(NUMPY_MIN_SIZE - 1)])
+    assert type(small.elements) is Vector
+    array = MArray([MInteger(i) for i in range(NUMPY_MIN_SIZE)])
+    assert type(array.elements) is IntBuffer
+    assert 5 == array.elements[5].value
+    assert type(array.elements.rest()) is IntBuffer
+    assert type(array.elements.push(MInteger(1))) is Vector
+    assert type(MArray([MInteger(2 ** 63)] * NUMPY_MIN_SIZE).elements) is Vector
+    assert type(MArray([MInteger(1.5)] * NUMPY_MIN_SIZE).elements) is Vector
+
+    doubled = elementwise("*", array, MInteger(2))
+    assert type(doubled.elements) is IntBuffer
+    assert 62 == doubled.elements[31].value
+    overflowing = elementwise("*", array, MInteger(2 ** 62))
+    assert 31 * 2 ** 62 == overflowing.elements[31].value
+    divided = elementwise("/", array, MInteger(-3))
+    assert type(divided.elements) is IntBuffer
+    assert [int(i / -3) for i in range(NUMPY_MIN_SIZE)] == [element.value for element in divided.elements]
+    assert type(elementwise("/", array, MInteger(-(2 ** 63))).elements) is IntBuffer
+
+
+def test_elementwise_without_numpy(monkeypatch):
+    monkeypatch.setattr(objects, "numpy", None)
+    array = MArray([MInteger(i) for i in range(NUMPY_MIN_SIZE)])
+    assert type(array.elements) is Vector
+    added = elementwise("+", array, array)
+    assert [2 * i for i in range(NUMPY_MIN_SIZE)] == [element.value for element in added.elements]
+    divided = elementwise("/", array, MInteger(-3))
+    assert [int(i / -3) for i in range(NUMPY_MIN_SIZE)] == [element.value for element in divided.elements]
@@ -0,0 +1,75 @@
+import os
+
+import parse_cache
+from parse_cache import ParseCache, cache_for, CACHE_DIRECTORY
+from test_parser import create_program
+
+SOURCE = "let add = fn(a, b) { a + b }; add(1, 2)"
+
+
+def test_second_parse_reads_the_cache(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path / "cache"))
+    program, errors = cache.parse(SOURCE)
+    assert [] == errors
+    assert (0, 1) == (cache.hits, cache.misses)
+    assert os.path.exists(cache.path(SOURCE))
+    assert [] == [name for name in os.listdir(cache.directory) if name.endswith(".tmp")]
+
+    def no_parsing(*args):
+        raise AssertionError("parsed a cached source")
+
+    monkeypatch.setattr(parse_cache, "Parser", no_parsing)
+    cached, errors = cache.parse(SOURCE)
+    assert (1, 1) == (cache.hits, cache.misses)
+    assert create_program(SOURCE) == cached
+    assert program is not cached
+
+
+def test_entries_are_keyed_by_source_and_version(tmp_path, monkeypatch):
+    cache = ParseCache(str(tmp_path))
+    assert cache.path(SOURCE) != cache.path(SOURCE + " ")
+    path = cache.path(SOURCE)
+    monkeypatch.setattr(parse_cache, "FORMAT_VERSION", 2)
+    assert path != cache.path(SOURCE)
+
+
+def test_bad_entries_are_replaced(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    cache.parse(SOURCE)
+    with open(cache.path(SOURCE), "wb") as file:
+        file.write(b"garbage")
+
+    program, _ = cache.parse(SOURCE)
+    assert create_program(SOURCE) == program
+    assert (0, 2) == (cache.hits, cache.misses)
+    cache.parse(SOURCE)
+    assert 1 == cache.hits
+
+
+def test_parse_errors_are_cached(tmp_path):
+    cache = ParseCache(str(tmp_path))
+    _, errors = cache.parse("let = 1;")
+    _, cached_errors = cache.parse("let = 1;")
+    assert 1 == cache.hits
+    assert len(errors) > 0
+    assert errors == cached_errors
+
+
+def test_unwritable_cache_still_parses(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ParseCache(str(blocker / "cache"))
+    program, _ = cache.parse(SOURCE)
+    assert create_program(SOURCE) == program
+    assert (0, 1) == (cache.hits, cache.misses)
+
+
+def test_cache_for_source_file(tmp_path):
+    path = tmp_path / "rules.monkey"
+    path.write_text(SOURCE, encoding="utf-8")
+    cache = cache_for(str(path))
+    assert str(tmp_path / CACHE_DIRECTORY) == cache.directory
+    cache.parse_file(str(path))
+    program, _ = cache.parse_file(str(path))
+    assert 1 == cache.hits
+    assert create_program(SOURCE) == program
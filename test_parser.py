@@ -1,8 +1,16 @@
+import pytest
+
 from lexer import Lexer
-from parser import Parser
+from parser import Parser, IterativeParser
 from astree import IntegerLiteral
 
 
+@pytest.fixture(params=[Parser, IterativeParser], ids=lambda cls: cls.__name__)
+def parser_class(request):
+    # the tests that build programs take this fixture, and run once with each parser
+    return request.param
+
+
 def count_statements(i, program):
     size = len(program.statements)
     assert i == size
@@ -40,7 +48,7 @@ def assert_literal_expression(value, expected_value):
         raise AssertionError(f"type of value not handled. got={type(expected_value)!r}")
 
 
-def test_let_statements():
+def test_let_statements(parser_class):
     tests = [
         ("let x = 5;", "x", 5),
         ("let y = true;", "y", True),
@@ -48,7 +56,7 @@ def test_let_statements():
     ]
 
     for input_source, expected_identifier, expected_value in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         count_statements(1, program)
         statement = program.statements[0]
         assert_let_statement(statement, expected_identifier)
@@ -56,20 +64,20 @@ def test_let_statements():
         assert_literal_expression(value, expected_value)
 
 
-def test_return_statement():
+def test_return_statement(parser_class):
     tests = [("return 5;", 5), ("return true;", True), ("return foobar;", "foobar")]
 
     for input_source, expected_value in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         count_statements(1, program)
         statement = program.statements[0]
         assert "return" == statement.token_literal()
         assert_literal_expression(statement.return_value, expected_value)
 
 
-def test_identifier_expression():
+def test_identifier_expression(parser_class):
     input_source = "foobar;"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     statement = program.statements[0]
     identifier = statement.expression
@@ -77,9 +85,9 @@ def test_identifier_expression():
     assert "foobar" == identifier.token_literal()
 
 
-def test_integer_literals():
+def test_integer_literals(parser_class):
     input_source = "5;"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     statement = program.statements[0]
     literal = statement.expression
@@ -93,7 +101,7 @@ def test_integer_literals():
             )
 
 
-def test_parsing_prefix_expressions():
+def test_parsing_prefix_expressions(parser_class):
     tests = [
         ("!5;", "!", 5),
         ("-15;", "-", 15),
@@ -102,7 +110,7 @@ def test_parsing_prefix_expressions():
     ]
 
     for input_source, operator, value in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         count_statements(1, program)
         statement = program.statements[0]
         expression = statement.expression
@@ -116,7 +124,7 @@ def assert_infix_expression(expression, left_value, operator, right_value):
     assert_literal_expression(expression.right, right_value)
 
 
-def test_parsing_infix_expressions():
+def test_parsing_infix_expressions(parser_class):
     tests = [
         ("5 + 5;", 5, "+", 5),
         ("5 - 5;", 5, "-", 5),
@@ -132,14 +140,14 @@ def test_parsing_infix_expressions():
     ]
 
     for input_source, left_value, operator, right_value in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         count_statements(1, program)
         assert_infix_expression(
             program.statements[0].expression, left_value, operator, right_value
         )
 
 
-def test_operator_precedence():
+def test_operator_precedence(parser_class):
     tests = [
         (
             "-a * b",
@@ -252,29 +260,29 @@ def test_operator_precedence():
     ]
 
     for input_source, expected in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         actual = str(program)
         assert expected == actual
 
 
-def test_boolean_expression():
+def test_boolean_expression(parser_class):
     tests = [("true", True), ("false", False)]
 
     for input_source, expected_boolean in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         count_statements(1, program)
         boolean_literal = program.statements[0].expression
         assert expected_boolean == boolean_literal.value
 
 
-def test_if_expression():
+def test_if_expression(parser_class):
     input_source = "if (x < y) { x }"
-    exp = assert_if_expression(input_source)
+    exp = assert_if_expression(input_source, parser_class)
     assert exp.alternative is None
 
 
-def assert_if_expression(input_source):
-    program = create_program(input_source)
+def assert_if_expression(input_source, parser_class):
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     exp = program.statements[0].expression
     assert_infix_expression(exp.condition, "x", "<", "y")
@@ -284,17 +292,17 @@ def assert_if_expression(input_source):
     return exp
 
 
-def test_if_else_expression():
+def test_if_else_expression(parser_class):
     input_source = "if (x < y) { x } else { y }"
-    exp = assert_if_expression(input_source)
+    exp = assert_if_expression(input_source, parser_class)
     assert 1 == len(exp.alternative.statements)
     alternative = exp.alternative.statements[0]
     assert_identifier(alternative.expression, "y")
 
 
-def test_function_literal_parsing():
+def test_function_literal_parsing(parser_class):
     input_source = "fn(x, y) { x + y;}"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     function = program.statements[0].expression
     assert_literal_expression(function.parameters[0], "x")
@@ -303,20 +311,20 @@ def test_function_literal_parsing():
     assert_infix_expression(function.body.statements[0].expression, "x", "+", "y")
 
 
-def test_function_parameter_parsing():
+def test_function_parameter_parsing(parser_class):
     tests = [("fn() {}", []), ("fn(x) {}", ["x"]), ("fn(x, y, z) {}", ["x", "y", "z"])]
 
     for input_source, expected_params in tests:
-        program = create_program(input_source)
+        program = create_program(input_source, parser_class)
         function = program.statements[0].expression
         assert len(expected_params) == len(function.parameters)
         for i, param in enumerate(expected_params):
             assert_literal_expression(function.parameters[i], param)
 
 
-def test_call_expression_parsing():
+def test_call_expression_parsing(parser_class):
     input_source = "add(1, 2 * 3, 4+5)"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     exp = program.statements[0].expression
     assert_identifier(exp.function, "add")
@@ -326,33 +334,33 @@ def test_call_expression_parsing():
     assert_infix_expression(exp.arguments[2], 4, "+", 5)
 
 
-def test_literal_expression():
+def test_literal_expression(parser_class):
     input_source = '"hello world";'
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     count_statements(1, program)
     assert "hello world" == program.statements[0].expression.value
 
 
-def test_parsing_array_literal():
+def test_parsing_array_literal(parser_class):
     input_source = "[1, 2 * 2, 3 + 3]"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     array = program.statements[0].expression
     assert_integer_literal(array.elements[0], 1)
     assert_infix_expression(array.elements[1], 2, "*", 2)
     assert_infix_expression(array.elements[2], 3, "+", 3)
 
 
-def test_parsing_index_expression():
+def test_parsing_index_expression(parser_class):
     input_source = "myArray[1 + 1]"
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     index = program.statements[0].expression
     assert_identifier(index.left, "myArray")
     assert_infix_expression(index.index, 1, "+", 1)
 
 
-def test_hash_string_keys():
+def test_hash_string_keys(parser_class):
     input_source = '{"one": 1, "two": 2, "three": 3}'
-    program = create_program(input_source)
+    program = create_program(input_source, parser_class)
     hash_literal = program.statements[0].expression
     assert 3 == len(hash_literal.pairs)
     expected = {"one": 1, "two": 2, "three": 3}
@@ -368,9 +376,123 @@ def check_parser_errors(parser):
         raise AssertionError(f"parser has {len(errors)} errors: \n{jump.join(errors)}")
 
 
-def create_program(input_source):
+def create_program(input_source, parser_class=Parser):
     lexer = Lexer(input_source)
-    parser = Parser(lexer)
+    parser = parser_class(lexer)
     program = parser.parse_program()
     check_parser_errors(parser)
     return program
+
+
+def test_iterative_parser_matches_parser():
+    tests = [
+        "-a * b; !-a; a + b * c + d / e - f; 5 > 4 == 3 < 4",
+        "1 + (2 + 3) + 4; (5 + 5) * 2 * (5 + 5); -(5 + 5); !(true == true)",
+        "a + add(b * c) + d; add(a, b, 1, 2 * 3, 4 + 5, add(6, 7 * 8))",
+        "a * [1, 2, 3, 4][b * c] * d; add(a * b[2], b[1], 2 * [1, 2][1])",
+        "f()()[0]; [][0]; -[1][0]; !f(x); [[1, [2]], []]",
+        'if (x) { -(1) } else { [2] }; fn(a, b) { return a(b)[0]; }; {"a": -1, [1]: f(2)}',
+        "let x = -(1 + 2) * 3; return [x, -x];",
+        "-); (1 + 2; [1, 2; a[1; f(1,; let = ; [; a + ; (]",
+    ]
+
+    for input_source in tests:
+        expected_parser = Parser(Lexer(input_source))
+        expected = expected_parser.parse_program()
+        parser = IterativeParser(Lexer(input_source))
+        program = parser.parse_program()
+        assert expected_parser.errors() == parser.errors()
+        if len(parser.errors()) == 0:
+            assert str(expected) == str(program)
+        else:
+            assert [type(s) for s in expected.statements] == [type(s) for s in program.statements]
+
+
+def _depth(node, attribute):
+    # iterative, str() of these trees would hit the recursion limit
+    depth = 0
+    while node is not None:
+        depth += 1
+        node = getattr(node, attribute, None)
+        if isinstance(node, list):
+            node = node[0] if len(node) > 0 else None
+    return depth
+
+
+def test_iterative_parser_deep_nesting():
+    depth = 5000
+    tests = [
+        ("(" * depth + "1" + ")" * depth, "right", 1),
+        ("-" * depth + "1", "right", depth + 1),
+        ("1" + " + (1" * depth + ")" * depth, "right", depth + 1),
+        ("[" * depth + "]" * depth, "elements", depth),
+        (" + ".join(["1"] * depth), "left", depth),
+        ("f" + "(1)" * depth, "function", depth + 1),
+        ("a" + "[0]" * depth, "left", depth + 1),
+    ]
+
+    for input_source, attribute, expected in tests:
+        parser = IterativeParser(Lexer(input_source))
+        program = parser.parse_program()
+        check_parser_errors(parser)
+        assert 1 == len(program.statements)
+        assert expected == _depth(program.statements[0].expression, attribute)
+
+
+def test_nodes_compare_by_structure(parser_class):
+    input_source = "let f = fn(a) { [a, 1] }; f(1) + x[0]; f(1) + x[0]; -true"
+    program = create_program(input_source, parser_class)
+    let, call, same_call, prefix = program.statements
+    assert call == same_call
+    assert call is not same_call
+    assert hash(call) == hash(same_call)
+    assert call.expression.left == same_call.expression.left
+    assert call.expression != call.expression.left
+    assert let != call
+    assert prefix != call
+    call_program = create_program("f(1) + x[0]", parser_class)
+    assert call_program == create_program("f(1) + x[0]", parser_class)
+    assert call_program != create_program("f(1) + x[1]", parser_class)
+    assert not hasattr(let, "__dict__")
+
+    # a string and an identifier print the same, but are different keys
+    source = '{"a": 1, a: 2, "a": 3}'
+    hash_literal = create_program(source, parser_class).statements[0].expression
+    assert 2 == len(hash_literal.pairs)
+
+
+def test_deep_nodes_compare_and_hash():
+    depth = 20000
+    key = "1" + " + 1" * depth
+    parser = IterativeParser(Lexer("{" + key + ": 1}"))
+    hash_literal = parser.parse_program().statements[0].expression
+    check_parser_errors(parser)
+    deep_key = next(iter(hash_literal.pairs))
+    other = IterativeParser(Lexer(key)).parse_program().statements[0].expression
+
+    assert deep_key == other
+    assert hash(deep_key) == hash(other)
+    assert deep_key != IterativeParser(Lexer(key + " + 2")).parse_program().statements[0].expression
+
+
+def test_changed_nodes_hash_again():
+    program = create_program("let a = 1;")
+    same = create_program("let a = 1;")
+    before = hash(program)
+    program.statements.append(create_program("a").statements[0])
+
+    assert program != same
+    assert before != hash(program)
+    same.statements.append(create_program("a").statements[0])
+    assert program == same
+    assert hash(program) == hash(same)
+
+
+def test_nested_hash_literal_keys(parser_class):
+    # hashing a key by its str() hashed every key nested in it again, once per level
+    depth = 400
+    input_source = "{" * depth + "1: 1" + "}: 1" * (depth - 1) + "}"
+    hash_literal = create_program(input_source, parser_class).statements[0].expression
+    for _ in range(depth - 1):
+        assert 1 == len(hash_literal.pairs)
+        hash_literal = next(iter(hash_literal.pairs))
@@ -0,0 +1,74 @@
+import threading
+
+import vm
+from compiler import compile_program
+from evaluator import Environment, evaluate
+from program_cache import ProgramCache
+from test_parser import create_program
+
+
+def test_programs_are_cached_by_source():
+    cache = ProgramCache()
+    first = cache.get("let x = 1; x + 1")
+    assert first is cache.get("let x = 1; x + 1")
+    assert first.program is first.prepared
+    assert [] == first.errors
+    assert create_program("let x = 1; x + 1") == first.program
+    assert 2 == evaluate(first.program, Environment()).value
+
+    info = cache.info()
+    assert (1, 1, 1) == (info.hits, info.misses, info.currsize)
+
+
+def test_least_recently_used_is_evicted():
+    cache = ProgramCache(maxsize=2)
+    one = cache.get("1")
+    cache.get("2")
+    cache.get("1")
+    cache.get("3")
+    assert one is cache.get("1")
+    cache.get("2")
+    info = cache.info()
+    assert (2, 4, 2) == (info.hits, info.misses, info.currsize)
+
+    cache.clear()
+    assert (0, 0, 0) == (cache.info().hits, cache.info().misses, cache.info().currsize)
+
+
+def test_prepared_programs():
+    prepared = []
+
+    def prepare(program):
+        prepared.append(program)
+        return compile_program(program)
+
+    cache = ProgramCache(prepare=prepare)
+    for _ in range(3):
+        bytecode = cache.get("let f = fn(x) { x * 2 }; f(21)").prepared
+        assert 42 == vm.run(bytecode, Environment()).value
+    assert 1 == len(prepared)
+
+
+def test_parser_errors_are_kept():
+    cache = ProgramCache()
+    errors = cache.get("let = 1;").errors
+    assert len(errors) > 0
+    assert errors == cache.get("let = 1;").errors
+
+
+def test_concurrent_use():
+    cache = ProgramCache(maxsize=4)
+    results = []
+
+    def work(index):
+        for i in range(200):
+            results.append(evaluate(cache.get(f"{(index + i) % 8} * 2").program, Environment()).value)
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert 800 == len(results)
+    assert set(range(0, 16, 2)) == set(results)
+    assert cache.info().currsize <= 4
@@ -0,0 +1,48 @@
+from resolver import GLOBAL, Address, resolve
+from test_parser import create_program
+
+
+def test_identifier_addresses():
+    program = create_program(
+        "let g = 1; fn(a) { let b = a; fn(c) { a + b + c + g } }"
+    )
+    resolution = resolve(program)
+    outer = program.statements[1].expression
+    let_b = outer.body.statements[0]
+    inner = outer.body.statements[1].expression
+    sum_expression = inner.body.statements[0].expression
+
+    assert resolution.address(program.statements[0].name) is None
+    assert Address(0, 1) == resolution.address(let_b.name)
+    assert Address(0, 0) == resolution.address(let_b.value)
+    assert Address(1, 0) == resolution.address(sum_expression.left.left.left)
+    assert Address(1, 1) == resolution.address(sum_expression.left.left.right)
+    assert Address(0, 0) == resolution.address(sum_expression.left.right)
+    assert resolution.address(sum_expression.right) is None
+
+    # the nodes hold their addresses too, a global's counts the frames to the globals
+    assert Address(0, GLOBAL) == program.statements[0].name.address
+    assert Address(1, 1) == sum_expression.left.left.right.address
+    assert Address(2, GLOBAL) == sum_expression.right.address
+    assert resolution.layout(inner) is inner.layout
+
+
+def test_function_layout():
+    program = create_program(
+        "fn(x, y) { let z = x; if (true) { let w = 1; let z = 2; }; fn(q) { let r = q } }"
+    )
+    function = program.statements[0].expression
+    layout = resolve(program).layout(function)
+    assert ("x", "y", "z", "w") == layout.names
+    assert 2 == layout.num_parameters
+    assert {"x": 0, "y": 1, "z": 2, "w": 3} == layout.slots
+
+
+def test_duplicate_parameters():
+    program = create_program("fn(x, y, x) { x }")
+    function = program.statements[0].expression
+    resolution = resolve(program)
+    layout = resolution.layout(function)
+    assert ("x", "y", "x") == layout.names
+    assert 3 == layout.num_parameters
+    assert Address(0, 2) == resolution.address(function.body.statements[0].expression)
@@ -0,0 +1,92 @@
+import struct
+
+import pytest
+
+from lexer import Lexer
+from parser import Parser, IterativeParser
+from serializer import dumps, loads, loads_with_errors, FormatError, MAGIC
+from test_evaluator import CONFORMANCE_SOURCES
+from test_parser import create_program
+
+
+def test_round_trip():
+    tests = CONFORMANCE_SOURCES + [
+        '{"a": 1, a: 2, [1]: fn(x) { x }}["a"]',
+        "let big = 123456789012345678901234567890; -big",
+        'let s = "ünïcödé \U0001F600"; s',
+        "if (true) { 1 }",
+        "",
+    ]
+
+    for input_source in tests:
+        program = create_program(input_source)
+        loaded = loads(dumps(program))
+        assert program == loaded
+        assert str(program) == str(loaded)
+
+
+def test_round_trip_keeps_tokens_and_errors():
+    parser = Parser(Lexer("let = 1; f(1, ; 007 + x"))
+    program = parser.parse_program()
+    loaded, errors = loads_with_errors(dumps(program, parser.errors()))
+    assert parser.errors() == errors
+    assert [statement.token() for statement in program.statements] == [
+        statement.token() for statement in loaded.statements
+    ]
+    assert "(007 + x)" == str(loaded.statements[-1])
+
+
+def test_deep_trees():
+    depth = 5000
+    program = IterativeParser(Lexer("-" * depth + "1")).parse_program()
+    node = loads(dumps(program)).statements[0].expression
+    for _ in range(depth):
+        assert "-" == node.operator
+        node = node.right
+    assert 1 == node.value
+
+
+def test_rejects_bad_data():
+    data = dumps(create_program("let x = [1, 2]; x[0] + 1"))
+    version = struct.pack("<H", 999)
+    tests = [
+        b"",
+        b"NOTBRUNO" + data[8:],
+        data[:8] + version + data[10:],
+        data[:-4],
+        data + b"\0",
+        data[:-8] + struct.pack("<i", 12345) + data[-4:],
+    ]
+
+    assert data.startswith(MAGIC)
+    for bad in tests:
+        with pytest.raises(FormatError):
+            loads(bad)
+
+
+def test_rejects_negative_indexes():
+    program = create_program("let x = [1, 2]; x[0] + 1")
+    data = dumps(program)
+    with_error = dumps(program, ["an error"])
+    minus_one = struct.pack("<i", -1)
+    tests = [
+        # the root reference, which would wrap to the last node decoded
+        data[:-4] + minus_one,
+        # the index of the parser error string
+        with_error[:-4] + minus_one,
+    ]
+
+    assert program == loads(data)
+    for bad in tests:
+        with pytest.raises(FormatError):
+            loads_with_errors(bad)
+
+    # wherever it lands, a -1 or -2 decodes to the same program or fails
+    for offset in range(len(data) - 4, 15, -4):
+        for value in (-1, -2):
+            bad = data[:offset] + struct.pack("<i", value) + data[offset + 4:]
+            try:
+                decoded = loads(bad)
+            except FormatError:
+                continue
+            assert str(program) == str(decoded)
@@ -0,0 +1,51 @@
+from evaluator import Environment
+from memoize import MemoizingEnvironment
+from stack_evaluator import evaluate
+from test_parser import create_program
+
+
+def _eval(input_source, **kwargs):
+    return evaluate(create_program(input_source), Environment(), **kwargs)
+
+
+def test_deep_recursion_is_not_bound_by_python_stack():
+    input_source = """let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+    count(20000)"""
+    assert 20000 == _eval(input_source).value
+
+
+def test_max_depth():
+    input_source = """let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+    count(100)"""
+    assert 100 == _eval(input_source, max_depth=101).value
+    assert "maximum call depth exceeded: 50" == _eval(input_source, max_depth=50).message
+
+
+def test_callbacks_run_on_the_work_stack():
+    tests = [
+        # deep recursion inside a map callback
+        ("""let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+        map([10000, 3], count)""", "[10000, 3]"),
+        # recursion through map itself
+        ("""let depth = fn(n) { if (n == 0) { 0 } else { map([n - 1], depth)[0] + 1 } };
+        depth(5000)""", "5000"),
+        ("""let odd = fn(n) { if (n == 0) { false } else { !odd(n - 1) } };
+        filter([10001, 4, 7], odd)""", "[10001, 7]"),
+        ("""let add = fn(acc, n) { if (n == 0) { acc } else { 1 + add(acc, n - 1) } };
+        reduce([10000, 5], 1, add)""", "10006"),
+        ('map([1], "f")', "ERROR: not a function: MString"),
+        ("map(1, fn(x) { x })", "ERROR: argument to `map` must be ARRAY, got MInteger"),
+        ("map([1, 2], fn(x) { x + true })", "ERROR: type mismatch: MInteger + MBoolean"),
+    ]
+
+    for input_source, expected in tests:
+        assert expected == str(_eval(input_source)), input_source
+
+
+def test_memoized_calls_read_the_cache():
+    env = MemoizingEnvironment()
+    source = "let square = fn(x) { x * x }; map([3, 3, 4], square); square(3)"
+    program = create_program(source)
+    env.memoize(program)
+    assert 9 == evaluate(program, env).value
+    assert (2, 2) == (env.cache_info()["square"].hits, env.cache_info()["square"].misses)
@@ -0,0 +1,23 @@
+from evaluator import Environment
+from test_evaluator import assert_same_as_evaluator
+from test_parser import create_program
+from transpiler import evaluate, evaluate_source, load_source, transpile
+
+
+def test_functions_become_python_functions():
+    source, _ = transpile(create_program("let add = fn(a, b) { a + b };"))
+    assert "def _f" in source
+    assert "a_1" in source and "b_1" in source
+
+
+def test_if_operand_keeps_evaluation_order():
+    input_source = """let a = [];
+    let r = push(a, 1)[0] + if (true) { len(a) };
+    [r, len(a)]"""
+    assert_same_as_evaluator(evaluate, input_source)
+
+
+def test_modules_are_cached_by_source():
+    input_source = "let double = fn(x) { x * 2 }; double(21)"
+    assert load_source(input_source) is load_source(input_source)
+    assert 42 == evaluate_source(input_source, Environment()).value
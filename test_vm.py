@@ -0,0 +1,28 @@
+from evaluator import Environment, evaluate as tree_walker_evaluate
+from test_parser import create_program
+from vm import evaluate
+
+
+def test_globals_persist_in_environment():
+    env = Environment()
+    evaluate(create_program("let double = fn(x) { x * 2 };"), env)
+    result = evaluate(create_program("double(21)"), env)
+    assert 42 == result.value
+
+
+def test_deep_recursion_does_not_use_python_stack():
+    input_source = """let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } };
+    count(5000)"""
+    assert 5000 == evaluate(create_program(input_source), Environment()).value
+
+
+def test_wrong_number_of_arguments():
+    result = evaluate(create_program("fn(a, b) { a }(1)"), Environment())
+    assert "wrong number of arguments. got=1, want=2" == result.message
+
+
+def test_calls_functions_of_other_engines():
+    env = Environment()
+    tree_walker_evaluate(create_program("let twice = fn(x) { x * 2 };"), env)
+    result = evaluate(create_program("let f = fn(y) { twice(y) + 1 }; [f(20), map([1], twice)]"), env)
+    assert "[41, [2]]" == str(result)
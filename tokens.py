@@ -38,6 +38,14 @@ class TokenType(Enum):
     def __repr__(self):
         return f"<{self.__class__.__name__}.{self.name}>"
 
+    # Enum hashes members by name in Python code; members are singletons, so the
+    # identity hash is equivalent and keeps the parser's dict lookups in C
+    __hash__ = object.__hash__
+
+
+# Integer token kinds for array-backed token streams, in TokenType declaration order
+TOKEN_TYPES = list(TokenType)
+TOKEN_KINDS = {token_type: kind for kind, token_type in enumerate(TOKEN_TYPES)}
 
 KEYWORDS = {
     "fn": TokenType.FUNCTION,
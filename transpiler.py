@@ -0,0 +1,369 @@
+from astree import (
+    Node,
+    Program,
+    IntegerLiteral,
+    ExpressionStatement,
+    PrefixExpression,
+    InfixExpression,
+    BooleanLiteral,
+    IfExpression,
+    ReturnStatement,
+    CallExpression,
+    LetStatement,
+    FunctionLiteral,
+    Identifier,
+    StringLiteral,
+    IndexExpression,
+    HashLiteral,
+    ArrayLiteral,
+)
+from evaluator import (
+    Environment,
+    _eval_infix_expression,
+    _eval_prefix_expression,
+    _eval_index_expression,
+    _is_truthy,
+    _new_string,
+)
+from objects import (
+    MError,
+    MInteger,
+    TRUE,
+    FALSE,
+    NULL,
+    MFunction,
+    MBuiltinFunction,
+    BUILTINS,
+    MArray,
+    MHash,
+    MValue,
+    HashPair,
+)
+from program_cache import ProgramCache
+from resolver import function_layout
+
+_INDENT = "    "
+
+
+class TranspiledFunction(MFunction):
+    def __init__(self, node: FunctionLiteral, fn):
+        super().__init__(node.parameters, node.body, None)
+        self.fn = fn
+        self.arity = len(node.parameters)
+
+    def type_desc(self) -> str:
+        return MFunction.__name__
+
+    def apply(self, args: list):
+        try:
+            return _call(self, tuple(args))
+        except _Abort as abort:
+            return abort.error
+
+
+class _Abort(Exception):
+    def __init__(self, error: MError):
+        super().__init__(error.message)
+        self.error = error
+
+
+def _check(result):
+    if type(result) is MError:
+        raise _Abort(result)
+    return result
+
+
+def _global(env: Environment, name: str):
+    value = env[name]
+    if value is not None:
+        return value
+    builtin = BUILTINS.get(name, None)
+    if builtin is None:
+        raise _Abort(MError(f"identifier not found: {name}"))
+    return builtin
+
+
+def _infix(operator, left, right):
+    return _check(_eval_infix_expression(operator, left, right))
+
+
+def _prefix(operator, right):
+    return _check(_eval_prefix_expression(operator, right))
+
+
+def _index(left, index):
+    return _check(_eval_index_expression(left, index))
+
+
+def _key(key):
+    if not isinstance(key, MValue):
+        raise _Abort(MError(f"unusable as hash key: {key.type_desc()}"))
+    return key
+
+
+def _hash(pairs):
+    return MHash({key.hash_key(): HashPair(key, value) for key, value in pairs})
+
+
+def _call(function, args):
+    if type(function) is TranspiledFunction:
+        arity = function.arity
+        if len(args) == arity:
+            return function.fn(*args)
+        if len(args) < arity:
+            raise _Abort(
+                MError(f"wrong number of arguments. got={len(args)}, want={arity}")
+            )
+        return function.fn(*args[:arity])
+    if type(function) is MBuiltinFunction:
+        result = function.fn(list(args))
+        return NULL if result is None else _check(result)
+    if isinstance(function, MFunction):
+        # a function made by another engine runs there
+        return _check(function.apply(list(args)))
+    raise _Abort(MError(f"not a function: {function.type_desc()}"))
+
+
+_RUNTIME = {
+    "_Abort": _Abort,
+    "_Fn": TranspiledFunction,
+    "_global": _global,
+    "_infix": _infix,
+    "_prefix": _prefix,
+    "_index": _index,
+    "_key": _key,
+    "_hash": _hash,
+    "_call": _call,
+    "_is_truthy": _is_truthy,
+    "MInteger": MInteger,
+    "_new_string": _new_string,
+    "MArray": MArray,
+    "TRUE": TRUE,
+    "FALSE": FALSE,
+    "NULL": NULL,
+}
+
+_FAST_INFIX = {
+    "+": "MInteger({0}.value + {1}.value)",
+    "-": "MInteger({0}.value - {1}.value)",
+    "*": "MInteger({0}.value * {1}.value)",
+    "<": "(TRUE if {0}.value < {1}.value else FALSE)",
+    ">": "(TRUE if {0}.value > {1}.value else FALSE)",
+    "==": "(TRUE if {0}.value == {1}.value else FALSE)",
+    "!=": "(TRUE if {0}.value != {1}.value else FALSE)",
+}
+
+
+class _Generator:
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self._indent = 1
+        self._counter = 0
+        self._scopes = []
+
+    def _name(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def _emit(self, line: str):
+        self.lines.append(f"{_INDENT * self._indent}{line}")
+
+    def _constant(self, value) -> str:
+        name = self._name("_c")
+        self.constants[name] = value
+        return name
+
+    def _local(self, name: str, level: int) -> str:
+        return f"{name}_{level}"
+
+    def program(self, program: Program):
+        result = self._block(program.statements)
+        self._emit(f"return {result}")
+
+    def _block(self, statements: list) -> str:
+        result = self._name("_r")
+        if len(statements) == 0:
+            self._emit(f"{result} = None")
+        last = len(statements) - 1
+        for i, statement in enumerate(statements):
+            self._statement(statement, result if i == last else None)
+        return result
+
+    def _statement(self, node, result: str | None):
+        match node:
+            case LetStatement(name, value):
+                value = self._expression(value)
+                if self._scopes:
+                    self._emit(f"{self._local(name.value, len(self._scopes))} = {value}")
+                else:
+                    self._emit(f"_store[{name.value!r}] = {value}")
+                if result is not None:
+                    self._emit(f"{result} = None")
+            case ReturnStatement(value):
+                self._emit(f"return {self._expression(value)}")
+            case ExpressionStatement(expression):
+                value = self._expression(expression)
+                self._emit(value if result is None else f"{result} = {value}")
+            case _:
+                if result is not None:
+                    self._emit(f"{result} = None")
+
+    def _expressions(self, nodes: list, hash_pairs: bool = False) -> list[str]:
+        # statements emitted by a later operand (an if expression) must not run
+        # before the earlier operands, so those get pinned to temporaries. With
+        # hash_pairs, nodes alternate keys and values, and each key is checked
+        # before it is pinned, so a bad key is reported before later pairs run
+        values = []
+        for position, node in enumerate(nodes):
+            mark = len(self.lines)
+            value = self._expression(node)
+            if hash_pairs and position % 2 == 0:
+                value = f"_key({value})"
+            if len(self.lines) > mark:
+                for i, previous in enumerate(values):
+                    temp = self._name("_t")
+                    self.lines.insert(mark + i, f"{_INDENT * self._indent}{temp} = {previous}")
+                    values[i] = temp
+            values.append(value)
+        return values
+
+    def _expression(self, node: Node | None) -> str:
+        match node:
+            case Identifier(value):
+                return self._identifier(value)
+            case IntegerLiteral(value):
+                return self._constant(MInteger(value))
+            case BooleanLiteral(value):
+                return "TRUE" if value else "FALSE"
+            case StringLiteral(value):
+                return f"_new_string({value!r})"
+            case InfixExpression(left, operator, right):
+                return self._infix(operator, *self._expressions([left, right]))
+            case PrefixExpression(operator, right):
+                return f"_prefix({operator!r}, {self._expression(right)})"
+            case IfExpression():
+                return self._if(node)
+            case CallExpression(function, arguments):
+                values = self._expressions([function] + arguments)
+                args = "".join(f"{value}, " for value in values[1:])
+                return f"_call({values[0]}, ({args}))"
+            case FunctionLiteral():
+                return self._function(node)
+            case IndexExpression(left, index):
+                return "_index({0}, {1})".format(*self._expressions([left, index]))
+            case ArrayLiteral(elements):
+                return f"MArray([{', '.join(self._expressions(elements))}])"
+            case HashLiteral(pairs):
+                nodes = []
+                for key, value in pairs.items():
+                    nodes.extend([key, value])
+                values = self._expressions(nodes, hash_pairs=True)
+                items = ", ".join(
+                    f"({values[i]}, {values[i + 1]})" for i in range(0, len(values), 2)
+                )
+                return f"_hash([{items}])"
+            case _:
+                return "None"
+
+    def _identifier(self, name: str) -> str:
+        temp = self._name("_t")
+        value = f"({temp} if ({temp} := _store.get({name!r})) is not None else _global(env, {name!r}))"
+        # an unassigned local falls through to the enclosing scopes, see evaluator._lookup_unbound
+        for level, declared in enumerate(self._scopes, start=1):
+            if name in declared:
+                local = self._local(name, level)
+                value = f"({local} if {local} is not None else {value})"
+        return value
+
+    def _infix(self, operator: str, left: str, right: str) -> str:
+        fast = _FAST_INFIX.get(operator, None)
+        if fast is None:
+            return f"_infix({operator!r}, {left}, {right})"
+        left_temp = self._name("_t")
+        right_temp = self._name("_t")
+        return (
+            f"({fast.format(left_temp, right_temp)} "
+            f"if type({left_temp} := {left}) is type({right_temp} := {right}) is MInteger "
+            f"else _infix({operator!r}, {left_temp}, {right_temp}))"
+        )
+
+    def _if(self, node: IfExpression) -> str:
+        condition = self._expression(node.condition)
+        temp = self._name("_t")
+        self._emit(
+            f"if ({temp} := {condition}) is TRUE or "
+            f"({temp} is not FALSE and _is_truthy({temp})):"
+        )
+        self._indent += 1
+        result = self._block(node.consequence.statements)
+        self._indent -= 1
+        self._emit("else:")
+        self._indent += 1
+        if node.alternative is None:
+            self._emit(f"{result} = NULL")
+        else:
+            alternative = self._block(node.alternative.statements)
+            self._emit(f"{result} = {alternative}")
+        self._indent -= 1
+        return result
+
+    def _function(self, node: FunctionLiteral) -> str:
+        parameters = [parameter.value for parameter in node.parameters]
+        declared = function_layout(node).names
+        self._scopes.append(set(declared))
+        level = len(self._scopes)
+        name = self._name("_f")
+        # an argument bound to a name repeated later in the parameters is unused
+        arguments = ", ".join(
+            self._name("_p")
+            if parameter in parameters[index + 1:]
+            else self._local(parameter, level)
+            for index, parameter in enumerate(parameters)
+        )
+        self._emit(f"def {name}({arguments}):")
+        self._indent += 1
+        for local in declared[len(parameters):]:
+            self._emit(f"{self._local(local, level)} = None")
+        result = self._block(node.body.statements)
+        self._emit(f"return {result}")
+        self._indent -= 1
+        self._scopes.pop()
+        return f"_Fn({self._constant(node)}, {name})"
+
+
+def transpile(program: Program) -> tuple[str, dict]:
+    generator = _Generator()
+    generator.program(program)
+    lines = ["def _program(env):", f"{_INDENT}_store = env.store"] + generator.lines
+    return "\n".join(lines) + "\n", generator.constants
+
+
+def load(program: Program):
+    source, constants = transpile(program)
+    namespace = dict(_RUNTIME)
+    namespace.update(constants)
+    exec(compile(source, "<monkey>", "exec"), namespace)
+    return namespace["_program"]
+
+
+def run(loaded, env: Environment):
+    try:
+        return loaded(env)
+    except _Abort as abort:
+        return abort.error
+
+
+def evaluate(program: Program, env: Environment):
+    return run(load(program), env)
+
+
+_MODULES = ProgramCache(prepare=load)
+
+
+def load_source(input_source: str):
+    return _MODULES.get(input_source).prepared
+
+
+def evaluate_source(input_source: str, env: Environment):
+    return run(load_source(input_source), env)
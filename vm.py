@@ -0,0 +1,311 @@
+from astree import Program
+from bytecode import Opcode, make
+from compiler import Bytecode, FunctionCode, compile_program
+from evaluator import (
+    Environment,
+    _SLOTS_START,
+    _lookup_global,
+    _lookup_unbound,
+    _new_string,
+    _infix_operator,
+    _eval_prefix_expression,
+    _eval_index_expression,
+    _is_truthy,
+)
+from objects import (
+    MError,
+    MInteger,
+    TRUE,
+    FALSE,
+    NULL,
+    MFunction,
+    MBuiltinFunction,
+    MArray,
+    MHash,
+    MValue,
+    HashPair,
+)
+
+# Scopes are the frames of evaluator.py, with the FunctionCode as their layout
+
+_CONSTANT = int(Opcode.CONSTANT)
+_STRING = int(Opcode.STRING)
+_TRUE = int(Opcode.TRUE)
+_FALSE = int(Opcode.FALSE)
+_NULL = int(Opcode.NULL)
+_NONE = int(Opcode.NONE)
+_POP = int(Opcode.POP)
+_ADD = int(Opcode.ADD)
+_SUB = int(Opcode.SUB)
+_MUL = int(Opcode.MUL)
+_DIV = int(Opcode.DIV)
+_EQUAL = int(Opcode.EQUAL)
+_NOT_EQUAL = int(Opcode.NOT_EQUAL)
+_GREATER_THAN = int(Opcode.GREATER_THAN)
+_LESS_THAN = int(Opcode.LESS_THAN)
+_MINUS = int(Opcode.MINUS)
+_BANG = int(Opcode.BANG)
+_JUMP = int(Opcode.JUMP)
+_JUMP_NOT_TRUTHY = int(Opcode.JUMP_NOT_TRUTHY)
+_GET_GLOBAL = int(Opcode.GET_GLOBAL)
+_SET_GLOBAL = int(Opcode.SET_GLOBAL)
+_GET_LOCAL = int(Opcode.GET_LOCAL)
+_SET_LOCAL = int(Opcode.SET_LOCAL)
+_GET_FREE = int(Opcode.GET_FREE)
+_ARRAY = int(Opcode.ARRAY)
+_HASH_KEY = int(Opcode.HASH_KEY)
+_HASH = int(Opcode.HASH)
+_INDEX = int(Opcode.INDEX)
+_CALL = int(Opcode.CALL)
+_RETURN_VALUE = int(Opcode.RETURN_VALUE)
+_CLOSURE = int(Opcode.CLOSURE)
+
+_INFIX_OPERATORS = {
+    _ADD: _infix_operator("+"),
+    _SUB: _infix_operator("-"),
+    _MUL: _infix_operator("*"),
+    _DIV: _infix_operator("/"),
+    _EQUAL: _infix_operator("=="),
+    _NOT_EQUAL: _infix_operator("!="),
+    _GREATER_THAN: _infix_operator(">"),
+    _LESS_THAN: _infix_operator("<"),
+}
+
+
+class Closure(MFunction):
+    def __init__(self, parameters, body, env, code: FunctionCode, globals_env: Environment):
+        super().__init__(parameters, body, env)
+        self.code = code
+        self.globals_env = globals_env
+
+    def type_desc(self) -> str:
+        return MFunction.__name__
+
+    def apply(self, args: list):
+        # runs a stub program that pushes the closure and its arguments and calls it
+        instructions = _CALL_STUBS.get(len(args), None)
+        if instructions is None:
+            instructions = b"".join(
+                [make(Opcode.CONSTANT, i) for i in range(len(args) + 1)]
+                + [make(Opcode.CALL, len(args)), make(Opcode.RETURN_VALUE)]
+            )
+            _CALL_STUBS[len(args)] = instructions
+        return run(Bytecode(instructions, [self] + list(args)), self.globals_env)
+
+
+_CALL_STUBS = {}
+
+
+def run(bytecode: Bytecode, env: Environment):
+    constants = bytecode.constants
+    globals_store = env.store
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    frames = []
+    instructions = bytecode.instructions
+    scope = env
+    ip = 0
+
+    while True:
+        op = instructions[ip]
+        if op == _GET_LOCAL:
+            slot = instructions[ip + 1]
+            value = scope[slot + _SLOTS_START]
+            if value is None:
+                value = _lookup_unbound(scope[1].names[slot], scope[0])
+                if type(value) is MError:
+                    return value
+            push(value)
+            ip += 2
+        elif op == _CONSTANT:
+            push(constants[(instructions[ip + 1] << 8) | instructions[ip + 2]])
+            ip += 3
+        elif op == _GET_GLOBAL:
+            name = constants[(instructions[ip + 1] << 8) | instructions[ip + 2]]
+            value = globals_store.get(name, None)
+            if value is None:
+                value = _lookup_global(name, env)
+                if type(value) is MError:
+                    return value
+            push(value)
+            ip += 3
+        elif op == _JUMP_NOT_TRUTHY:
+            condition = pop()
+            if condition is TRUE or (condition is not FALSE and _is_truthy(condition)):
+                ip += 3
+            else:
+                ip = (instructions[ip + 1] << 8) | instructions[ip + 2]
+        elif op == _LESS_THAN:
+            right = pop()
+            left = pop()
+            if type(left) is MInteger and type(right) is MInteger:
+                push(TRUE if left.value < right.value else FALSE)
+            else:
+                result = _INFIX_OPERATORS[_LESS_THAN](left, right)
+                if type(result) is MError:
+                    return result
+                push(result)
+            ip += 1
+        elif op == _ADD:
+            right = pop()
+            left = pop()
+            if type(left) is MInteger and type(right) is MInteger:
+                push(MInteger(left.value + right.value))
+            else:
+                result = _INFIX_OPERATORS[_ADD](left, right)
+                if type(result) is MError:
+                    return result
+                push(result)
+            ip += 1
+        elif op == _SUB:
+            right = pop()
+            left = pop()
+            if type(left) is MInteger and type(right) is MInteger:
+                push(MInteger(left.value - right.value))
+            else:
+                result = _INFIX_OPERATORS[_SUB](left, right)
+                if type(result) is MError:
+                    return result
+                push(result)
+            ip += 1
+        elif op == _CALL:
+            num_args = instructions[ip + 1]
+            ip += 2
+            function = stack[-1 - num_args]
+            if type(function) is Closure:
+                code = function.code
+                num_parameters = code.num_parameters
+                if num_args < num_parameters:
+                    return MError(
+                        f"wrong number of arguments. got={num_args}, want={num_parameters}"
+                    )
+                start = len(stack) - num_args
+                new_scope = [function.env, code]
+                new_scope += stack[start: start + num_parameters]
+                if len(code.names) > num_parameters:
+                    new_scope += [None] * (len(code.names) - num_parameters)
+                del stack[start - 1:]
+                frames.append((instructions, constants, ip, scope, len(stack)))
+                instructions = code.instructions
+                constants = code.constants
+                scope = new_scope
+                ip = 0
+            elif type(function) is MBuiltinFunction:
+                args = stack[len(stack) - num_args:]
+                del stack[-1 - num_args:]
+                result = function.fn(args)
+                if result is None:
+                    result = NULL
+                elif type(result) is MError:
+                    return result
+                push(result)
+            elif isinstance(function, MFunction):
+                # a function made by another engine runs there
+                args = stack[len(stack) - num_args:]
+                del stack[-1 - num_args:]
+                result = function.apply(args)
+                if type(result) is MError:
+                    return result
+                push(result)
+            else:
+                return MError(f"not a function: {function.type_desc()}")
+        elif op == _RETURN_VALUE:
+            value = pop()
+            if not frames:
+                return value
+            instructions, constants, ip, scope, base = frames.pop()
+            del stack[base:]
+            push(value)
+        elif op == _POP:
+            pop()
+            ip += 1
+        elif op == _JUMP:
+            ip = (instructions[ip + 1] << 8) | instructions[ip + 2]
+        elif op == _GET_FREE:
+            depth = instructions[ip + 1]
+            slot = instructions[ip + 2]
+            outer = scope
+            for _ in range(depth):
+                outer = outer[0]
+            value = outer[slot + _SLOTS_START]
+            if value is None:
+                value = _lookup_unbound(outer[1].names[slot], outer[0])
+                if type(value) is MError:
+                    return value
+            push(value)
+            ip += 3
+        elif op == _SET_LOCAL:
+            scope[instructions[ip + 1] + _SLOTS_START] = pop()
+            ip += 2
+        elif op == _SET_GLOBAL:
+            name = constants[(instructions[ip + 1] << 8) | instructions[ip + 2]]
+            globals_store[name] = pop()
+            ip += 3
+        elif op in _INFIX_OPERATORS:
+            right = pop()
+            left = pop()
+            result = _INFIX_OPERATORS[op](left, right)
+            if type(result) is MError:
+                return result
+            push(result)
+            ip += 1
+        elif op == _TRUE:
+            push(TRUE)
+            ip += 1
+        elif op == _FALSE:
+            push(FALSE)
+            ip += 1
+        elif op == _NULL:
+            push(NULL)
+            ip += 1
+        elif op == _NONE:
+            push(None)
+            ip += 1
+        elif op == _STRING:
+            push(_new_string(constants[(instructions[ip + 1] << 8) | instructions[ip + 2]]))
+            ip += 3
+        elif op == _MINUS or op == _BANG:
+            result = _eval_prefix_expression("-" if op == _MINUS else "!", pop())
+            if type(result) is MError:
+                return result
+            push(result)
+            ip += 1
+        elif op == _CLOSURE:
+            code = constants[(instructions[ip + 1] << 8) | instructions[ip + 2]]
+            push(Closure(code.parameters, code.body, scope, code, env))
+            ip += 3
+        elif op == _INDEX:
+            index = pop()
+            left = pop()
+            result = _eval_index_expression(left, index)
+            if type(result) is MError:
+                return result
+            push(result)
+            ip += 1
+        elif op == _ARRAY:
+            size = (instructions[ip + 1] << 8) | instructions[ip + 2]
+            elements = stack[len(stack) - size:]
+            del stack[len(stack) - size:]
+            push(MArray(elements))
+            ip += 3
+        elif op == _HASH_KEY:
+            key = stack[-1]
+            if not isinstance(key, MValue):
+                return MError(f"unusable as hash key: {key.type_desc()}")
+            ip += 1
+        elif op == _HASH:
+            size = (instructions[ip + 1] << 8) | instructions[ip + 2]
+            pairs = {}
+            for i in range(len(stack) - 2 * size, len(stack), 2):
+                key = stack[i]
+                pairs[key.hash_key()] = HashPair(key, stack[i + 1])
+            del stack[len(stack) - 2 * size:]
+            push(MHash(pairs))
+            ip += 3
+        else:
+            raise ValueError(f"opcode {op} undefined")
+
+
+def evaluate(program: Program, env: Environment):
+    return run(compile_program(program), env)